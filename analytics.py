@@ -0,0 +1,198 @@
+import os
+import time
+import numpy as np
+from db_utils import stream_booking_intervals
+
+# Columnar booking analytics for facility utilization and occupancy, the figures
+# that need the booking intervals themselves (counts and totals come from the
+# daily facts, see booking_facts.py). The bookings of a date range are read once
+# into parallel NumPy arrays (facility index, start and end minute, status code).
+# Utilization merges each facility's bookings into disjoint intervals (sort and
+# sweep) and counts only the part that falls within opening hours; occupancy is a
+# difference array with a cumulative sum for bookings in progress minute by
+# minute. A loaded range is reused for ANALYTICS_CACHE_SECONDS.
+ANALYTICS_CACHE_SECONDS = int(os.environ.get('ANALYTICS_CACHE_SECONDS', '60'))
+
+
+def _parse_open_hours(text):
+    """'08:00-20:00' -> (480, 1200), minutes after midnight."""
+    opens, closes = (part.strip().split(':') for part in text.split('-'))
+    return int(opens[0]) * 60 + int(opens[1]), int(closes[0]) * 60 + int(closes[1])
+
+
+# Opening hours utilization is measured against, the same for every facility;
+# FACILITY_OPEN_DAYS are the weekdays facilities can be booked (0 = Monday)
+FACILITY_OPEN_HOURS = _parse_open_hours(os.environ.get('FACILITY_OPEN_HOURS', '08:00-20:00'))
+FACILITY_OPEN_DAYS = sorted(
+    {int(d) for d in os.environ.get('FACILITY_OPEN_DAYS', '0,1,2,3,4,5,6').split(',') if d.strip()}
+)
+
+STATUSES = ('Confirmed', 'Completed', 'Pending Approval', 'Cancelled')
+# Bookings that hold a facility; the sweeper marks ended Confirmed bookings Completed
+OCCUPYING_STATUSES = ('Confirmed', 'Completed')
+MINUTES_PER_DAY = 24 * 60
+HOURS_PER_WEEK = 7 * 24
+
+
+class BookingColumns:
+    """Bookings starting on start_date..end_date as arrays; minutes count from start_date 00:00."""
+
+    def __init__(self, start_date, end_date, facility_ids, facility_index, start, end, status):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = (end_date - start_date).days + 1
+        self.facility_ids = facility_ids      # sorted unique facility IDs
+        self.facility_index = facility_index  # per booking, position in facility_ids
+        self.start = start
+        self.end = end
+        self.status = status                  # per booking, position in STATUSES (-1 unknown)
+
+    @classmethod
+    def from_rows(cls, start_date, end_date, rows):
+        facility, start, end, status = [], [], [], []
+        codes = {name: code for code, name in enumerate(STATUSES)}
+        for row in rows:
+            facility.append(row['facility_id'])
+            start.append(row['start_minute'])
+            end.append(row['end_minute'])
+            status.append(codes.get(row['status'], -1))
+        facility_ids, facility_index = np.unique(np.array(facility, dtype=np.int64), return_inverse=True)
+        return cls(start_date, end_date, facility_ids, facility_index, np.array(start, dtype=np.int64), np.array(end, dtype=np.int64), np.array(status, dtype=np.int8))
+
+    def __len__(self):
+        return len(self.start)
+
+    def _mask(self, statuses):
+        if not statuses:
+            return np.ones(len(self), dtype=bool)
+        return np.isin(self.status, [STATUSES.index(status) for status in statuses])
+
+    def _clipped(self, mask):
+        """Start/end of the masked bookings cut to the range (a booking may run past end_date)."""
+        limit = self.days * MINUTES_PER_DAY
+        start = np.clip(self.start[mask], 0, limit)
+        end = np.clip(self.end[mask], 0, limit)
+        return start, np.maximum(end, start)
+
+    def _per_facility(self, values, facility_ids):
+        """{facility_id: values[position in self.facility_ids]} for the given facilities (0.0 if absent)."""
+        wanted = np.asarray(list(facility_ids), dtype=np.int64)
+        position = np.searchsorted(self.facility_ids, wanted)
+        position = np.minimum(position, max(len(self.facility_ids) - 1, 0))
+        found = (self.facility_ids[position] == wanted) if len(self.facility_ids) else np.zeros(len(wanted), dtype=bool)
+        picked = np.where(found, values[position] if len(values) else 0.0, 0.0)
+        return {int(fid): float(value) for fid, value in zip(wanted, picked)}
+
+    def open_minutes_before(self, open_hours=FACILITY_OPEN_HOURS, open_days=FACILITY_OPEN_DAYS):
+        """
+        Cumulative opening time: element t is the number of the range's minutes before
+        minute t that fall within opening hours on an open weekday.
+        """
+        opens, closes = open_hours
+        minute_of_day = np.arange(MINUTES_PER_DAY)
+        open_in_day = (minute_of_day >= opens) & (minute_of_day < closes)
+        weekday = (self.start_date.weekday() + np.arange(self.days)) % 7
+        open_day = np.isin(weekday, list(open_days))
+        is_open = (open_day[:, None] & open_in_day[None, :]).ravel()
+        return np.concatenate(([0], np.cumsum(is_open)))
+
+    def facility_occupied_minutes(self, facility_ids, statuses=OCCUPYING_STATUSES,
+                                  open_hours=FACILITY_OPEN_HOURS, open_days=FACILITY_OPEN_DAYS):
+        """
+        {facility_id: minutes within opening hours when the facility had at least one
+        booking}. Overlapping bookings count once and time outside opening hours not at all.
+        """
+        open_before = self.open_minutes_before(open_hours, open_days)
+        mask = self._mask(statuses)
+        start, end = self._clipped(mask)
+        facility = self.facility_index[mask].astype(np.int64)
+
+        # Sort-and-sweep union per facility. Each facility is shifted onto its own stretch
+        # of one timeline, so a single sort and running maximum merge every facility at once.
+        span = self.days * MINUTES_PER_DAY + 1
+        offset = facility * span
+        order = np.argsort(start + offset, kind='stable')
+        start, end, facility = start[order] + offset[order], end[order] + offset[order], facility[order]
+        occupied = np.zeros(len(self.facility_ids))
+        if len(start):
+            reach = np.maximum.accumulate(end)  # furthest end so far
+            new_run = np.ones(len(start), dtype=bool)
+            new_run[1:] = start[1:] > reach[:-1]
+            first = np.flatnonzero(new_run)
+            last = np.append(first[1:] - 1, len(start) - 1)
+            run_facility = facility[first]
+            run_start = start[first] - run_facility * span
+            run_end = reach[last] - run_facility * span
+            # Open minutes covered by each merged interval, in O(1) from the cumulative opening time
+            occupied = np.bincount(run_facility, weights=open_before[run_end] - open_before[run_start],
+                                   minlength=len(self.facility_ids))
+        return self._per_facility(occupied, facility_ids)
+
+    def utilization(self, facilities, statuses=OCCUPYING_STATUSES,
+                    open_hours=FACILITY_OPEN_HOURS, open_days=FACILITY_OPEN_DAYS):
+        """
+        Occupied share of opening time for catalog facilities, aggregated as
+        {'facility': {facility_id: totals}, 'type': {type: totals}, 'building': {building_id: totals},
+        'total': totals}, each totals being {'occupied_minutes', 'open_minutes', 'utilization'}.
+        Groups sum the minutes of their facilities, so unused facilities pull the rate down.
+        """
+        facilities = list(facilities)
+        open_minutes = int(self.open_minutes_before(open_hours, open_days)[-1])
+        occupied = self.facility_occupied_minutes([f.facility_id for f in facilities], statuses, open_hours, open_days)
+
+        result = {'facility': {}, 'type': {}, 'building': {},
+                  'total': {'occupied_minutes': 0.0, 'open_minutes': 0}}
+        for facility in facilities:
+            minutes = occupied[facility.facility_id]
+            groups = (result['facility'].setdefault(facility.facility_id, {'occupied_minutes': 0.0, 'open_minutes': 0}),
+                      result['type'].setdefault(facility.type, {'occupied_minutes': 0.0, 'open_minutes': 0}),
+                      result['building'].setdefault(facility.building_id, {'occupied_minutes': 0.0, 'open_minutes': 0}),
+                      result['total'])
+            for totals in groups:
+                totals['occupied_minutes'] += minutes
+                totals['open_minutes'] += open_minutes
+        for totals in [result['total']] + [t for g in ('facility', 'type', 'building') for t in result[g].values()]:
+            totals['utilization'] = totals['occupied_minutes'] / totals['open_minutes'] if totals['open_minutes'] else 0.0
+        return result
+
+    def hour_of_week_occupancy(self, statuses=OCCUPYING_STATUSES):
+        """
+        7 x 24 array (Monday first) of the average number of bookings in progress during
+        each hour of the week over the range.
+        """
+        mask = self._mask(statuses)
+        start, end = self._clipped(mask)
+        total_minutes = self.days * MINUTES_PER_DAY
+        # +1 at each start, -1 at each end; the running sum is the bookings in progress per minute
+        change = (np.bincount(start, minlength=total_minutes + 1)
+                  - np.bincount(end, minlength=total_minutes + 1))
+        in_progress = np.cumsum(change)[:total_minutes]
+        booked_per_hour = in_progress.reshape(-1, 60).sum(axis=1)
+
+        hour_of_week = (self.start_date.weekday() * 24 + np.arange(self.days * 24)) % HOURS_PER_WEEK
+        booked = np.bincount(hour_of_week, weights=booked_per_hour, minlength=HOURS_PER_WEEK)
+        occurrences = np.bincount(hour_of_week, minlength=HOURS_PER_WEEK) * 60
+        occupancy = np.divide(booked, occurrences, out=np.zeros(HOURS_PER_WEEK), where=occurrences > 0)
+        return occupancy.reshape(7, 24)
+
+
+_cache = {}  # (start_date, end_date) -> (loaded_at, BookingColumns)
+
+
+def load_booking_columns(start_date, end_date, max_age_seconds=ANALYTICS_CACHE_SECONDS):
+    """
+    BookingColumns for bookings starting on start_date..end_date (dates, inclusive),
+    reusing a load of the same range younger than max_age_seconds. None on error.
+    """
+    key = (start_date, end_date)
+    cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < max_age_seconds:
+        return cached[1]
+    try:
+        columns = BookingColumns.from_rows(start_date, end_date, stream_booking_intervals(start_date, end_date))
+    except Exception as e:
+        print(f"Error loading booking analytics: {e}")
+        return None
+    _cache.clear()  # only the range on screen is worth keeping
+    _cache[key] = (time.monotonic(), columns)
+    return columns
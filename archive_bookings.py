@@ -0,0 +1,91 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+from db_utils import db_transaction
+from migrate_database import BOOKING_COLUMNS, ensure_future_partitions, rebuild_booking_rollup
+from shard_router import get_router
+
+# Moves finished bookings out of the hot, partitioned `bookings` table into
+# `bookings_archive` (history reports read both through the bookings_history
+# view). Each batch is its own short transaction so the job never holds locks
+# on a large range. Also adds the upcoming monthly partitions and reconciles
+# the trigger-maintained booking_rollup against bookings_history.
+#
+# Usage: python archive_bookings.py [--horizon-days 365] [--batch-size 1000]
+# Schedule it nightly (cron / Task Scheduler).
+
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '1000'))
+
+
+def archive_bookings(horizon_days=ARCHIVE_HORIZON_DAYS, batch_size=ARCHIVE_BATCH_SIZE, shard=None):
+    """Move Completed/Cancelled bookings that ended before the horizon into bookings_archive."""
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    columns = ', '.join(BOOKING_COLUMNS)
+    moved = 0
+
+    while True:
+        with db_transaction(shard) as cursor:
+            # start_time < cutoff is implied by end_time < cutoff and lets MySQL prune partitions
+            cursor.execute("""
+                SELECT booking_id FROM bookings
+                WHERE status IN ('Completed', 'Cancelled')
+                AND start_time < %s AND end_time < %s
+                ORDER BY start_time
+                LIMIT %s
+                FOR UPDATE
+            """, (cutoff, cutoff, batch_size))
+            booking_ids = [row['booking_id'] for row in cursor.fetchall()]
+            if not booking_ids:
+                break
+
+            placeholders = ", ".join(["%s"] * len(booking_ids))
+            cursor.execute(f"""
+                INSERT INTO bookings_archive ({columns})
+                SELECT {columns} FROM bookings WHERE booking_id IN ({placeholders})
+            """, booking_ids)
+            # Archived bookings stay in bookings_history, so they stay in booking_rollup too
+            cursor.execute("SET @skip_booking_rollup = 1")
+            cursor.execute(f"DELETE FROM bookings WHERE booking_id IN ({placeholders})", booking_ids)
+            cursor.execute("SET @skip_booking_rollup = NULL")
+
+        moved += len(booking_ids)
+        print(f"Archived {moved} bookings so far...")
+        if len(booking_ids) < batch_size:
+            break
+
+    return moved
+
+
+def reconcile_booking_rollup(shard=None):
+    """Rebuild booking_rollup from scratch, correcting any drift from the triggers."""
+    with db_transaction(shard) as cursor:
+        rebuild_booking_rollup(cursor)
+
+
+def run_archival(horizon_days=ARCHIVE_HORIZON_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive old bookings and top up future partitions on every campus database."""
+    router = get_router()
+    shards = router.shards if router.is_sharded() else [None]
+    for shard in shards:
+        name = shard['name'] if shard else os.environ.get('DB_NAME')
+        try:
+            with db_transaction(shard) as cursor:
+                added = ensure_future_partitions(cursor)
+            if added:
+                print(f"{name}: added {added} monthly partitions")
+            moved = archive_bookings(horizon_days, batch_size, shard)
+            print(f"{name}: archived {moved} bookings older than {horizon_days} days")
+            reconcile_booking_rollup(shard)
+        except Exception as e:
+            print(f"Error archiving bookings for {name}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old Completed/Cancelled bookings")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS,
+                        help="archive bookings that ended more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE,
+                        help="bookings moved per transaction")
+    args = parser.parse_args()
+    run_archival(args.horizon_days, args.batch_size)
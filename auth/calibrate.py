@@ -0,0 +1,63 @@
+import argparse
+import hashlib
+import os
+import time
+
+# Picks a PBKDF2 iteration count that takes about --target-ms on this machine
+# and writes it to .env as PASSWORD_HASH_ITERATIONS. Existing hashes keep
+# working and are rehashed with the new cost on each user's next login.
+#
+# Usage: python -m auth.calibrate [--target-ms 250] [--dry-run]
+
+MIN_ITERATIONS = 100000
+ENV_FILE = '.env'
+
+
+def measure(iterations, rounds=3):
+    """Best-of-`rounds` time in seconds for one PBKDF2-SHA256 hash."""
+    salt = os.urandom(16)
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibration-password', salt, iterations)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(target_ms):
+    """Return the iteration count (rounded to 10,000) that hashes in roughly target_ms."""
+    probe = 50000
+    per_iteration = measure(probe) / probe
+    iterations = int(target_ms / 1000.0 / per_iteration)
+    return max(MIN_ITERATIONS, iterations // 10000 * 10000)
+
+
+def write_env_setting(key, value, path=ENV_FILE):
+    """Set key=value in the .env file, replacing an existing line if there is one."""
+    lines = []
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+    line = f"{key}={value}"
+    for index, existing in enumerate(lines):
+        if existing.split('=', 1)[0].strip() == key:
+            lines[index] = line
+            break
+    else:
+        lines.append(line)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the password hashing cost for this machine")
+    parser.add_argument("--target-ms", type=int, default=250, help="target time for one password check")
+    parser.add_argument("--dry-run", action="store_true", help="print the result without updating .env")
+    args = parser.parse_args()
+
+    iterations = calibrate(args.target_ms)
+    print(f"PBKDF2-SHA256 with {iterations} iterations takes {measure(iterations) * 1000:.0f} ms on this machine")
+    if not args.dry_run:
+        write_env_setting('PASSWORD_HASH_ITERATIONS', iterations)
+        print(f"Wrote PASSWORD_HASH_ITERATIONS={iterations} to {ENV_FILE}")
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Password hashing / verification runs on this small pool instead of the Qt GUI
+# thread. hashlib releases the GIL while running PBKDF2, so threads hash in
+# parallel. The pool and its queue are bounded: once AUTH_MAX_PENDING jobs are
+# waiting, new submissions fail fast instead of piling up behind a login storm.
+AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+AUTH_MAX_PENDING = int(os.environ.get('AUTH_MAX_PENDING', '32'))
+
+# Keep the last N timings per operation for percentile reporting
+_METRIC_SAMPLES = 500
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(AUTH_MAX_PENDING)
+_timings = {}
+_metrics_lock = threading.Lock()
+
+
+class HashPoolBusy(Exception):
+    """Raised (through the Future) when too many hashing jobs are already queued."""
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+        return _pool
+
+
+def record_timing(operation, elapsed):
+    """Record how long an auth operation took (seconds)."""
+    with _metrics_lock:
+        _timings.setdefault(operation, deque(maxlen=_METRIC_SAMPLES)).append(elapsed * 1000)
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def get_auth_metrics():
+    """Return count and p50/p95/p99/max latency in ms per operation (login, verify, hash, register)."""
+    with _metrics_lock:
+        report = {}
+        for operation, samples in _timings.items():
+            values = sorted(samples)
+            if not values:
+                continue
+            report[operation] = {
+                'count': len(values),
+                'p50_ms': _percentile(values, 50),
+                'p95_ms': _percentile(values, 95),
+                'p99_ms': _percentile(values, 99),
+                'max_ms': values[-1],
+            }
+        return report
+
+
+def submit(operation, fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the hashing pool and return a Future. The call's
+    wall time (queueing included) is recorded under `operation`.
+    """
+    if not _pending.acquire(blocking=False):
+        future = Future()
+        future.set_exception(HashPoolBusy("Too many sign-in requests in progress. Please try again."))
+        return future
+
+    submitted_at = time.perf_counter()
+
+    def run():
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record_timing(operation, time.perf_counter() - submitted_at)
+
+    try:
+        future = _get_pool().submit(run)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def shutdown(wait=False):
+    """Stop the pool (called on application exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import hmac
+import os
+
+# Stored password hashes are self-describing:
+#
+#     $pbkdf2-sha256$<iterations>$<salt, base64>$<hash, base64>
+#
+# so the cost can be raised (PASSWORD_HASH_ITERATIONS, see `python -m auth.calibrate`)
+# without breaking existing accounts. Hashes whose parameters differ from the
+# current settings are upgraded on the next successful login. Two legacy layouts
+# are still accepted: raw salt(32) + PBKDF2 hash(32) at 100,000 iterations, and
+# an unsalted SHA-256 digest.
+
+ALGORITHM = 'pbkdf2-sha256'
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', '100000'))
+SALT_BYTES = 16
+
+LEGACY_ITERATIONS = 100000
+LEGACY_SALT_BYTES = 32
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def hash_password(password, iterations=None):
+    """Hash a password for storing; returns bytes suitable for users.password_hash."""
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = _pbkdf2(password, salt, iterations)
+    return f"${ALGORITHM}${iterations}${_b64encode(salt)}${_b64encode(digest)}".encode('ascii')
+
+
+def parse_hash(stored):
+    """
+    Return (algorithm, iterations, salt, digest) for a stored hash, or None if it
+    can't be read. Legacy layouts are reported as 'pbkdf2-sha256-legacy' / 'sha256'.
+    """
+    if stored is None:
+        return None
+    if isinstance(stored, str):
+        stored = stored.encode('utf-8')
+    stored = bytes(stored)
+
+    if stored.startswith(b'$'):
+        try:
+            _, algorithm, iterations, salt, digest = stored.decode('ascii').split('$')
+            return algorithm, int(iterations), _b64decode(salt), _b64decode(digest)
+        except (ValueError, UnicodeDecodeError):
+            pass  # a raw legacy salt may start with '$' too
+
+    # Legacy rows: hex text from sha256().hexdigest(), or raw binary
+    try:
+        stored = bytes.fromhex(stored.decode('ascii'))
+    except (ValueError, UnicodeDecodeError):
+        pass
+    if len(stored) == LEGACY_SALT_BYTES + 32:
+        return 'pbkdf2-sha256-legacy', LEGACY_ITERATIONS, stored[:LEGACY_SALT_BYTES], stored[LEGACY_SALT_BYTES:]
+    if len(stored) == 32:
+        return 'sha256', 0, b'', stored
+    return None
+
+
+def verify_password(stored, password):
+    """Check `password` against a stored hash in any supported format."""
+    parsed = parse_hash(stored)
+    if parsed is None:
+        return False
+    algorithm, iterations, salt, digest = parsed
+    if algorithm == 'sha256':
+        candidate = hashlib.sha256(password.encode('utf-8')).digest()
+    elif algorithm in (ALGORITHM, 'pbkdf2-sha256-legacy'):
+        candidate = _pbkdf2(password, salt, iterations)
+    else:
+        return False
+    return hmac.compare_digest(candidate, digest)
+
+
+def needs_rehash(stored):
+    """True if the stored hash isn't in the current format with the current cost."""
+    parsed = parse_hash(stored)
+    if parsed is None:
+        return True
+    algorithm, iterations, salt, _ = parsed
+    return algorithm != ALGORITHM or iterations != PASSWORD_HASH_ITERATIONS or len(salt) != SALT_BYTES
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import re
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import mysql.connector
+from auth import passwords
+from db_utils import execute_query, db_transaction
+
+# Bulk account creation from a roster file (CSV with a header row, or JSON Lines).
+# Columns: username, email, role (student|faculty), and optionally password,
+# major (students), department and title (faculty). Rows without a password get
+# a one-time password that is written to the report.
+#
+# The roster is streamed in chunks. Each chunk's passwords are hashed across a
+# process pool (PBKDF2 is CPU bound), then its users and profiles are written
+# with multi-row INSERTs in a single transaction. Bad rows are skipped and
+# listed in the report; they never abort the rest of the import.
+
+PROVISION_CHUNK_SIZE = int(os.environ.get('PROVISION_CHUNK_SIZE', '500'))
+PROVISION_WORKERS = int(os.environ.get('PROVISION_WORKERS', str(os.cpu_count() or 1)))
+
+VALID_ROLES = ('student', 'faculty')
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+
+def read_roster(path):
+    """Yield (line_number, row dict) from a CSV or JSONL roster without loading it all."""
+    if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, {'_error': f"Invalid JSON: {e}"}
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def _validate(row):
+    """Normalise a roster row; returns (row, error)."""
+    if not isinstance(row, dict):
+        return None, "Row is not an object"
+    if '_error' in row:
+        return None, row['_error']
+    clean = {}
+    for key, value in row.items():
+        if not key or value is None:
+            continue
+        # JSONL values may be numbers (e.g. a numeric username); nested values are rejected
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None, f"Invalid {key.strip().lower()}"
+        clean[key.strip().lower()] = str(value).strip()
+    for field in ('username', 'email', 'role'):
+        if not clean.get(field):
+            return None, f"Missing {field}"
+    clean['role'] = clean['role'].lower()
+    if clean['role'] not in VALID_ROLES:
+        return None, f"Invalid role '{clean['role']}' (expected student or faculty)"
+    if not EMAIL_PATTERN.match(clean['email']):
+        return None, "Invalid email address"
+    if len(clean['username']) > 50 or len(clean['email']) > 100:
+        return None, "Username or email too long"
+    return clean, None
+
+
+def _existing_accounts(usernames, emails):
+    """Usernames and emails from this chunk that are already taken."""
+    placeholders_u = ", ".join(["%s"] * len(usernames))
+    placeholders_e = ", ".join(["%s"] * len(emails))
+    rows = execute_query(
+        f"SELECT username, email FROM users WHERE username IN ({placeholders_u}) OR email IN ({placeholders_e})",
+        list(usernames) + list(emails),
+        use_primary=True
+    )
+    if rows is None:
+        raise mysql.connector.Error(msg="Could not check existing accounts")
+    return {row['username'].lower() for row in rows}, {row['email'].lower() for row in rows}
+
+
+def _insert_chunk(users):
+    """Insert users (dicts with password_hash) and their profiles in one transaction."""
+    with db_transaction() as cursor:
+        cursor.execute(
+            "INSERT INTO users (username, email, password_hash, role, created_at, is_active) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, NOW(), TRUE)"] * len(users)),
+            [value for user in users for value in (user['username'], user['email'], user['password_hash'], user['role'])]
+        )
+        placeholders = ", ".join(["%s"] * len(users))
+        cursor.execute(f"SELECT user_id, username FROM users WHERE username IN ({placeholders})",
+                       [user['username'] for user in users])
+        ids = {row['username'].lower(): row['user_id'] for row in cursor.fetchall()}
+
+        students = [user for user in users if user['role'] == 'student']
+        faculty = [user for user in users if user['role'] == 'faculty']
+        if students:
+            cursor.execute(
+                "INSERT INTO students (user_id, student_id, major, enrollment_date) VALUES "
+                + ", ".join(["(%s, %s, %s, CURDATE())"] * len(students)),
+                [value for user in students for value in (
+                    ids[user['username'].lower()], f"STU-{ids[user['username'].lower()]:05d}",
+                    user.get('major') or 'Undeclared')]
+            )
+        if faculty:
+            cursor.execute(
+                "INSERT INTO faculty (user_id, faculty_id, department, title, hire_date) VALUES "
+                + ", ".join(["(%s, %s, %s, %s, CURDATE())"] * len(faculty)),
+                [value for user in faculty for value in (
+                    ids[user['username'].lower()], f"FAC-{ids[user['username'].lower()]:05d}",
+                    user.get('department') or 'General', user.get('title') or 'Lecturer')]
+            )
+    return ids
+
+
+def provision_users(path, chunk_size=PROVISION_CHUNK_SIZE, workers=PROVISION_WORKERS, report_path=None, progress=None):
+    """
+    Create every valid account in the roster at `path`. Returns a summary dict
+    {'created', 'failed', 'report'}; per-row results are written to report_path
+    (default: <roster>.report.csv). `progress(processed_rows)` is called after each chunk.
+    """
+    report_path = report_path or os.path.splitext(path)[0] + '.report.csv'
+    created = failed = processed = 0
+    seen_usernames, seen_emails = set(), set()
+    rows = read_roster(path)
+
+    with open(report_path, 'w', encoding='utf-8', newline='') as report_file, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        report = csv.writer(report_file)
+        report.writerow(['line', 'username', 'email', 'status', 'error', 'one_time_password'])
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            processed += len(chunk)
+
+            valid = []
+            for line_number, row in chunk:
+                user, error = _validate(row)
+                if not error:
+                    username_key, email_key = user['username'].lower(), user['email'].lower()
+                    if username_key in seen_usernames or email_key in seen_emails:
+                        error = "Duplicate username or email in roster"
+                    else:
+                        seen_usernames.add(username_key)
+                        seen_emails.add(email_key)
+                if error:
+                    failed += 1
+                    fields = row if isinstance(row, dict) else {}
+                    report.writerow([line_number, fields.get('username', ''), fields.get('email', ''), 'failed', error, ''])
+                    continue
+                user['line'] = line_number
+                valid.append(user)
+
+            if valid:
+                new_users = valid  # rows not yet reported if the chunk fails
+                try:
+                    taken_usernames, taken_emails = _existing_accounts(
+                        [user['username'] for user in valid], [user['email'] for user in valid])
+                    new_users = []
+                    for user in valid:
+                        if user['username'].lower() in taken_usernames or user['email'].lower() in taken_emails:
+                            failed += 1
+                            report.writerow([user['line'], user['username'], user['email'], 'failed',
+                                             "Username or email already exists", ''])
+                        else:
+                            new_users.append(user)
+
+                    for user in new_users:
+                        if not user.get('password'):
+                            user['one_time_password'] = secrets.token_urlsafe(9)
+                    plaintexts = [user.get('password') or user['one_time_password'] for user in new_users]
+                    hashes = pool.map(passwords.hash_password, plaintexts,
+                                      chunksize=max(1, len(plaintexts) // (workers * 4)))
+                    for user, password_hash in zip(new_users, hashes):
+                        user['password_hash'] = password_hash
+
+                    if new_users:
+                        _insert_chunk(new_users)
+                        created += len(new_users)
+                        for user in new_users:
+                            report.writerow([user['line'], user['username'], user['email'], 'created', '',
+                                             user.get('one_time_password', '')])
+                except mysql.connector.Error as e:
+                    # The whole chunk was rolled back
+                    print(f"Error provisioning roster lines {valid[0]['line']}-{valid[-1]['line']}: {e}")
+                    for user in new_users:
+                        failed += 1
+                        report.writerow([user['line'], user['username'], user['email'], 'failed',
+                                         f"Database error: {e}", ''])
+
+            if progress:
+                progress(processed)
+
+    return {'created': created, 'failed': failed, 'report': report_path}
@@ -0,0 +1,94 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from db_utils import execute_query
+
+# "Remember me" sessions. The token saved on the client is "<selector>:<validator>";
+# the server keeps the selector (unique index) and only a SHA-256 of the validator,
+# so restoring a session is one indexed lookup plus a cheap hash compare instead of
+# a full password check, and a leaked sessions table can't be replayed.
+SESSION_DAYS = int(os.environ.get('SESSION_DAYS', '30'))
+
+
+def _hash_validator(validator):
+    return hashlib.sha256(validator.encode('ascii')).digest()
+
+
+def _split_token(token):
+    if not token or ':' not in token:
+        return None, None
+    return token.split(':', 1)
+
+
+def create_session(user_id, days=SESSION_DAYS):
+    """Create a session for user_id and return its token, or None on failure."""
+    try:
+        selector = secrets.token_urlsafe(12)
+        validator = secrets.token_urlsafe(32)
+        # Tidy up this user's dead sessions while we're here
+        execute_query(
+            "DELETE FROM user_sessions WHERE user_id = %s AND (expires_at < NOW() OR revoked_at IS NOT NULL)",
+            (user_id,), fetch=False
+        )
+        result = execute_query(
+            """
+            INSERT INTO user_sessions (selector, validator_hash, user_id, expires_at)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (selector, _hash_validator(validator), user_id, datetime.now() + timedelta(days=days)),
+            fetch=False
+        )
+        return f"{selector}:{validator}" if result is not None else None
+    except Exception as e:
+        print(f"Error creating session: {e}")
+        return None
+
+
+def restore_session(token):
+    """Return the active user's row for a valid, unexpired, unrevoked token, else None."""
+    selector, validator = _split_token(token)
+    if not selector:
+        return None
+    try:
+        rows = execute_query(
+            """
+            SELECT s.validator_hash, u.user_id, u.username, u.email, u.role, u.is_active
+            FROM user_sessions s
+            JOIN users u ON s.user_id = u.user_id
+            WHERE s.selector = %s AND s.revoked_at IS NULL AND s.expires_at > NOW()
+            """,
+            (selector,),
+            use_primary=True  # a just-revoked session must not be served from a lagging replica
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        if not hmac.compare_digest(bytes(row['validator_hash']), _hash_validator(validator)):
+            return None
+        return row
+    except Exception as e:
+        print(f"Error restoring session: {e}")
+        return None
+
+
+def revoke_session(token):
+    """Revoke a single session (logout)."""
+    selector, _ = _split_token(token)
+    if not selector:
+        return False
+    result = execute_query(
+        "UPDATE user_sessions SET revoked_at = NOW() WHERE selector = %s AND revoked_at IS NULL",
+        (selector,), fetch=False
+    )
+    return result is not None
+
+
+def revoke_user_sessions(user_id):
+    """Revoke every session of a user (password change)."""
+    result = execute_query(
+        "UPDATE user_sessions SET revoked_at = NOW() WHERE user_id = %s AND revoked_at IS NULL",
+        (user_id,), fetch=False
+    )
+    return result is not None
@@ -1,13 +1,25 @@
-import hashlib
-import os
+import time
 from enum import Enum # Use Enum directly, auto is not strictly needed for explicit values
-from db_utils import execute_query
+import mysql.connector
+from db_utils import execute_query, db_transaction, is_server_available
+from local_snapshot import get_snapshot
+from auth import hashing, passwords, sessions
 
 class UserRole(Enum):
     STUDENT = "student"
     FACULTY = "faculty"
     ADMIN = "admin"
 
+# MySQL ER_DUP_ENTRY - a unique key (username, email) was violated
+DUPLICATE_KEY_ERRNO = 1062
+
+# Columns of the joined profile query that apply to each role
+PROFILE_FIELDS = {
+    UserRole.STUDENT: {'username', 'email', 'student_id', 'major', 'enrollment_date'},
+    UserRole.FACULTY: {'username', 'email', 'faculty_id', 'department', 'title', 'hire_date'},
+    UserRole.ADMIN: {'username', 'email'},
+}
+
 class User:
     def __init__(self, user_id, username, email, role, is_active=True):
         self.user_id = user_id
@@ -16,122 +28,67 @@ class User:
         self.role = UserRole(role) # Ensure role is an enum member
         self.is_authenticated = user_id is not None
         self.is_active = is_active # Added is_active to User object
+        self.offline = False # Signed in against the local snapshot: read-only session
         self._profile_data = None # Cache profile data to avoid repeated DB calls
 
     @staticmethod
-    def hash_password(password, salt=None):
-        """Hash a password for storing."""
-        if salt is None:
-            salt = os.urandom(32)  # 32 bytes salt
-        
-        password_hash = hashlib.pbkdf2_hmac(
-            'sha256',  # Hash algorithm
-            password.encode('utf-8'),  # Convert password to bytes
-            salt,  # Salt
-            100000  # Number of iterations
-        )
-        
-        return salt + password_hash  # Concatenate salt and hash
+    def hash_password(password):
+        """Hash a password for storing (self-describing format, see auth/passwords.py)."""
+        started = time.perf_counter()
+        password_hash = passwords.hash_password(password)
+        hashing.record_timing('hash', time.perf_counter() - started)
+        return password_hash
     
     @staticmethod
-    def verify_password(stored_password_binary, provided_password):
-        """Verify a stored password against a provided password."""
-        # Ensure stored_password is bytes (from DB VARBINARY/BLOB)
-        if isinstance(stored_password_binary, str):
-            # If it's a hex string (from sha256.hexdigest()), convert it to bytes
-            # This handles inconsistency from previous hashing if data already exists
-            try:
-                stored_password_binary = bytes.fromhex(stored_password_binary)
-            except ValueError:
-                # If it's not hex, assume it's direct binary (e.g., from pbkdf2)
-                pass
-
-        if len(stored_password_binary) < 32: # Minimum length for salt + hash
-            # This might indicate an old SHA256 hash without salt
-            # For robustness, try simple SHA256 comparison if it's too short for PBKDF2 format
-            if hashlib.sha256(provided_password.encode()).hexdigest() == stored_password_binary.hex():
-                return True
-            return False
-
-        salt = stored_password_binary[:32]  # First 32 bytes are salt
-        stored_password_hash = stored_password_binary[32:]
-        
-        # Hash the provided password with the stored salt
-        new_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            provided_password.encode('utf-8'),
-            salt,
-            100000
-        )
-        
-        # Compare the calculated hash with the stored hash
-        return new_hash == stored_password_hash
+    def verify_password(stored_password_hash, provided_password):
+        """Verify a stored password hash (current or legacy format) against a provided password."""
+        started = time.perf_counter()
+        result = passwords.verify_password(stored_password_hash, provided_password)
+        hashing.record_timing('verify', time.perf_counter() - started)
+        return result
     
     @staticmethod
     def register(username, email, password, role): # Removed phone, address
         """Register a new user with the given details for SCNFBS."""
-        # Check if username or email already exists
-        existing_user = execute_query(
-            "SELECT * FROM users WHERE username = %s OR email = %s",
-            (username, email)
-        )
-        
-        if existing_user:
-            return False, "Username or email already exists."
-        
         # Hash the password using the strong PBKDF2 method
         hashed_password_binary = User.hash_password(password) # Returns bytes
         
-        # Insert the new user
-        # Added is_active column with default TRUE for new registrations
-        result = execute_query(
-            """
-            INSERT INTO users (username, email, password_hash, role, created_at, is_active)
-            VALUES (%s, %s, %s, %s, NOW(), TRUE)
-            """,
-            (username, email, hashed_password_binary, role.value),
-            fetch=False
-        )
-        
-        if result is not None:
-            # Get the user_id of the newly created user
-            user_data = execute_query(
-                "SELECT user_id FROM users WHERE username = %s",
-                (username,)
-            )
-            
-            if user_data:
-                user_id = user_data[0]['user_id']
-                
+        # One transaction: the user row and its initial profile are created together or not at all.
+        # Duplicate usernames/emails are caught by the unique keys rather than a pre-check.
+        try:
+            with db_transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO users (username, email, password_hash, role, created_at, is_active)
+                    VALUES (%s, %s, %s, %s, NOW(), TRUE)
+                    """,
+                    (username, email, hashed_password_binary, role.value)
+                )
+                user_id = cursor.lastrowid
+
                 # Create initial profile based on new role
-                try:
-                    if role == UserRole.STUDENT:
-                        execute_query(
-                            """
-                            INSERT INTO students (user_id, student_id, major, enrollment_date)
-                            VALUES (%s, %s, %s, NOW())
-                            """,
-                            (user_id, f"STU-{user_id:05d}", "Undeclared"), # Example default data
-                            fetch=False
-                        )
-                    elif role == UserRole.FACULTY:
-                        execute_query(
-                            """
-                            INSERT INTO faculty (user_id, faculty_id, department, title, hire_date)
-                            VALUES (%s, %s, %s, %s, NOW())
-                            """,
-                            (user_id, f"FAC-{user_id:05d}", "General", "Lecturer"), # Example default data
-                            fetch=False
-                        )
-                    # Admins do not get a separate profile table entry upon registration
-                    # (they are typically created by other admins or during setup)
-                except Exception as e:
-                    print(f"Error creating initial profile for {role.value} (user_id: {user_id}): {e}")
-                    # Consider rolling back the user creation if profile creation fails critically
-                    # For now, it will proceed with just the user table entry
-                    
+                if role == UserRole.STUDENT:
+                    cursor.execute(
+                        """
+                        INSERT INTO students (user_id, student_id, major, enrollment_date)
+                        VALUES (%s, %s, %s, NOW())
+                        """,
+                        (user_id, f"STU-{user_id:05d}", "Undeclared") # Example default data
+                    )
+                elif role == UserRole.FACULTY:
+                    cursor.execute(
+                        """
+                        INSERT INTO faculty (user_id, faculty_id, department, title, hire_date)
+                        VALUES (%s, %s, %s, %s, NOW())
+                        """,
+                        (user_id, f"FAC-{user_id:05d}", "General", "Lecturer") # Example default data
+                    )
+                # Admins do not get a separate profile table entry upon registration
             return True, "Account created successfully!"
-        else:
+        except mysql.connector.Error as e:
+            if e.errno == DUPLICATE_KEY_ERRNO:
+                return False, "Username or email already exists."
+            print(f"Error registering user {username}: {e}")
             return False, "Failed to create account."
     
     @staticmethod
@@ -142,6 +99,8 @@ class User:
             (username_or_email, username_or_email)
         )
         
+        if user_data_result is None and not is_server_available():
+            return User.login_offline(username_or_email, password)
         if not user_data_result:
             return None, "Invalid username or password."
         
@@ -150,6 +109,14 @@ class User:
 
         # Verify password using the secure method
         if User.verify_password(stored_hash_from_db, password):
+            if passwords.needs_rehash(stored_hash_from_db):
+                # Upgrade legacy / outdated-cost hashes while we have the plaintext
+                stored_hash_from_db = User.hash_password(password)
+                execute_query(
+                    "UPDATE users SET password_hash = %s WHERE user_id = %s",
+                    (stored_hash_from_db, user_data['user_id']),
+                    fetch=False
+                )
             user = User(
                 user_id=user_data['user_id'],
                 username=user_data['username'],
@@ -160,10 +127,67 @@ class User:
             user.is_authenticated = True
             if not user.is_active:
                 return None, "Your account is currently inactive. Please contact an administrator."
+            user.remember_offline(password_hash=stored_hash_from_db)
             return user, "Login successful."
         else:
             return None, "Invalid username or password." # Generic message for security
+
+    @staticmethod
+    def login_offline(username_or_email, password):
+        """Sign in against the identity remembered in the local snapshot (server unreachable)."""
+        snapshot = get_snapshot()
+        identity = snapshot.offline_identity(username_or_email, password) if snapshot else None
+        if not identity:
+            return None, ("The server is unreachable. Only the last student or faculty member who signed in "
+                          "on this computer can sign in offline.")
+        return User._from_identity(identity), "Signed in offline (read-only)."
+
+    @staticmethod
+    def _from_identity(identity):
+        user = User(identity['user_id'], identity['username'], identity['email'], identity['role'])
+        user.offline = True
+        return user
+
+    def remember_offline(self, password_hash=None, session_token=None):
+        """Let this user sign in to the local snapshot later without the server. Admins are not kept."""
+        snapshot = get_snapshot()
+        if snapshot is None or self.role == UserRole.ADMIN or self.offline:
+            return
+        try:
+            snapshot.remember_identity(self, password_hash, session_token)
+        except Exception as e:
+            print(f"Error remembering user for offline sign-in: {e}")
     
+    @staticmethod
+    def restore_session(token):
+        """Log in from a saved "Remember me" session token. Returns the User or None."""
+        user_data = sessions.restore_session(token)
+        if user_data is None and not is_server_available():
+            snapshot = get_snapshot()
+            identity = snapshot.offline_identity(session_token=token) if snapshot else None
+            return User._from_identity(identity) if identity else None
+        if not user_data or not user_data.get('is_active', True):
+            return None
+        user = User(
+            user_id=user_data['user_id'],
+            username=user_data['username'],
+            email=user_data['email'],
+            role=user_data['role'],
+            is_active=user_data.get('is_active', True)
+        )
+        user.is_authenticated = True
+        return user
+
+    @staticmethod
+    def login_async(username_or_email, password):
+        """Run login() on the hashing pool. Returns a Future resolving to (user, message)."""
+        return hashing.submit('login', User.login, username_or_email, password)
+
+    @staticmethod
+    def register_async(username, email, password, role):
+        """Run register() on the hashing pool. Returns a Future resolving to (success, message)."""
+        return hashing.submit('register', User.register, username, email, password, role)
+
     @staticmethod
     def get_by_id(user_id):
         """Retrieve a user by their ID."""
@@ -185,50 +209,62 @@ class User:
         )
     
     def get_profile(self):
-        """Get the user's profile data based on their role for SCNFBS."""
+        """Get the user's profile data (account plus student/faculty details) in one query."""
         if self._profile_data:
             return self._profile_data # Return cached data if available
 
-        profile_data = None
-        # Always fetch common user info first
-        user_common_info = execute_query("SELECT username, email FROM users WHERE user_id = %s", (self.user_id,))
-        if user_common_info:
-            profile_data = user_common_info[0]
-        else:
+        result = execute_query(
+            """
+            SELECT u.username, u.email,
+                   s.student_id, s.major, s.enrollment_date,
+                   f.faculty_id, f.department, f.title, f.hire_date
+            FROM users u
+            LEFT JOIN students s ON s.user_id = u.user_id
+            LEFT JOIN faculty f ON f.user_id = u.user_id
+            WHERE u.user_id = %s
+            """,
+            (self.user_id,)
+        )
+        if not result:
             return {} # Should not happen if user object is valid
 
-        if self.role == UserRole.STUDENT:
-            student_profile = execute_query(
-                "SELECT student_id, major, enrollment_date FROM students WHERE user_id = %s",
-                (self.user_id,)
-            )
-            if student_profile:
-                profile_data.update(student_profile[0])
+        # Only keep the columns that belong to this role
+        profile_data = {key: value for key, value in result[0].items() if key in PROFILE_FIELDS[self.role]}
+        self._profile_data = profile_data # Cache the data
+        return self._profile_data
 
-        elif self.role == UserRole.FACULTY:
-            faculty_profile = execute_query(
-                "SELECT faculty_id, department, title, hire_date FROM faculty WHERE user_id = %s",
-                (self.user_id,)
-            )
-            if faculty_profile:
-                profile_data.update(faculty_profile[0])
+    def update_profile(self, **fields):
+        """Update account/profile fields (e.g. email, major, department, title) and drop the cached profile."""
+        allowed = PROFILE_FIELDS[self.role] - {'username', 'student_id', 'faculty_id'}
+        unknown = set(fields) - allowed
+        if unknown:
+            return False, f"Cannot update: {', '.join(sorted(unknown))}"
 
-        elif self.role == UserRole.ADMIN:
-            # Admins generally don't have separate profile tables with unique fields.
-            # Their profile is primarily their user account itself.
-            # You might have an 'admins' table for additional info if needed, but for now,
-            # we'll just use the common user info.
-            admin_profile = execute_query(
-                "SELECT admin_id FROM admins WHERE user_id = %s", # Assuming an admins table exists for consistency
-                (self.user_id,)
-            )
-            if admin_profile:
-                profile_data.update(admin_profile[0])
-            else: # If no entry in 'admins' table, just use basic user info
-                pass # profile_data already has username and email from common info
+        tables = {'users': {}, 'students': {}, 'faculty': {}}
+        for field, value in fields.items():
+            if field == 'email':
+                tables['users'][field] = value
+            else:
+                tables['students' if self.role == UserRole.STUDENT else 'faculty'][field] = value
 
-        self._profile_data = profile_data # Cache the data
-        return self._profile_data
+        try:
+            with db_transaction() as cursor:
+                for table, values in tables.items():
+                    if values:
+                        assignments = ", ".join(f"{column} = %s" for column in values)
+                        cursor.execute(f"UPDATE {table} SET {assignments} WHERE user_id = %s",
+                                       list(values.values()) + [self.user_id])
+        except mysql.connector.Error as e:
+            if e.errno == DUPLICATE_KEY_ERRNO:
+                return False, "That email is already in use."
+            print(f"Error updating profile: {e}")
+            return False, "Failed to update profile."
+        finally:
+            self._profile_data = None # Invalidate cached profile
+
+        if 'email' in fields:
+            self.email = fields['email']
+        return True, "Profile updated successfully."
     
     def update_password(self, current_password, new_password):
         """Update the user's password."""
@@ -258,6 +294,15 @@ class User:
         )
         
         if result is not None:
+            sessions.revoke_user_sessions(self.user_id)  # sign out remembered devices
+            # The offline copy follows: revoked token no longer accepted, new password is
+            snapshot = get_snapshot()
+            if snapshot is not None:
+                try:
+                    snapshot.forget_session()
+                except Exception as e:
+                    print(f"Error clearing offline session: {e}")
+            self.remember_offline(password_hash=new_password_hash)
             return True, "Password updated successfully."
         else:
             return False, "Failed to update password."
\ No newline at end of file
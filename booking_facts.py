@@ -0,0 +1,132 @@
+import argparse
+import os
+from datetime import timedelta
+from db_utils import db_transaction, named_lock
+from shard_router import get_router
+
+# Keeps booking_daily_facts - booking count and minutes per (day, facility, user,
+# status) over bookings_history - up to date for the Reports & Analytics pages.
+# Each run re-aggregates only the days that have a booking updated (updated_at)
+# or deleted (booking_tombstones) since the previous run's watermark; bookings
+# never move to another day, facility or user, so whole-day recomputes are exact.
+# A database without a watermark yet is backfilled a month at a time first.
+# The booking sweeper runs this after every sweep; the CLI can force a backfill.
+# Both run under the sweeper's named lock, so however many clients are open a
+# database is refreshed - and, after a long gap, backfilled - by one process only.
+#
+# Usage: python booking_facts.py [--backfill]
+
+# Re-read changes this far before the watermark, for transactions that committed late
+FACTS_OVERLAP_SECONDS = 5
+# How long the CLI waits for a running sweep to release the lock
+FACTS_LOCK_WAIT_SECONDS = 600
+
+_AGGREGATE = """
+    INSERT INTO booking_daily_facts (fact_date, facility_id, user_id, status, booking_count, booked_minutes)
+    SELECT DATE(start_time), COALESCE(facility_id, 0), COALESCE(user_id, 0), status,
+           COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)), 0)
+    FROM bookings_history
+    WHERE start_time >= %s AND start_time < %s
+    GROUP BY DATE(start_time), COALESCE(facility_id, 0), COALESCE(user_id, 0), status
+"""
+
+
+def _rebuild_days(cursor, first_day, last_day):
+    """Recompute the facts for first_day..last_day (inclusive)."""
+    end = last_day + timedelta(days=1)
+    cursor.execute("DELETE FROM booking_daily_facts WHERE fact_date >= %s AND fact_date < %s", (first_day, end))
+    cursor.execute(_AGGREGATE, (first_day, end))
+
+
+def _set_watermark(cursor, watermark):
+    cursor.execute("""
+        INSERT INTO fact_refresh_state (name, watermark) VALUES ('booking_daily_facts', %s)
+        ON DUPLICATE KEY UPDATE watermark = VALUES(watermark)
+    """, (watermark,))
+
+
+def backfill_daily_facts(shard=None):
+    """Rebuild every day's facts, one month per transaction. Returns the number of months."""
+    with db_transaction(shard) as cursor:
+        cursor.execute("SELECT NOW() AS now, MIN(start_time) AS first_start, MAX(start_time) AS last_start FROM bookings_history")
+        row = cursor.fetchone()
+        watermark = row['now']
+        if row['first_start'] is not None:
+            # Days before the first booking or after the last can't have facts
+            cursor.execute("DELETE FROM booking_daily_facts WHERE fact_date < %s OR fact_date > %s",
+                           (row['first_start'].date(), row['last_start'].date()))
+    months = 0
+    if row['first_start'] is not None:
+        month = row['first_start'].date().replace(day=1)
+        last_day = row['last_start'].date()
+        while month <= last_day:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            with db_transaction(shard) as cursor:
+                _rebuild_days(cursor, month, next_month - timedelta(days=1))
+            months += 1
+            month = next_month
+    with db_transaction(shard) as cursor:
+        _set_watermark(cursor, watermark)
+    return months
+
+
+def refresh_daily_facts(shard=None):
+    """
+    Bring one database's facts up to date. Returns the number of days recomputed,
+    or None when it was backfilled instead: there was no watermark yet, or it is
+    older than the tombstones kept, so deletions may have been missed.
+    Callers hold the sweeper lock (see booking_sweeper.run_sweep).
+    """
+    from booking_sweeper import BOOKING_TOMBSTONE_HOURS
+    with db_transaction(shard) as cursor:
+        cursor.execute("""
+            SELECT watermark, watermark < NOW() - INTERVAL %s HOUR AS expired
+            FROM fact_refresh_state WHERE name = 'booking_daily_facts'
+        """, (BOOKING_TOMBSTONE_HOURS,))
+        state = cursor.fetchone()
+    if state is None or state['watermark'] is None or state['expired']:
+        backfill_daily_facts(shard)
+        return None
+
+    with db_transaction(shard) as cursor:
+        cursor.execute("SELECT NOW() AS now")
+        watermark = cursor.fetchone()['now']
+        since = state['watermark'] - timedelta(seconds=FACTS_OVERLAP_SECONDS)
+        cursor.execute("""
+            SELECT DISTINCT DATE(start_time) AS day FROM bookings WHERE updated_at >= %s
+            UNION
+            SELECT DISTINCT DATE(start_time) AS day FROM booking_tombstones WHERE deleted_at >= %s
+        """, (since, since))
+        days = sorted(row['day'] for row in cursor.fetchall())
+        for day in days:
+            _rebuild_days(cursor, day, day)
+        _set_watermark(cursor, watermark)
+    return len(days)
+
+
+def run_fact_refresh(backfill=False):
+    """Refresh (or, with backfill=True, rebuild) the facts on every campus database."""
+    from booking_sweeper import SWEEPER_LOCK
+    router = get_router()
+    shards = router.shards if router.is_sharded() else [None]
+    for shard in shards:
+        name = shard['name'] if shard else os.environ.get('DB_NAME')
+        try:
+            with named_lock(SWEEPER_LOCK, shard, FACTS_LOCK_WAIT_SECONDS) as acquired:
+                if not acquired:
+                    print(f"{name}: a sweep is still running, booking facts not refreshed")
+                    continue
+                if backfill:
+                    print(f"{name}: backfilled {backfill_daily_facts(shard)} months of booking facts")
+                else:
+                    refresh_daily_facts(shard)
+        except Exception as e:
+            print(f"Error refreshing booking facts for {name}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the daily booking facts used by the report pages")
+    parser.add_argument("--backfill", action="store_true", help="rebuild every day instead of only changed days")
+    args = parser.parse_args()
+    run_fact_refresh(args.backfill)
+    print("Booking facts are up to date")
@@ -0,0 +1,119 @@
+import argparse
+import os
+import threading
+from booking_facts import refresh_daily_facts
+from db_utils import db_transaction, named_lock, _invalidate_caches
+from shard_router import get_router
+
+# Marks Confirmed bookings whose end_time has passed as Completed, in batched
+# set-based UPDATEs (idx_bookings_status_end), so the dashboards never write
+# while rendering and admin status counts are right without anyone opening
+# "My Bookings". It also prunes booking_tombstones (deletions seen by the admin
+# delta refresh) older than BOOKING_TOMBSTONE_HOURS, after booking_facts has
+# folded the latest changes into booking_daily_facts. main.py runs it on a
+# background thread; for a headless setup schedule the CLI instead. Every open
+# client starts one, so each database is swept under the SWEEPER_LOCK named lock:
+# whichever process gets it does the work and the others skip that round.
+#
+# Usage: python booking_sweeper.py [--batch-size 5000]
+
+SWEEP_INTERVAL_SECONDS = int(os.environ.get('SWEEP_INTERVAL_SECONDS', '60'))
+SWEEP_BATCH_SIZE = int(os.environ.get('SWEEP_BATCH_SIZE', '5000'))
+BOOKING_TOMBSTONE_HOURS = int(os.environ.get('BOOKING_TOMBSTONE_HOURS', '24'))
+SWEEPER_LOCK = 'booking_sweeper'
+
+
+def sweep_completed_bookings(batch_size=SWEEP_BATCH_SIZE, shard=None):
+    """Complete every ended Confirmed booking on one database. Returns the number updated."""
+    updated = 0
+    while True:
+        with db_transaction(shard) as cursor:
+            # start_time < NOW() is implied by end_time < NOW() and lets MySQL prune future partitions
+            cursor.execute("""
+                UPDATE bookings SET status = 'Completed', updated_at = NOW()
+                WHERE status = 'Confirmed' AND end_time < NOW() AND start_time < NOW()
+                LIMIT %s
+            """, (batch_size,))
+            count = cursor.rowcount
+        updated += count
+        if count < batch_size:
+            return updated
+
+
+def prune_booking_tombstones(shard=None):
+    """Drop deletion records too old for any open admin view to still need."""
+    with db_transaction(shard) as cursor:
+        cursor.execute("DELETE FROM booking_tombstones WHERE deleted_at < NOW() - INTERVAL %s HOUR",
+                       (BOOKING_TOMBSTONE_HOURS,))
+        return cursor.rowcount
+
+
+def run_sweep(batch_size=SWEEP_BATCH_SIZE):
+    """Sweep every campus database. Returns the total number of bookings completed."""
+    router = get_router()
+
+    def sweep(shard):
+        name = shard['name'] if shard else os.environ.get('DB_NAME')
+        try:
+            with named_lock(SWEEPER_LOCK, shard) as acquired:
+                if not acquired:
+                    return 0  # another client is sweeping this database right now
+                try:
+                    completed = sweep_completed_bookings(batch_size, shard)
+                except Exception as e:
+                    print(f"Error sweeping bookings on {name}: {e}")
+                    return 0
+                try:
+                    refresh_daily_facts(shard)
+                    prune_booking_tombstones(shard)
+                except Exception as e:
+                    # Tombstones are kept until the facts have seen them
+                    print(f"Error refreshing booking facts on {name}: {e}")
+                return completed
+        except Exception as e:
+            print(f"Error taking the sweeper lock on {name}: {e}")
+            return 0
+
+    total = sum(count for _, count in router.scatter(sweep)) if router.is_sharded() else sweep(None)
+    if total:
+        _invalidate_caches('bookings')
+    return total
+
+
+class _SweeperThread(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='booking-sweeper', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            run_sweep()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_sweeper = None
+
+
+def start_sweeper(interval=SWEEP_INTERVAL_SECONDS):
+    """Run the sweep now and then every `interval` seconds on a background thread."""
+    global _sweeper
+    if _sweeper is None or not _sweeper.is_alive():
+        _sweeper = _SweeperThread(interval)
+        _sweeper.start()
+    return _sweeper
+
+
+def stop_sweeper():
+    if _sweeper is not None:
+        _sweeper.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mark ended Confirmed bookings as Completed")
+    parser.add_argument("--batch-size", type=int, default=SWEEP_BATCH_SIZE, help="bookings updated per statement")
+    args = parser.parse_args()
+    print(f"Marked {run_sweep(args.batch_size)} bookings as Completed")
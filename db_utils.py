@@ -2,8 +2,14 @@ import mysql.connector
 from dotenv import load_dotenv
 import os
 import platform
+import random
+import threading
+import time
 from datetime import datetime, timedelta
 import uuid # Needed for generating unique booking numbers
+from collections import namedtuple
+from contextlib import contextmanager
+from shard_router import get_router
 
 # Load environment variables from .env file first
 load_dotenv()
@@ -22,11 +28,149 @@ if 'DB_NAME' not in os.environ:
 # Flag to track if we've shown debug information in the current session
 _debug_shown = False
 
+# After a failed connection, don't hit the server again for this many seconds.
+# Reads fall back to the local snapshot (see local_snapshot.py) in the meantime.
+DB_RETRY_SECONDS = int(os.environ.get('DB_RETRY_SECONDS', '10'))
+_server_down_until = 0.0
+_server_online = True
+
+# Optional read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2:3307
+# Read-only statements go to a replica; writes, and reads shortly after a write
+# (read-your-writes), go to the primary DB_HOST.
+DB_REPLICA_HOSTS = [h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = int(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+DB_REPLICA_LAG_CHECK_SECONDS = int(os.environ.get('DB_REPLICA_LAG_CHECK_SECONDS', '5'))
+DB_READ_YOUR_WRITES_SECONDS = int(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', '5'))
+
+# replica host -> {'lag': seconds or None, 'checked_at': monotonic, 'down_until': monotonic}
+_replica_state = {host: {'lag': None, 'checked_at': 0.0, 'down_until': 0.0} for host in DB_REPLICA_HOSTS}
+_replica_lock = threading.Lock()  # _replica_state is shared by the GUI, scatter-gather and background threads
+_last_write_at = 0.0
+_route_metrics = {}
+_metrics_lock = threading.Lock()
+
+# Admin list pages: rows per page, and how long an approximate total count is reused.
+# Filtered counts stop at ROW_COUNT_CAP so a broad filter never scans the whole table.
+ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', '100'))
+ROW_COUNT_CACHE_SECONDS = int(os.environ.get('ROW_COUNT_CACHE_SECONDS', '60'))
+ROW_COUNT_CAP = 10000
+# Lists with at most this many rows are loaded whole and searched/filtered/sorted in memory
+CLIENT_FILTER_MAX_ROWS = int(os.environ.get('CLIENT_FILTER_MAX_ROWS', '5000'))
+
+# My Bookings: past and cancelled bookings are loaded this many at a time as the user scrolls
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '20'))
+# Longest a booking can last; bounds "has not ended yet" so it can use the (user_id, start_time) index
+MAX_BOOKING_HOURS = 24
+_row_count_cache = {}  # (table, where, params) -> (expires_at, count dict)
+_row_count_lock = threading.Lock()
+
 def reset_debug_state():
     """Reset the debug state - call this at the start of a new session"""
     global _debug_shown
     _debug_shown = False
 
+def is_server_available():
+    """Return False while we are backing off after a failed connection"""
+    return time.monotonic() >= _server_down_until
+
+def _mark_server_down():
+    """Start the retry back-off. Returns True if the server was considered online until now."""
+    global _server_down_until, _server_online
+    _server_down_until = time.monotonic() + DB_RETRY_SECONDS
+    was_online = _server_online
+    _server_online = False
+    return was_online
+
+def _mark_server_up():
+    global _server_down_until, _server_online
+    if not _server_online:
+        print("Database connection restored.")
+    _server_down_until = 0.0
+    _server_online = True
+
+def _record_route(route, elapsed, ok=True):
+    """Accumulate per-route query counts and latency for get_route_metrics()"""
+    with _metrics_lock:
+        metrics = _route_metrics.setdefault(route, {'queries': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        elapsed_ms = elapsed * 1000
+        metrics['queries'] += 1
+        metrics['total_ms'] += elapsed_ms
+        metrics['max_ms'] = max(metrics['max_ms'], elapsed_ms)
+        if not ok:
+            metrics['errors'] += 1
+
+def get_route_metrics():
+    """Return query counts, error counts and average/max latency per route"""
+    with _metrics_lock:
+        report = {}
+        for route, metrics in _route_metrics.items():
+            report[route] = dict(metrics)
+            report[route]['avg_ms'] = metrics['total_ms'] / metrics['queries'] if metrics['queries'] else 0.0
+        return report
+
+def _is_read_only(query):
+    """True for statements that are safe to send to a replica"""
+    statement = query.lstrip().upper()
+    if not statement.startswith(('SELECT', 'SHOW', 'WITH', 'EXPLAIN', 'DESCRIBE')):
+        return False
+    return 'FOR UPDATE' not in statement and 'LOCK IN SHARE MODE' not in statement
+
+def _choose_replica():
+    """Pick a replica for a read, or None if the read should go to the primary"""
+    if not DB_REPLICA_HOSTS:
+        return None
+    if time.monotonic() - _last_write_at < DB_READ_YOUR_WRITES_SECONDS:
+        _record_route('fallback_read_your_writes', 0)
+        return None
+
+    now = time.monotonic()
+    candidates = []
+    with _replica_lock:
+        for host, state in _replica_state.items():
+            if state['down_until'] > now:
+                continue
+            # A lag we haven't measured yet is checked on the connection we open next
+            lag_known = now - state['checked_at'] < DB_REPLICA_LAG_CHECK_SECONDS
+            if lag_known and (state['lag'] is None or state['lag'] > DB_REPLICA_MAX_LAG_SECONDS):
+                continue
+            candidates.append(host)
+
+    if not candidates:
+        _record_route('fallback_no_replica', 0)
+        return None
+    return random.choice(candidates)
+
+def _replica_is_current(host, connection):
+    """Measure replication lag (at most every DB_REPLICA_LAG_CHECK_SECONDS) and check it is acceptable"""
+    state = _replica_state[host]
+    with _replica_lock:
+        due = time.monotonic() - state['checked_at'] >= DB_REPLICA_LAG_CHECK_SECONDS
+    if due:
+        lag = None
+        cursor = connection.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+            status = cursor.fetchone()
+            if status:
+                lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        except mysql.connector.Error as err:
+            print(f"Error checking replication lag on {host}: {err}")
+        finally:
+            cursor.close()
+        with _replica_lock:
+            state['lag'] = lag
+            state['checked_at'] = time.monotonic()
+
+    with _replica_lock:
+        lag = state['lag']
+    if lag is None or lag > DB_REPLICA_MAX_LAG_SECONDS:
+        _record_route('fallback_replica_lag', 0)
+        return False
+    return True
+
 def get_connection_config():
     """Get database connection configuration based on platform"""
     config = {
@@ -88,10 +232,42 @@ def test_connection():
             print("  Database does not exist")
         return False
 
+def _get_replica_connection(host):
+    """Connect to a read replica; on failure take it out of rotation for DB_RETRY_SECONDS"""
+    try:
+        config = get_connection_config()
+        config['host'], _, port = host.partition(':')
+        if port:
+            config['port'] = int(port)
+        return mysql.connector.connect(**config)
+    except mysql.connector.Error as err:
+        print(f"ERROR - Replica {host} unavailable, using primary: {err}")
+        with _replica_lock:
+            _replica_state[host]['down_until'] = time.monotonic() + DB_RETRY_SECONDS
+        return None
+
+def _get_shard_connection(shard):
+    """Connect to a campus shard's database (and host, if the shard lives elsewhere)"""
+    try:
+        config = get_connection_config()
+        config['database'] = shard['database']
+        if shard.get('host'):
+            config['host'] = shard['host']
+        if shard.get('port'):
+            config['port'] = int(shard['port'])
+        return mysql.connector.connect(**config)
+    except mysql.connector.Error as err:
+        print(f"ERROR - Could not connect to shard {shard['name']}: {err}")
+        return None
+
 def get_db_connection():
     """Get database connection using platform-specific configuration"""
     global _debug_shown
 
+    # Don't retry (and re-print the same error) every refresh tick while the server is down
+    if not is_server_available():
+        return None
+
     try:
         config = get_connection_config()
 
@@ -108,23 +284,54 @@ def get_db_connection():
         if first_connection:
             print(f"DEBUG - Connection established successfully")
 
+        _mark_server_up()
         return connection
     except mysql.connector.Error as err:
-        print(f"ERROR - Database connection error: {err}")
-        if err.errno == mysql.connector.errorcode.ER_ACCESS_DENIED_ERROR:
-            print("ERROR - Check your username and password")
-        elif err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
-            print("ERROR - Database does not exist")
+        if _mark_server_down():
+            print(f"ERROR - Database connection error: {err}")
+            if err.errno == mysql.connector.errorcode.ER_ACCESS_DENIED_ERROR:
+                print("ERROR - Check your username and password")
+            elif err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
+                print("ERROR - Database does not exist")
+            print(f"ERROR - Serving reads from the local snapshot; retrying every {DB_RETRY_SECONDS}s")
         return None
     except Exception as e:
         print(f"ERROR - Unexpected error during connection: {e}")
         return None
 
-def execute_query(query, params=None, fetch=True):
+def _open_connection(query, fetch=True, use_primary=False, shard=None):
+    """
+    (connection, route) for a statement: the campus shard's database, a current replica
+    for reads, else the primary. The connection is None if none could be made.
+    """
+    if shard is not None and not get_router().is_home(shard):
+        return _get_shard_connection(shard), 'shard_read' if fetch else 'shard_write'
+    replica = _choose_replica() if fetch and not use_primary and _is_read_only(query) else None
+    if replica:
+        connection = _get_replica_connection(replica)
+        if connection and not _replica_is_current(replica, connection):
+            connection.close()
+            connection = None
+        if connection:
+            return connection, 'replica_read'
+    return get_db_connection(), 'primary_read' if fetch else 'primary_write'
+
+def execute_query(query, params=None, fetch=True, use_primary=False, shard=None):
+    """
+    Run a query and return the rows (fetch=True) or the last inserted id.
+    Read-only statements are routed to a replica when one is configured and
+    current; pass use_primary=True for reads that must see the latest writes.
+    `shard` (from shard_router) runs the query on that campus database.
+    """
+    global _last_write_at
+    started = time.perf_counter()
+    route = 'primary_read' if fetch else 'primary_write'
+    ok = False
     try:
-        connection = get_db_connection()
+        connection, route = _open_connection(query, fetch, use_primary, shard)
         if not connection:
-            print("Database connection failed. Check your database settings or server status.")
+            if _server_online and not route.startswith('shard'):
+                print("Database connection failed. Check your database settings or server status.")
             return None
 
         try:
@@ -140,7 +347,9 @@ def execute_query(query, params=None, fetch=True):
             else:
                 connection.commit()
                 result = cursor.lastrowid
+                _last_write_at = time.monotonic()
 
+            ok = True
             return result
         except mysql.connector.Error as err:
             error_msg = f"Error executing query: {err}"
@@ -156,12 +365,146 @@ def execute_query(query, params=None, fetch=True):
     except Exception as e:
         print(f"Database connection error: {e}")
         return None
+    finally:
+        _record_route(route, time.perf_counter() - started, ok)
+
+@contextmanager
+def db_transaction(shard=None):
+    """
+    Run several statements on one connection as a single transaction.
+    Yields a dictionary cursor; commits on success, rolls back and re-raises on error.
+    """
+    global _last_write_at
+    if shard is not None and not get_router().is_home(shard):
+        connection = _get_shard_connection(shard)
+    else:
+        connection = get_db_connection()
+    if not connection:
+        raise mysql.connector.Error(msg="Database connection failed")
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        yield cursor
+        connection.commit()
+        _last_write_at = time.monotonic()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+@contextmanager
+def named_lock(name, shard=None, timeout=0):
+    """
+    Hold a MySQL named lock (GET_LOCK) for the block so only one process on any
+    client runs a job against this database at a time. Yields True if acquired,
+    False if another process held it for longer than `timeout` seconds.
+    """
+    with db_transaction(shard) as cursor:
+        # Named locks are server-wide: scope them to the database so shards on one host don't collide
+        cursor.execute("SELECT GET_LOCK(CONCAT(%s, '.', DATABASE()), %s) AS acquired", (name, timeout))
+        acquired = bool(cursor.fetchone()['acquired'])
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cursor.execute("SELECT RELEASE_LOCK(CONCAT(%s, '.', DATABASE()))", (name,))
+                cursor.fetchall()
+
+def _shard_for_id(entity_id):
+    """The shard owning a building/facility/booking ID, or None when running unsharded"""
+    router = get_router()
+    return router.shard_for_id(entity_id) if router.is_sharded() else None
+
+def query_all_shards(query, params=None, sort_key=None, reverse=False):
+    """
+    Run a read on every campus shard in parallel and merge the rows (each tagged
+    with its 'campus'). Unsharded, this is just execute_query. Shards that fail
+    are skipped with a warning; returns None only if every shard failed.
+    """
+    router = get_router()
+    if not router.is_sharded():
+        return execute_query(query, params)
+
+    rows = []
+    failed = 0
+    for shard, result in router.scatter(lambda shard: execute_query(query, params, shard=shard)):
+        if result is None:
+            print(f"Warning: shard {shard['name']} did not respond, results are partial")
+            failed += 1
+            continue
+        for row in result:
+            row['campus'] = shard['name']
+        rows.extend(result)
+
+    if failed == len(router.shards):
+        return None
+    if sort_key:
+        rows.sort(key=lambda row: (row[sort_key] is None, row[sort_key]), reverse=reverse)
+    return rows
+
+def sum_all_shards(query, params=None):
+    """Run an aggregate (single row of numbers) on every shard and add the columns up"""
+    rows = query_all_shards(query, params)
+    if rows is None:
+        return None
+    totals = {}
+    for row in rows:
+        for key, value in row.items():
+            if key == 'campus':
+                continue
+            totals[key] = (totals.get(key) or 0) + (value or 0)
+    return totals
+
+def _snapshot_read(table, reader, user_id=None):
+    """
+    Serve a read from the local snapshot when it is fresh enough, or when the
+    server is unreachable and the snapshot has data. Returns None otherwise.
+    """
+    try:
+        from local_snapshot import get_snapshot
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return None
+        if snapshot.is_fresh(table, user_id):
+            return reader(snapshot)
+        if not is_server_available() and snapshot.has_data(table, user_id):
+            return reader(snapshot)
+    except Exception as e:
+        print(f"Error reading local snapshot: {e}")
+    return None
+
+def _invalidate_caches(*tables):
+    """
+    After a local write, stop serving `tables` from the snapshot until re-synced
+    and drop the in-memory catalog if buildings/facilities changed.
+    """
+    try:
+        from local_snapshot import get_snapshot
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            for table in tables:
+                snapshot.mark_stale(table)
+        if {'buildings', 'facilities'}.intersection(tables):
+            from repository import get_catalog
+            get_catalog().invalidate()
+        with _row_count_lock:
+            for key in [key for key in _row_count_cache if key[0] in tables]:
+                del _row_count_cache[key]
+    except Exception as e:
+        print(f"Error invalidating caches: {e}")
 
 # --- NEW FUNCTIONS FOR SCNFBS ---
 
 def search_buildings(search_term=None, campus_area=None):
     """Search for buildings on campus."""
     try:
+        reader = lambda snapshot: snapshot.search_buildings(search_term, campus_area)
+        local = _snapshot_read('buildings', reader)
+        if local is not None:
+            return local
+
         query = "SELECT * FROM buildings WHERE 1=1"
         params = []
 
@@ -175,18 +518,30 @@ def search_buildings(search_term=None, campus_area=None):
             params.append(f"%{campus_area}%")
 
         query += " ORDER BY name ASC"
-        return execute_query(query, params)
+        result = query_all_shards(query, params, sort_key='name')
+        if result is None:
+            return _snapshot_read('buildings', reader)
+        return result
     except Exception as e:
         print(f"Error searching buildings: {e}")
         return None
 
 def search_facilities(search_term=None, building_id=None, facility_type=None,
-                      capacity=None, min_capacity=None, max_capacity=None):
+                      capacity=None, min_capacity=None, max_capacity=None,
+                      bookable_only=False, eligible_role=None):
     """
     Search for facilities (rooms, labs, etc.) based on criteria.
     This replaces `search_menu_items`.
     """
     try:
+        reader = lambda snapshot: snapshot.search_facilities(
+            search_term, building_id, facility_type, capacity, min_capacity, max_capacity,
+            bookable_only, eligible_role
+        )
+        local = _snapshot_read('facilities', reader)
+        if local is not None:
+            return local
+
         query = """
         SELECT f.*, b.name as building_name
         FROM facilities f
@@ -195,6 +550,13 @@ def search_facilities(search_term=None, building_id=None, facility_type=None,
         """
         params = []
 
+        if bookable_only:
+            query += " AND f.is_bookable = TRUE"
+
+        if eligible_role:
+            query += " AND (f.booking_eligibility_role = %s OR f.booking_eligibility_role = 'any')"
+            params.append(eligible_role)
+
         if search_term:
             query += " AND (f.name LIKE %s OR f.description LIKE %s)"
             params.extend([f"%{search_term}%", f"%{search_term}%"])
@@ -219,7 +581,13 @@ def search_facilities(search_term=None, building_id=None, facility_type=None,
 
         query += " ORDER BY f.name ASC"
 
-        return execute_query(query, params)
+        if building_id:
+            result = execute_query(query, params, shard=_shard_for_id(building_id))
+        else:
+            result = query_all_shards(query, params, sort_key='name')
+        if result is None:
+            return _snapshot_read('facilities', reader)
+        return result
     except Exception as e:
         print(f"Error searching facilities: {e}")
         return None
@@ -239,7 +607,7 @@ def get_facility_availability(facility_id, check_date):
         ORDER BY start_time
         """
         params = (facility_id, check_date)
-        return execute_query(query, params)
+        return execute_query(query, params, shard=_shard_for_id(facility_id))
     except Exception as e:
         print(f"Error getting facility availability: {e}")
         return None
@@ -249,6 +617,8 @@ def create_booking(user_id, facility_id, start_time, end_time, purpose):
     Creates a new facility booking.
     """
     try:
+        shard = _shard_for_id(facility_id)
+
         # Check for booking conflicts before proceeding
         conflict_query = """
         SELECT booking_id FROM bookings
@@ -258,7 +628,8 @@ def create_booking(user_id, facility_id, start_time, end_time, purpose):
         AND status IN ('Confirmed', 'Pending Approval')
         """
         conflict_params = (facility_id, end_time, start_time)
-        conflicting_bookings = execute_query(conflict_query, conflict_params)
+        # Must see the latest bookings, so never served by a (possibly lagging) replica
+        conflicting_bookings = execute_query(conflict_query, conflict_params, use_primary=True, shard=shard)
 
         if conflicting_bookings:
             print("Error: Facility is already booked during this time.")
@@ -278,8 +649,9 @@ def create_booking(user_id, facility_id, start_time, end_time, purpose):
             'Confirmed', purpose
         )
 
-        booking_id = execute_query(insert_query, insert_params, fetch=False)
+        booking_id = execute_query(insert_query, insert_params, fetch=False, shard=shard)
         print(f"Booking {booking_number} created successfully for facility ID {facility_id}")
+        _invalidate_caches('bookings')
 
         # ✅ Fallback if booking_id is 0 or None
         if booking_id is None or booking_id == 0:
@@ -287,7 +659,7 @@ def create_booking(user_id, facility_id, start_time, end_time, purpose):
                 SELECT booking_id FROM bookings
                 WHERE user_id = %s AND facility_id = %s AND start_time = %s AND end_time = %s
                 ORDER BY booking_id DESC LIMIT 1
-            """, (user_id, facility_id, start_time, end_time))
+            """, (user_id, facility_id, start_time, end_time), use_primary=True, shard=shard)
 
             if latest_booking:
                 return latest_booking[0]['booking_id']
@@ -305,25 +677,50 @@ def cancel_booking(booking_id):
     """Allows a user to cancel a booking."""
     try:
         query = "UPDATE bookings SET status = 'Cancelled', updated_at = NOW() WHERE booking_id = %s"
-        result = execute_query(query, (booking_id,), fetch=False)
+        result = execute_query(query, (booking_id,), fetch=False, shard=_shard_for_id(booking_id))
+        _invalidate_caches('bookings')
         return result is not None # True if update was successful
     except Exception as e:
         print(f"Error cancelling booking: {e}")
         return False
 
-def get_user_bookings(user_id, status=None, start_date=None, end_date=None):
+def update_booking_status(booking_id, status):
+    """Sets a booking's status (admin approve/cancel/complete)."""
+    try:
+        query = "UPDATE bookings SET status = %s, updated_at = NOW() WHERE booking_id = %s"
+        result = execute_query(query, (status, booking_id), fetch=False, shard=_shard_for_id(booking_id))
+        _invalidate_caches('bookings')
+        return result is not None
+    except Exception as e:
+        print(f"Error updating booking status: {e}")
+        return False
+
+def get_booking(booking_id):
+    """Fetch a single booking row (IDs only) from its campus shard."""
+    try:
+        result = execute_query("SELECT * FROM bookings WHERE booking_id = %s", (booking_id,),
+                               shard=_shard_for_id(booking_id))
+        return result[0] if result else None
+    except Exception as e:
+        print(f"Error getting booking: {e}")
+        return None
+
+def get_user_bookings(user_id, status=None, start_date=None, end_date=None, facility_ids=None):
     """
     Retrieves all bookings for a specific user.
     This replaces `search_orders` for customer/user view.
+    Rows carry IDs only; resolve names with repository.get_catalog().attach_names().
     """
     try:
-        query = """
-        SELECT b.*, f.name as facility_name, bu.name as building_name
-        FROM bookings b
-        JOIN facilities f ON b.facility_id = f.facility_id
-        JOIN buildings bu ON f.building_id = bu.building_id
-        WHERE b.user_id = %s
-        """
+        if facility_ids is not None and not facility_ids:
+            return []  # search matched no facility
+
+        reader = lambda snapshot: snapshot.get_user_bookings(user_id, status, start_date, end_date, facility_ids)
+        local = _snapshot_read('bookings', reader, user_id)
+        if local is not None:
+            return local
+
+        query = "SELECT b.* FROM bookings b WHERE b.user_id = %s"
         params = [user_id]
 
         if status and status != "All":
@@ -331,60 +728,597 @@ def get_user_bookings(user_id, status=None, start_date=None, end_date=None):
             params.append(status)
 
         if start_date:
-            query += " AND DATE(b.start_time) >= %s"
+            query += " AND b.start_time >= %s"
             params.append(start_date)
 
         if end_date:
-            query += " AND DATE(b.end_time) <= %s"
+            query += " AND b.end_time < %s + INTERVAL 1 DAY"
             params.append(end_date)
 
+        if facility_ids:
+            query += f" AND b.facility_id IN ({', '.join(['%s'] * len(facility_ids))})"
+            params.extend(facility_ids)
+
         query += " ORDER BY b.start_time DESC"
-        return execute_query(query, params)
+        result = query_all_shards(query, params, sort_key='start_time', reverse=True)
+        if result is None:
+            return _snapshot_read('bookings', reader, user_id)
+        return result
     except Exception as e:
         print(f"Error getting user bookings: {e}")
         return None
 
+def get_user_upcoming_bookings(user_id):
+    """A user's bookings that have not ended yet (cancelled ones excluded), soonest first. IDs only."""
+    try:
+        reader = lambda snapshot: snapshot.get_user_upcoming_bookings(user_id, MAX_BOOKING_HOURS)
+        local = _snapshot_read('bookings', reader, user_id)
+        if local is not None:
+            return local
+
+        query = """
+            SELECT b.* FROM bookings b
+            WHERE b.user_id = %s AND b.status != 'Cancelled'
+              AND b.start_time >= NOW() - INTERVAL %s HOUR AND b.end_time >= NOW()
+            ORDER BY b.start_time
+        """
+        result = query_all_shards(query, (user_id, MAX_BOOKING_HOURS), sort_key='start_time')
+        if result is None:
+            return _snapshot_read('bookings', reader, user_id)
+        return result
+    except Exception as e:
+        print(f"Error getting upcoming bookings: {e}")
+        return None
+
+def get_user_booking_history(user_id, cancelled=False, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of a user's ended (or, with cancelled=True, cancelled) bookings, newest first.
+    `before` is the (start_time, booking_id) of the last row already shown.
+    Returns (rows, has_more) with IDs only, or (None, False) on error.
+    """
+    try:
+        reader = lambda snapshot: snapshot.get_user_booking_history(user_id, cancelled, before, limit + 1)
+        rows = _snapshot_read('bookings', reader, user_id)
+        if rows is None:
+            if cancelled:
+                query = "SELECT b.* FROM bookings b WHERE b.user_id = %s AND b.status = 'Cancelled'"
+                params = [user_id]
+            else:
+                query = """
+                    SELECT b.* FROM bookings b
+                    WHERE b.user_id = %s AND b.status != 'Cancelled' AND b.start_time < NOW() AND b.end_time < NOW()
+                """
+                params = [user_id]
+            if before:
+                query += " AND b.start_time <= %s AND (b.start_time < %s OR b.booking_id < %s)"
+                params.extend([before[0], before[0], before[1]])
+            query += " ORDER BY b.start_time DESC, b.booking_id DESC LIMIT %s"
+            params.append(limit + 1)  # one extra row tells us whether there is more
+            rows = query_all_shards(query, params)
+            if rows is None:
+                rows = _snapshot_read('bookings', reader, user_id)
+            if rows is None:
+                return None, False
+            rows.sort(key=lambda row: (row['start_time'], row['booking_id']), reverse=True)
+        return rows[:limit], len(rows) > limit
+    except Exception as e:
+        print(f"Error getting booking history: {e}")
+        return None, False
+
 def get_facility_usage_report(facility_id=None, start_date=None, end_date=None, facility_type=None):
     """
     Generates reports on facility usage. For Admin.
-    This replaces analytics/reporting in food delivery system.
+    Confirmed and Completed bookings per facility starting on start_date..end_date (inclusive),
+    most booked first, from booking_rollup (so archived bookings count too).
+    """
+    try:
+        from repository import get_catalog
+        rows = get_booking_rollup(start_date, end_date, facility_id, statuses=('Confirmed', 'Completed'))
+        if rows is None:
+            return None
+        catalog = get_catalog()
+        if facility_type:
+            of_type = {f.facility_id for f in catalog.facilities(facility_type=facility_type)}
+            rows = [row for row in rows if row['facility_id'] in of_type]
+        usage = aggregate_usage(rows, groupings=('facility',))
+        report = []
+        for fid, totals in usage['facility'].items():
+            facility = catalog.facility(fid)
+            if facility is None:
+                continue
+            report.append({
+                'facility_name': facility.name,
+                'facility_type': facility.type,
+                'building_name': facility.building_name,
+                'total_bookings': totals['total_bookings'],
+                'total_duration_minutes': totals['total_minutes'],
+                'avg_duration_minutes': totals['avg_minutes'],
+            })
+        report.sort(key=lambda row: row['total_bookings'], reverse=True)
+        return report
+    except Exception as e:
+        print(f"Error generating facility usage report: {e}")
+        return None
+
+def get_usernames(user_ids):
+    """Map user IDs to usernames/roles. Users live in the home database, so shard rows are joined here."""
+    try:
+        user_ids = list({uid for uid in user_ids if uid is not None})
+        if not user_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        rows = execute_query(f"SELECT user_id, username, role FROM users WHERE user_id IN ({placeholders})", user_ids)
+        return {row['user_id']: row for row in rows or []}
+    except Exception as e:
+        print(f"Error getting usernames: {e}")
+        return {}
+
+def get_booking_rollup(start_date=None, end_date=None, facility_id=None, statuses=None):
+    """
+    Rows of booking_rollup (fact_date, facility_id, status, booking_count, booked_minutes)
+    from every shard, ready for aggregate_usage(). The rollup is kept by triggers on
+    bookings and covers archived bookings too, i.e. the same rows as the bookings_history view.
     """
     try:
         query = """
-        SELECT
-            f.name AS facility_name,
-            f.type AS facility_type,
-            b.name AS building_name,
-            COUNT(bk.booking_id) AS total_bookings,
-            SUM(TIMESTAMPDIFF(MINUTE, bk.start_time, bk.end_time)) AS total_duration_minutes,
-            AVG(TIMESTAMPDIFF(MINUTE, bk.start_time, bk.end_time)) AS avg_duration_minutes
-        FROM bookings bk
-        JOIN facilities f ON bk.facility_id = f.facility_id
-        JOIN buildings b ON f.building_id = b.building_id
-        WHERE bk.status = 'Confirmed' OR bk.status = 'Completed'
+        SELECT booking_date AS fact_date, facility_id, status, booking_count, booked_minutes
+        FROM booking_rollup WHERE booking_count != 0
         """
         params = []
-
-        if facility_id:
-            query += " AND f.facility_id = %s"
-            params.append(facility_id)
-        if facility_type:
-            query += " AND f.type = %s"
-            params.append(facility_type)
         if start_date:
-            query += " AND bk.start_time >= %s"
+            query += " AND booking_date >= %s"
             params.append(start_date)
         if end_date:
-            query += " AND bk.end_time <= %s"
+            query += " AND booking_date <= %s"
             params.append(end_date)
+        if facility_id:
+            query += " AND facility_id = %s"
+            params.append(facility_id)
+        if statuses:
+            query += f" AND status IN ({', '.join(['%s'] * len(statuses))})"
+            params.extend(statuses)
+        return query_all_shards(query, params, sort_key='fact_date')
+    except Exception as e:
+        print(f"Error getting booking rollup: {e}")
+        return None
 
-        query += """
-        GROUP BY f.facility_id, f.name, f.type, b.name
-        ORDER BY total_bookings DESC
+FACT_DIMENSIONS = ('fact_date', 'facility_id', 'user_id', 'status')
+
+def get_booking_facts(start_date, end_date, group_by=(), user_id=None, statuses=None):
+    """
+    Booking count and minutes from booking_daily_facts for start_date..end_date (inclusive),
+    grouped by any of FACT_DIMENSIONS and merged across shards. Returns a list of dicts
+    with the group_by columns plus 'booking_count' and 'booked_minutes', or None on error.
+    """
+    try:
+        group_by = [column for column in group_by if column in FACT_DIMENSIONS]
+        columns = ''.join(f"{column}, " for column in group_by)
+        query = f"""
+        SELECT {columns}SUM(booking_count) AS booking_count, SUM(booked_minutes) AS booked_minutes
+        FROM booking_daily_facts WHERE fact_date BETWEEN %s AND %s
         """
-        return execute_query(query, params)
+        params = [start_date, end_date]
+        if user_id is not None:
+            query += " AND user_id = %s"
+            params.append(user_id)
+        if statuses:
+            query += f" AND status IN ({', '.join(['%s'] * len(statuses))})"
+            params.extend(statuses)
+        if group_by:
+            query += f" GROUP BY {', '.join(group_by)}"
+        rows = query_all_shards(query, params)
+        if rows is None:
+            return None
+
+        # A user's facts can be on several shards: add up rows with the same key
+        merged = {}
+        for row in rows:
+            key = tuple(row[column] for column in group_by)
+            totals = merged.setdefault(key, dict(zip(group_by, key), booking_count=0, booked_minutes=0))
+            totals['booking_count'] += int(row['booking_count'] or 0)
+            totals['booked_minutes'] += int(row['booked_minutes'] or 0)
+        return list(merged.values())
     except Exception as e:
-        print(f"Error generating facility usage report: {e}")
+        print(f"Error getting booking facts: {e}")
+        return None
+
+# --- Multi-dimensional usage rollup ---
+# Every grouping of a report is filled from one pass over the rows, booking_daily_facts
+# or booking_rollup rows. Hour-of-week occupancy needs the booking intervals and comes
+# from analytics.py instead.
+
+USAGE_GROUPINGS = ('facility', 'building', 'type', 'user', 'day', 'status')
+# Rows read per fetch while streaming a scan
+STREAM_BATCH_SIZE = 5000
+
+def _all_shards():
+    """Every campus shard, or [None] (the home database) when running unsharded."""
+    router = get_router()
+    return router.shards if router.is_sharded() else [None]
+
+def _stream_rows(query, params=None, shard=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield a read's rows a batch at a time from an unbuffered cursor instead of fetching them all.
+    Routed like execute_query (a current replica when there is one); raises on database errors.
+    """
+    connection, route = _open_connection(query, shard=shard)
+    if not connection:
+        raise mysql.connector.Error(msg="Database connection failed")
+    started = time.perf_counter()
+    ok = False
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+        ok = True
+    finally:
+        try:
+            cursor.close()
+        finally:
+            connection.close()
+            _record_route(route, time.perf_counter() - started, ok)
+
+def _usage_totals(bookings=0, minutes=0):
+    return {'total_bookings': bookings, 'total_minutes': minutes, 'avg_minutes': 0.0}
+
+def aggregate_usage(rows, statuses=None, groupings=USAGE_GROUPINGS):
+    """
+    Fold rows with facility_id, fact_date, status, booking_count, booked_minutes (and
+    user_id when present) into every grouping at once.
+    Returns {'total': totals, grouping: {key: totals}} where totals has total_bookings,
+    total_minutes and avg_minutes. Building and type keys come from the catalog.
+    """
+    from repository import get_catalog
+    catalog = get_catalog()
+    facilities = {}  # facility_id -> (building_id, type), looked up once per facility
+    result = {grouping: {} for grouping in groupings}
+    total = result['total'] = _usage_totals()
+
+    def add(grouping, key, count, minutes):
+        totals = result[grouping].get(key)
+        if totals is None:
+            totals = result[grouping][key] = _usage_totals()
+        totals['total_bookings'] += count
+        totals['total_minutes'] += minutes
+
+    for row in rows:
+        status = row['status']
+        if statuses and status not in statuses:
+            continue
+        count = int(row['booking_count'] or 0)
+        minutes = int(row['booked_minutes'] or 0)
+        facility_id = row['facility_id']
+        if facility_id not in facilities:
+            facility = catalog.facility(facility_id)
+            facilities[facility_id] = (facility.building_id, facility.type) if facility else (None, None)
+        building_id, facility_type = facilities[facility_id]
+
+        total['total_bookings'] += count
+        total['total_minutes'] += minutes
+        for grouping, key in (('facility', facility_id), ('building', building_id), ('type', facility_type),
+                              ('user', row.get('user_id')), ('day', row['fact_date']), ('status', status)):
+            if grouping in result and key is not None:
+                add(grouping, key, count, minutes)
+
+    for totals in [total] + [t for grouping in groupings for t in result[grouping].values()]:
+        if totals['total_bookings']:
+            totals['avg_minutes'] = totals['total_minutes'] / totals['total_bookings']
+    return result
+
+def stream_booking_intervals(start_date, end_date):
+    """
+    Yield facility_id, status, start_minute and end_minute of every booking starting on
+    start_date..end_date (inclusive), minutes counted from start_date 00:00, streamed shard by
+    shard for analytics.py. Raises on database errors.
+    """
+    query = """
+    SELECT COALESCE(facility_id, 0) AS facility_id, status,
+           TIMESTAMPDIFF(MINUTE, %s, start_time) AS start_minute,
+           TIMESTAMPDIFF(MINUTE, %s, end_time) AS end_minute
+    FROM bookings_history
+    WHERE start_time >= %s AND start_time < DATE_ADD(%s, INTERVAL 1 DAY)
+    """
+    params = (start_date, start_date, start_date, end_date)
+    for shard in _all_shards():
+        for row in _stream_rows(query, params, shard):
+            yield row
+
+def get_admin_summary():
+    """
+    Campus-wide counts for the admin dashboard. Booking figures come from booking_rollup,
+    the facility count from the catalog and the user count from the row count cache.
+    """
+    try:
+        from repository import get_catalog
+        users = _approximate_count('users', 'u', ["u.role IN ('student', 'faculty')"], [], all_shards=False)
+        today = sum_all_shards(
+            "SELECT SUM(booking_count) AS count FROM booking_rollup WHERE booking_date = CURDATE() AND status != 'Cancelled'"
+        )
+        # Ended bookings are Completed by the sweeper; both count as booked time
+        minutes = sum_all_shards(
+            "SELECT SUM(booked_minutes) AS total FROM booking_rollup WHERE status IN ('Confirmed', 'Completed')"
+        )
+        return {
+            'facility_count': len(get_catalog().facilities()),
+            'user_count': users['count'] if users else 0,
+            'user_count_capped': bool(users and users['capped']),
+            'today_bookings': int(today['count'] or 0) if today else 0,
+            'total_booking_hours': float(minutes['total'] or 0) / 60 if minutes else 0.0,
+        }
+    except Exception as e:
+        print(f"Error getting admin summary: {e}")
+        return None
+
+def get_recent_bookings(limit=5, user_id=None):
+    """Most recently created bookings across all campuses (optionally for one user), with user and facility names."""
+    try:
+        from repository import get_catalog
+        query = """
+        SELECT bk.booking_id, bk.booking_number, bk.user_id, bk.facility_id,
+               bk.start_time, bk.end_time, bk.status, bk.created_at
+        FROM bookings bk
+        """
+        params = []
+        if user_id is not None:
+            query += " WHERE bk.user_id = %s"
+            params.append(user_id)
+        query += " ORDER BY bk.created_at DESC LIMIT %s"
+        params.append(limit)
+        bookings = query_all_shards(query, params, sort_key='created_at', reverse=True)
+        if bookings is None:
+            return None
+        return get_catalog().attach_names(bookings[:limit], include_users=user_id is None)
+    except Exception as e:
+        print(f"Error getting recent bookings: {e}")
+        return None
+
+# Student/faculty home page figures, shared by both dashboards
+DashboardStats = namedtuple('DashboardStats', [
+    'upcoming_bookings', 'past_bookings', 'total_booked_hours', 'total_facilities', 'recent_bookings'
+])
+
+def get_user_dashboard_stats(user_id, recent_limit=5):
+    """
+    Home page statistics for one user. The upcoming count is a window aggregate
+    carried on the rows of the recent-bookings list (one query per shard); past
+    bookings and booked hours also count archived bookings, so they don't drop when
+    archive_bookings.py moves old history out. Bookable facilities come from the catalog.
+    """
+    try:
+        from repository import get_catalog
+        query = """
+        SELECT bk.booking_id, bk.booking_number, bk.user_id, bk.facility_id,
+               bk.start_time, bk.end_time, bk.status, bk.created_at,
+               SUM(CASE WHEN bk.start_time >= NOW() AND bk.status = 'Confirmed' THEN 1 ELSE 0 END) OVER () AS upcoming_count
+        FROM bookings bk
+        WHERE bk.user_id = %s
+        ORDER BY bk.created_at DESC
+        LIMIT %s
+        """
+        rows = query_all_shards(query, (user_id, recent_limit), sort_key='created_at', reverse=True)
+        if rows is None:
+            return None
+
+        # Same rows as the bookings_history view, filtered on each side so both user indexes are used
+        history = sum_all_shards("""
+        SELECT SUM(CASE WHEN h.end_time < NOW() THEN 1 ELSE 0 END) AS past_count,
+               SUM(TIMESTAMPDIFF(MINUTE, h.start_time, h.end_time)) AS booked_minutes
+        FROM (
+            SELECT start_time, end_time FROM bookings
+            WHERE user_id = %s AND status IN ('Confirmed', 'Completed')
+            UNION ALL
+            SELECT start_time, end_time FROM bookings_archive
+            WHERE user_id = %s AND status IN ('Confirmed', 'Completed')
+        ) h
+        """, (user_id, user_id))
+        if history is None:
+            return None
+
+        # Every row of a shard carries that shard's upcoming count; add up one row per shard
+        totals = {}
+        for row in rows:
+            totals.setdefault(row.get('campus'), row)
+        catalog = get_catalog()
+        return DashboardStats(
+            upcoming_bookings=sum(int(row['upcoming_count'] or 0) for row in totals.values()),
+            past_bookings=int(history.get('past_count') or 0),
+            total_booked_hours=float(history.get('booked_minutes') or 0) / 60,
+            total_facilities=len(catalog.facilities(bookable_only=True)),
+            recent_bookings=catalog.attach_names(rows[:recent_limit]),
+        )
+    except Exception as e:
+        print(f"Error getting dashboard stats: {e}")
+        return None
+
+# --- Keyset-paginated admin lists ---
+# Pages are addressed by the sort key of the last row shown, never by OFFSET, so
+# page 500 costs the same index range scan as page 1.
+
+def _booking_filters(search_term=None, status=None, start_date=None, end_date=None):
+    """WHERE conditions and params for the admin bookings filters."""
+    conditions, params = [], []
+    if search_term:
+        from repository import get_catalog
+        catalog = get_catalog()
+        matches = ["bk.booking_number LIKE %s"]
+        params.append(f"%{search_term}%")
+        for column, ids in (("bk.user_id", catalog.user_ids_matching(search_term)),
+                            ("bk.facility_id", catalog.facility_ids_matching(search_term))):
+            if ids:
+                matches.append(f"{column} IN ({', '.join(['%s'] * len(ids))})")
+                params.extend(ids)
+        conditions.append(f"({' OR '.join(matches)})")
+    if status:
+        conditions.append("bk.status = %s")
+        params.append(status)
+    if start_date:
+        conditions.append("bk.start_time >= %s")
+        params.append(f"{start_date} 00:00:00")
+    if end_date:
+        conditions.append("bk.end_time <= %s")
+        params.append(f"{end_date} 23:59:59") # Include entire end day
+    return conditions, params
+
+def get_bookings_page(search_term=None, status=None, start_date=None, end_date=None, after=None, limit=ADMIN_PAGE_SIZE):
+    """
+    One page of bookings across all campuses, newest start_time first, with names attached.
+    `after` is the (start_time, booking_id) of the last row on the previous page.
+    Returns (rows, has_more), or (None, False) on error.
+    """
+    try:
+        from repository import get_catalog
+        conditions, params = _booking_filters(search_term, status, start_date, end_date)
+        if after:
+            # (start_time, booking_id) < after, written so the start_time index bounds the range
+            conditions.append("bk.start_time <= %s AND (bk.start_time < %s OR bk.booking_id < %s)")
+            params.extend([after[0], after[0], after[1]])
+        query = "SELECT bk.* FROM bookings bk"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY bk.start_time DESC, bk.booking_id DESC LIMIT %s"
+        params.append(limit + 1)  # one extra row tells us whether there is a next page
+
+        rows = query_all_shards(query, params)
+        if rows is None:
+            return None, False
+        # Each shard returned its own first page; merge them and keep the global first page
+        rows.sort(key=lambda row: (row['start_time'], row['booking_id']), reverse=True)
+        has_more = len(rows) > limit
+        return get_catalog().attach_names(rows[:limit], include_users=True), has_more
+    except Exception as e:
+        print(f"Error getting bookings page: {e}")
+        return None, False
+
+# Changes are re-read from this many seconds before the watermark, so a row whose
+# transaction committed after a later-stamped one (or a shard clock a little behind)
+# is still picked up. Re-reading a row is harmless: patches are idempotent.
+BOOKING_DELTA_OVERLAP_SECONDS = 5
+
+def get_bookings_watermark():
+    """Current database time (earliest across shards): the watermark for get_booking_changes()."""
+    try:
+        rows = query_all_shards("SELECT NOW() AS now")
+        return min(row['now'] for row in rows) if rows else None
+    except Exception as e:
+        print(f"Error getting bookings watermark: {e}")
+        return None
+
+def get_booking_changes(since, booking_ids=(), search_term=None, status=None, start_date=None, end_date=None):
+    """
+    Bookings inserted, updated or deleted since the watermark `since`.
+    Returns (changed, deleted_ids, watermark) or None on error. `changed` holds rows
+    that now match the admin filters, or are in `booking_ids` (the rows on screen),
+    each with 'matches' telling whether it still passes the filters and names attached.
+    Pass the returned watermark to the next call.
+    """
+    try:
+        from repository import get_catalog
+        watermark = get_bookings_watermark()
+        if watermark is None:
+            return None
+        since = since - timedelta(seconds=BOOKING_DELTA_OVERLAP_SECONDS)
+
+        conditions, params = _booking_filters(search_term, status, start_date, end_date)
+        matches = " AND ".join(conditions) or "TRUE"
+        wanted = f"({matches})"
+        wanted_params = list(params)
+        if booking_ids:
+            wanted += f" OR bk.booking_id IN ({', '.join(['%s'] * len(booking_ids))})"
+            wanted_params.extend(booking_ids)
+        changed = query_all_shards(
+            f"SELECT bk.*, ({matches}) AS matches FROM bookings bk WHERE bk.updated_at >= %s AND ({wanted})",
+            params + [since] + wanted_params
+        )
+        deleted = query_all_shards("SELECT booking_id FROM booking_tombstones WHERE deleted_at >= %s", (since,))
+        if changed is None or deleted is None:
+            return None
+        return (get_catalog().attach_names(changed, include_users=True),
+                {row['booking_id'] for row in deleted}, watermark)
+    except Exception as e:
+        print(f"Error getting booking changes: {e}")
+        return None
+
+def get_users_page(role=None, created_after=None, after=None, limit=ADMIN_PAGE_SIZE):
+    """
+    One page of users, newest first. `after` is the (created_at, user_id) of the
+    last row on the previous page. Returns (rows, has_more), or (None, False) on error.
+    """
+    try:
+        conditions, params = _user_filters(role, created_after)
+        if after:
+            conditions.append("created_at <= %s AND (created_at < %s OR user_id < %s)")
+            params.extend([after[0], after[0], after[1]])
+        query = "SELECT user_id, username, email, role, created_at, last_login, is_active FROM users"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, user_id DESC LIMIT %s"
+        params.append(limit + 1)
+        rows = execute_query(query, params)
+        if rows is None:
+            return None, False
+        return rows[:limit], len(rows) > limit
+    except Exception as e:
+        print(f"Error getting users page: {e}")
+        return None, False
+
+def _user_filters(role=None, created_after=None):
+    conditions, params = [], []
+    if role:
+        conditions.append("role = %s")
+        params.append(role)
+    if created_after:
+        conditions.append("created_at >= %s")
+        params.append(created_after)
+    return conditions, params
+
+def _approximate_count(table, alias, conditions, params, all_shards):
+    """
+    Row count for a list page, cached for ROW_COUNT_CACHE_SECONDS. Unfiltered tables use
+    the InnoDB statistics estimate; filtered counts stop at ROW_COUNT_CAP.
+    Returns {'count', 'estimate', 'capped'} or None.
+    """
+    key = (table, tuple(conditions), tuple(params))
+    with _row_count_lock:
+        cached = _row_count_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    if conditions:
+        query = (f"SELECT COUNT(*) AS count FROM (SELECT 1 FROM {table} {alias} WHERE {' AND '.join(conditions)} "
+                 f"LIMIT {ROW_COUNT_CAP}) capped")
+    else:
+        query = ("SELECT TABLE_ROWS AS count FROM information_schema.TABLES "
+                 f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}'")
+    totals = sum_all_shards(query, params) if all_shards else (execute_query(query, params) or [None])[0]
+    if totals is None:
+        return None
+    count = int(totals['count'] or 0)
+    result = {'count': count, 'estimate': not conditions, 'capped': bool(conditions) and count >= ROW_COUNT_CAP}
+    with _row_count_lock:
+        _row_count_cache[key] = (time.monotonic() + ROW_COUNT_CACHE_SECONDS, result)
+    return result
+
+def count_bookings(search_term=None, status=None, start_date=None, end_date=None):
+    """Approximate number of bookings matching the admin filters (see _approximate_count)."""
+    try:
+        conditions, params = _booking_filters(search_term, status, start_date, end_date)
+        return _approximate_count('bookings', 'bk', conditions, params, all_shards=True)
+    except Exception as e:
+        print(f"Error counting bookings: {e}")
+        return None
+
+def count_users(role=None, created_after=None):
+    """Approximate number of users matching the admin filters (see _approximate_count)."""
+    try:
+        conditions, params = _user_filters(role, created_after)
+        return _approximate_count('users', 'u', conditions, params, all_shards=False)
+    except Exception as e:
+        print(f"Error counting users: {e}")
         return None
 
 def search_map_paths(start_point_desc, end_point_desc, is_accessible=None):
@@ -393,6 +1327,11 @@ def search_map_paths(start_point_desc, end_point_desc, is_accessible=None):
     This is a new core navigation function.
     """
     try:
+        reader = lambda snapshot: snapshot.search_map_paths(start_point_desc, end_point_desc, is_accessible)
+        local = _snapshot_read('map_paths', reader)
+        if local is not None:
+            return local
+
         # This is a simplified search. A real map system would involve complex graph traversal.
         # Here we assume start_point_desc and end_point_desc directly map to 'start_point'/'end_point'
         # in the map_paths table or are used to find relevant building/facility coordinates.
@@ -404,21 +1343,27 @@ def search_map_paths(start_point_desc, end_point_desc, is_accessible=None):
             params.append(is_accessible)
 
         query += " ORDER BY distance_meters ASC"
-        return execute_query(query, params)
+        result = execute_query(query, params)
+        if result is None:
+            return _snapshot_read('map_paths', reader)
+        return result
     except Exception as e:
         print(f"Error searching map paths: {e}")
         return None
 
 # --- Admin-specific functions to manage data ---
-def add_building(name, address, description=None, latitude=None, longitude=None):
-    """Adds a new building to the database."""
+def add_building(name, address, description=None, latitude=None, longitude=None, campus=None):
+    """Adds a new building to the database (in the given campus shard, if sharded)."""
     try:
+        shard = get_router().shard_for_campus(campus) if campus else None
         query = """
         INSERT INTO buildings (name, address, description, latitude, longitude)
         VALUES (%s, %s, %s, %s, %s)
         """
         params = (name, address, description, latitude, longitude)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False, shard=shard)
+        _invalidate_caches('buildings')
+        return result
     except Exception as e:
         print(f"Error adding building: {e}")
         return None
@@ -450,16 +1395,28 @@ def update_building(building_id, name=None, address=None, description=None, lati
 
         query = f"UPDATE buildings SET {', '.join(updates)}, updated_at = NOW() WHERE building_id = %s"
         params.append(building_id)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False, shard=_shard_for_id(building_id))
+        _invalidate_caches('buildings')
+        return result
     except Exception as e:
         print(f"Error updating building: {e}")
         return None
 
 def delete_building(building_id):
-    """Deletes a building and its associated facilities."""
+    """Deletes a building and its associated facilities and bookings."""
     try:
-        query = "DELETE FROM buildings WHERE building_id = %s"
-        return execute_query(query, (building_id,), fetch=False)
+        with db_transaction(_shard_for_id(building_id)) as cursor:
+            # bookings is partitioned and can't have foreign keys, so its rows don't cascade
+            for table in ('bookings', 'bookings_archive'):
+                cursor.execute(f"""
+                    DELETE bk FROM {table} bk
+                    JOIN facilities f ON bk.facility_id = f.facility_id
+                    WHERE f.building_id = %s
+                """, (building_id,))
+            cursor.execute("DELETE FROM buildings WHERE building_id = %s", (building_id,))
+            result = cursor.rowcount
+        _invalidate_caches('bookings', 'buildings', 'facilities')
+        return result
     except Exception as e:
         print(f"Error deleting building: {e}")
         return None
@@ -475,7 +1432,9 @@ def add_facility(building_id, name, facility_type, capacity, description=None,
         """
         params = (building_id, name, facility_type, capacity, description,
                   is_bookable, booking_eligibility_role, image_url, location_description)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False, shard=_shard_for_id(building_id))
+        _invalidate_caches('facilities')
+        return result
     except Exception as e:
         print(f"Error adding facility: {e}")
         return None
@@ -518,22 +1477,57 @@ def update_facility(facility_id, building_id=None, name=None, facility_type=None
             print("No updates provided for facility.")
             return None
 
+        shard = _shard_for_id(facility_id)
+        if building_id and shard is not _shard_for_id(building_id):
+            print("Error updating facility: moving a facility to another campus is not supported.")
+            return None
+
         query = f"UPDATE facilities SET {', '.join(updates)}, updated_at = NOW() WHERE facility_id = %s"
         params.append(facility_id)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False, shard=shard)
+        _invalidate_caches('facilities')
+        return result
     except Exception as e:
         print(f"Error updating facility: {e}")
         return None
 
 def delete_facility(facility_id):
-    """Deletes a facility."""
+    """Deletes a facility and its bookings."""
     try:
-        query = "DELETE FROM facilities WHERE facility_id = %s"
-        return execute_query(query, (facility_id,), fetch=False)
+        with db_transaction(_shard_for_id(facility_id)) as cursor:
+            # bookings is partitioned and can't have foreign keys, so its rows don't cascade
+            cursor.execute("DELETE FROM bookings WHERE facility_id = %s", (facility_id,))
+            cursor.execute("DELETE FROM bookings_archive WHERE facility_id = %s", (facility_id,))
+            cursor.execute("DELETE FROM facilities WHERE facility_id = %s", (facility_id,))
+            result = cursor.rowcount
+        _invalidate_caches('bookings', 'facilities')
+        return result
     except Exception as e:
         print(f"Error deleting facility: {e}")
         return None
 
+def delete_user(user_id):
+    """Deletes a user and all of their bookings (on every campus)."""
+    try:
+        def delete_user_bookings(shard):
+            with db_transaction(shard) as cursor:
+                cursor.execute("DELETE FROM bookings WHERE user_id = %s", (user_id,))
+                cursor.execute("DELETE FROM bookings_archive WHERE user_id = %s", (user_id,))
+            return True
+
+        router = get_router()
+        if router.is_sharded():
+            router.scatter(delete_user_bookings)
+        else:
+            delete_user_bookings(None)
+        result = execute_query("DELETE FROM users WHERE user_id = %s", (user_id,), fetch=False)
+        from repository import get_catalog
+        get_catalog().forget_user(user_id)
+        return result
+    except Exception as e:
+        print(f"Error deleting user: {e}")
+        return None
+
 def add_booking_rule(facility_type, max_booking_duration_minutes, min_booking_advance_hours,
                       max_concurrent_bookings_per_user, can_recur, applies_to_roles):
     """Adds a new booking rule for a facility type."""
@@ -545,7 +1539,9 @@ def add_booking_rule(facility_type, max_booking_duration_minutes, min_booking_ad
         """
         params = (facility_type, max_booking_duration_minutes, min_booking_advance_hours,
                   max_concurrent_bookings_per_user, can_recur, applies_to_roles)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False)
+        _invalidate_caches('booking_rules')
+        return result
     except Exception as e:
         print(f"Error adding booking rule: {e}")
         return None
@@ -553,8 +1549,16 @@ def add_booking_rule(facility_type, max_booking_duration_minutes, min_booking_ad
 def get_booking_rule(facility_type):
     """Retrieves booking rules for a specific facility type."""
     try:
+        reader = lambda snapshot: snapshot.get_booking_rule(facility_type)
+        local = _snapshot_read('booking_rules', reader)
+        if local is not None:
+            return local
+
         query = "SELECT * FROM booking_rules WHERE facility_type = %s"
-        return execute_query(query, (facility_type,))
+        result = execute_query(query, (facility_type,))
+        if result is None:
+            return _snapshot_read('booking_rules', reader)
+        return result
     except Exception as e:
         print(f"Error getting booking rule: {e}")
         return None
@@ -587,7 +1591,9 @@ def update_booking_rule(rule_id, max_booking_duration_minutes=None, min_booking_
 
         query = f"UPDATE booking_rules SET {', '.join(updates)} WHERE rule_id = %s"
         params.append(rule_id)
-        return execute_query(query, params, fetch=False)
+        result = execute_query(query, params, fetch=False)
+        _invalidate_caches('booking_rules')
+        return result
     except Exception as e:
         print(f"Error updating booking rule: {e}")
         return None
@@ -596,7 +1602,9 @@ def delete_booking_rule(rule_id):
     """Deletes a booking rule."""
     try:
         query = "DELETE FROM booking_rules WHERE rule_id = %s"
-        return execute_query(query, (rule_id,), fetch=False)
+        result = execute_query(query, (rule_id,), fetch=False)
+        _invalidate_caches('booking_rules')
+        return result
     except Exception as e:
         print(f"Error deleting booking rule: {e}")
         return None
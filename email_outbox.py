@@ -0,0 +1,229 @@
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from db_utils import execute_query, db_transaction
+
+# Outgoing email goes through the email_outbox table instead of being sent from
+# the GUI thread. enqueue_email() is a single INSERT; a background sender claims
+# pending rows in batches, sends them over one persistent SMTP connection and
+# retries failures with exponential back-off. Several app instances can run
+# senders at once: rows are claimed with FOR UPDATE SKIP LOCKED.
+#
+# Point SMTP_HOST/SMTP_PORT at a local stand-in (e.g. `python -m aiosmtpd -n`)
+# with SMTP_STARTTLS=false and no SMTP_USER for testing.
+#
+# Usage: python email_outbox.py   (send everything that is due, then exit)
+
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USER = os.environ.get('SMTP_USER', '')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+SMTP_SENDER = os.environ.get('SMTP_SENDER', '') or SMTP_USER
+SMTP_TIMEOUT_SECONDS = int(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '20'))
+OUTBOX_POLL_SECONDS = int(os.environ.get('OUTBOX_POLL_SECONDS', '15'))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', '30'))
+OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('OUTBOX_RETRY_MAX_SECONDS', '3600'))
+# Close the SMTP connection after this long without mail
+OUTBOX_IDLE_SECONDS = int(os.environ.get('OUTBOX_IDLE_SECONDS', '60'))
+# A 'sending' row older than this belongs to a sender that died; make it pending again
+OUTBOX_CLAIM_TIMEOUT_SECONDS = 600
+
+
+def enqueue_email(recipient, subject, body):
+    """Queue an email for background delivery. Returns True if it was queued."""
+    try:
+        result = execute_query(
+            "INSERT INTO email_outbox (recipient, subject, body) VALUES (%s, %s, %s)",
+            (recipient, subject, body),
+            fetch=False
+        )
+        if result is None:
+            return False
+        if _sender is not None:
+            _sender.wake()
+        return True
+    except Exception as e:
+        print(f"Error queueing email: {e}")
+        return False
+
+
+def _retry_delay(attempts):
+    return min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+class OutboxSender:
+    def __init__(self):
+        self._smtp = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- SMTP connection ---
+
+    def _connection(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self._close()
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self._smtp = smtp
+        return smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    # --- Outbox rows ---
+
+    def _claim_batch(self):
+        """Mark up to OUTBOX_BATCH_SIZE due rows as 'sending' and return them."""
+        with db_transaction() as cursor:
+            cursor.execute("""
+                SELECT outbox_id, recipient, subject, body, attempts FROM email_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'sending' AND claimed_at < NOW() - INTERVAL %s SECOND)
+                ORDER BY outbox_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (OUTBOX_CLAIM_TIMEOUT_SECONDS, OUTBOX_BATCH_SIZE))
+            rows = cursor.fetchall()
+            if rows:
+                placeholders = ", ".join(["%s"] * len(rows))
+                cursor.execute(
+                    f"UPDATE email_outbox SET status = 'sending', claimed_at = NOW() WHERE outbox_id IN ({placeholders})",
+                    [row['outbox_id'] for row in rows]
+                )
+        return rows
+
+    def _mark_sent(self, outbox_ids):
+        placeholders = ", ".join(["%s"] * len(outbox_ids))
+        execute_query(
+            f"UPDATE email_outbox SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE outbox_id IN ({placeholders})",
+            outbox_ids, fetch=False
+        )
+
+    def _mark_failed(self, row, error):
+        attempts = row['attempts'] + 1
+        status = 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending'
+        execute_query(
+            """
+            UPDATE email_outbox
+            SET status = %s, attempts = %s, last_error = %s, next_attempt_at = NOW() + INTERVAL %s SECOND
+            WHERE outbox_id = %s
+            """,
+            (status, attempts, str(error)[:500], _retry_delay(attempts), row['outbox_id']),
+            fetch=False
+        )
+
+    def send_due(self):
+        """Send every due message, batch by batch. Returns the number sent."""
+        sent_total = 0
+        while not self._stop.is_set():
+            rows = self._claim_batch()
+            if not rows:
+                break
+            sent = []
+            connection_failed = False
+            for index, row in enumerate(rows):
+                message = EmailMessage()
+                message['From'] = SMTP_SENDER
+                message['To'] = row['recipient']
+                message['Subject'] = row['subject']
+                message.set_content(row['body'])
+                try:
+                    self._connection().send_message(message)
+                    self._last_used = time.monotonic()
+                    sent.append(row['outbox_id'])
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    self._mark_failed(row, e)  # this message only; the connection is fine
+                except (smtplib.SMTPException, OSError) as e:
+                    # Server unreachable / connection dropped: back off the rest of the batch too
+                    self._close()
+                    for pending in rows[index:]:
+                        self._mark_failed(pending, e)
+                    print(f"Email outbox: SMTP error, will retry: {e}")
+                    connection_failed = True
+                    break
+            if sent:
+                self._mark_sent(sent)
+                sent_total += len(sent)
+            # After a connection failure leave the other batches for the next cycle: claiming
+            # them now would reconnect (and time out) again and spend an attempt on every message
+            if connection_failed or len(rows) < OUTBOX_BATCH_SIZE:
+                break
+        return sent_total
+
+    # --- Background thread ---
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.send_due()
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+            if self._smtp is not None and time.monotonic() - self._last_used > OUTBOX_IDLE_SECONDS:
+                self._close()
+            self._wake.wait(OUTBOX_POLL_SECONDS)
+            self._wake.clear()
+        self._close()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+_sender = None
+
+
+def start_outbox_sender():
+    """Start the background sender (once per process). Returns None if no sender address is configured."""
+    global _sender
+    if not SMTP_SENDER:
+        print("Email outbox: SMTP_SENDER/SMTP_USER not set, queued emails will not be sent by this client.")
+        return None
+    if _sender is None:
+        _sender = OutboxSender()
+    _sender.start()
+    return _sender
+
+
+def stop_outbox_sender():
+    if _sender is not None:
+        _sender.stop()
+
+
+if __name__ == "__main__":
+    if not SMTP_SENDER:
+        print("Set SMTP_SENDER (or SMTP_USER) in .env first.")
+    else:
+        sender = OutboxSender()
+        try:
+            print(f"Sent {sender.send_due()} queued emails.")
+        finally:
+            sender._close()
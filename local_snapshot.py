@@ -0,0 +1,421 @@
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from auth.passwords import verify_password
+from auth.sessions import SESSION_DAYS
+from db_utils import execute_query, query_all_shards
+from shard_router import SHARDED_TABLES
+
+# Local on-disk copy of the read-mostly tables so catalog reads are served from
+# disk and the app can keep running read-only while the MySQL server is down.
+# The last student or faculty member to sign in is remembered too (password hash
+# and "Remember me" session), so they can sign in to that copy while offline.
+SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', 'true').lower() == 'true'
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', os.path.join('settings', 'local_snapshot.db'))
+SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get('SNAPSHOT_MAX_AGE_SECONDS', '120'))
+SNAPSHOT_SYNC_SECONDS = int(os.environ.get('SNAPSHOT_SYNC_SECONDS', '60'))
+
+# table -> (primary key, columns, watermark column or None for a full refresh)
+SNAPSHOT_TABLES = {
+    'buildings': ('building_id', [
+        'building_id', 'name', 'address', 'description', 'latitude', 'longitude',
+        'created_at', 'updated_at'
+    ], 'updated_at'),
+    'facilities': ('facility_id', [
+        'facility_id', 'building_id', 'name', 'type', 'capacity', 'description', 'is_bookable',
+        'booking_eligibility_role', 'image_url', 'location_description', 'created_at', 'updated_at'
+    ], 'updated_at'),
+    'booking_rules': ('rule_id', [
+        'rule_id', 'facility_type', 'max_booking_duration_minutes', 'min_booking_advance_hours',
+        'max_concurrent_bookings_per_user', 'can_recur', 'applies_to_roles'
+    ], None),
+    'map_paths': ('path_id', [
+        'path_id', 'start_point', 'end_point', 'path_data', 'distance_meters', 'duration_minutes',
+        'is_accessible', 'building_id', 'description', 'created_at'
+    ], 'created_at'),
+    'bookings': ('booking_id', [
+        'booking_id', 'user_id', 'facility_id', 'booking_number', 'start_time', 'end_time',
+        'status', 'purpose', 'created_at', 'updated_at', 'is_recurring'
+    ], 'updated_at'),
+}
+
+DATETIME_COLUMNS = {'created_at', 'updated_at', 'start_time', 'end_time'}
+
+
+def _to_sqlite(value):
+    """Convert a MySQL value into something sqlite3 can store."""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def _from_sqlite(row):
+    """Turn a sqlite3.Row into the same dict shape execute_query returns."""
+    result = dict(row)
+    for key in DATETIME_COLUMNS.intersection(result):
+        if result[key]:
+            result[key] = datetime.fromisoformat(result[key])
+    return result
+
+
+class LocalSnapshot:
+    def __init__(self, path=SNAPSHOT_PATH, max_age_seconds=SNAPSHOT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._sync_thread = None
+        self._stop_event = threading.Event()
+        self._stale_tables = set()
+        self._create_schema()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _create_schema(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, self._connect() as connection:
+            for table, (primary_key, columns, _) in SNAPSHOT_TABLES.items():
+                column_defs = ", ".join(
+                    f"{column} PRIMARY KEY" if column == primary_key else column for column in columns
+                )
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    table_name TEXT PRIMARY KEY,
+                    watermark TEXT,
+                    synced_at REAL,
+                    scope TEXT
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS offline_identity (
+                    user_id INTEGER PRIMARY KEY,
+                    username TEXT,
+                    email TEXT,
+                    role TEXT,
+                    password_hash BLOB,
+                    session_hash BLOB,
+                    saved_at REAL
+                )
+            """)
+
+    # --- Sync ---
+
+    def sync(self, user_id=None):
+        """Pull changes from the server for every table. Returns True if all tables synced."""
+        ok = True
+        for table in SNAPSHOT_TABLES:
+            if table == 'bookings' and user_id is None:
+                continue
+            try:
+                if not self._sync_table(table, user_id if table == 'bookings' else None):
+                    ok = False
+            except Exception as e:
+                print(f"Error syncing local snapshot table {table}: {e}")
+                ok = False
+        return ok
+
+    def _sync_table(self, table, user_id=None):
+        primary_key, columns, watermark_column = SNAPSHOT_TABLES[table]
+        scope = str(user_id) if user_id is not None else None
+        state = self._get_state(table)
+
+        # A different user's bookings must never be served from the snapshot
+        if state and state['scope'] != scope:
+            self._clear_table(table)
+            state = None
+
+        where, params = [], []
+        if user_id is not None:
+            where.append("user_id = %s")
+            params.append(user_id)
+
+        watermark = state['watermark'] if state and watermark_column else None
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        if watermark:
+            # >= because timestamps have second resolution; upserts absorb the overlap
+            query_where = where + [f"{watermark_column} >= %s"]
+            query_params = params + [watermark]
+        else:
+            query_where, query_params = where, params
+        if query_where:
+            query += " WHERE " + " AND ".join(query_where)
+
+        # Campus tables are spread over shards when sharding is configured
+        run_query = query_all_shards if table in SHARDED_TABLES else execute_query
+
+        rows = run_query(query, query_params)
+        if rows is None:
+            return False
+
+        # Incremental syncs cannot see deletes, so reconcile the key set as well
+        live_ids = None
+        if watermark:
+            id_query = f"SELECT {primary_key} FROM {table}"
+            if where:
+                id_query += " WHERE " + " AND ".join(where)
+            id_rows = run_query(id_query, params)
+            if id_rows is None:
+                return False
+            live_ids = {row[primary_key] for row in id_rows}
+
+        new_watermark = watermark
+        if watermark_column:
+            for row in rows:
+                value = _to_sqlite(row.get(watermark_column))
+                if value and (new_watermark is None or value > new_watermark):
+                    new_watermark = value
+
+        placeholders = ", ".join("?" for _ in columns)
+        with self._lock, self._connect() as connection:
+            if not watermark:
+                connection.execute(f"DELETE FROM {table}")
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                [tuple(_to_sqlite(row.get(column)) for column in columns) for row in rows]
+            )
+            if live_ids is not None:
+                local_ids = {r[0] for r in connection.execute(f"SELECT {primary_key} FROM {table}")}
+                removed = local_ids - live_ids
+                if removed:
+                    connection.executemany(
+                        f"DELETE FROM {table} WHERE {primary_key} = ?", [(i,) for i in removed]
+                    )
+            connection.execute(
+                "INSERT OR REPLACE INTO sync_state (table_name, watermark, synced_at, scope) VALUES (?, ?, ?, ?)",
+                (table, new_watermark, time.time(), scope)
+            )
+        self._stale_tables.discard(table)
+        return True
+
+    def _get_state(self, table):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT watermark, synced_at, scope FROM sync_state WHERE table_name = ?", (table,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _clear_table(self, table):
+        with self._lock, self._connect() as connection:
+            connection.execute(f"DELETE FROM {table}")
+            connection.execute("DELETE FROM sync_state WHERE table_name = ?", (table,))
+
+    def mark_stale(self, table):
+        """Stop serving `table` locally until the next successful sync (e.g. after a local write)."""
+        self._stale_tables.add(table)
+
+    def is_fresh(self, table, user_id=None):
+        if table in self._stale_tables:
+            return False
+        state = self._get_state(table)
+        if not state or state['synced_at'] is None:
+            return False
+        if table == 'bookings' and state['scope'] != str(user_id):
+            return False
+        return time.time() - state['synced_at'] <= self.max_age_seconds
+
+    def has_data(self, table=None, user_id=None):
+        """True if the snapshot has ever been synced (for `table`, or for the catalog as a whole)."""
+        tables = [table] if table else ['buildings', 'facilities']
+        for name in tables:
+            state = self._get_state(name)
+            if not state:
+                return False
+            if name == 'bookings' and state['scope'] != str(user_id):
+                return False
+        return True
+
+    def start_background_sync(self, user_id=None, interval_seconds=SNAPSHOT_SYNC_SECONDS):
+        """Keep the snapshot up to date from a daemon thread."""
+        self.stop_background_sync()
+        self._stop_event = threading.Event()
+
+        def run(stop_event):
+            while not stop_event.is_set():
+                self.sync(user_id)
+                stop_event.wait(interval_seconds)
+
+        self._sync_thread = threading.Thread(target=run, args=(self._stop_event,),
+                                             name="local-snapshot-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_background_sync(self):
+        if self._sync_thread:
+            self._stop_event.set()
+            self._sync_thread = None
+
+    # --- Offline sign-in ---
+
+    def remember_identity(self, user, password_hash=None, session_token=None):
+        """
+        Remember the signed-in user for offline sign-in. Only one identity is kept,
+        matching the bookings snapshot; fields passed as None keep their old value.
+        """
+        session_hash = hashlib.sha256(session_token.encode('ascii')).digest() if session_token else None
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM offline_identity WHERE user_id != ?", (user.user_id,))
+            connection.execute("""
+                INSERT INTO offline_identity (user_id, username, email, role, password_hash, session_hash, saved_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    username = excluded.username, email = excluded.email, role = excluded.role,
+                    password_hash = COALESCE(excluded.password_hash, password_hash),
+                    session_hash = COALESCE(excluded.session_hash, session_hash),
+                    saved_at = excluded.saved_at
+            """, (user.user_id, user.username, user.email, user.role.value,
+                  bytes(password_hash) if password_hash else None, session_hash, time.time()))
+
+    def forget_session(self):
+        """Stop accepting the remembered session offline (logout)."""
+        with self._lock, self._connect() as connection:
+            connection.execute("UPDATE offline_identity SET session_hash = NULL")
+
+    def offline_identity(self, username=None, password=None, session_token=None):
+        """
+        The remembered identity if it matches the session token, or the username (or
+        email) and password, and was last confirmed online within SESSION_DAYS. Else None.
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM offline_identity").fetchone()
+        if row is None or time.time() - row['saved_at'] > SESSION_DAYS * 86400:
+            return None
+        if session_token:
+            expected = hashlib.sha256(session_token.encode('ascii')).digest()
+            matches = row['session_hash'] is not None and hmac.compare_digest(bytes(row['session_hash']), expected)
+        else:
+            matches = (username in (row['username'], row['email']) and row['password_hash'] is not None
+                       and verify_password(bytes(row['password_hash']), password))
+        return dict(row) if matches else None
+
+    # --- Read path (mirrors the db_utils functions) ---
+
+    def _select(self, query, params=()):
+        with self._connect() as connection:
+            return [_from_sqlite(row) for row in connection.execute(query, params).fetchall()]
+
+    def search_buildings(self, search_term=None, campus_area=None):
+        query = "SELECT * FROM buildings WHERE 1=1"
+        params = []
+        if search_term:
+            query += " AND (name LIKE ? OR address LIKE ? OR description LIKE ?)"
+            params.extend([f"%{search_term}%"] * 3)
+        if campus_area:
+            query += " AND address LIKE ?"
+            params.append(f"%{campus_area}%")
+        query += " ORDER BY name ASC"
+        return self._select(query, params)
+
+    def search_facilities(self, search_term=None, building_id=None, facility_type=None,
+                          capacity=None, min_capacity=None, max_capacity=None,
+                          bookable_only=False, eligible_role=None):
+        query = """
+        SELECT f.*, b.name AS building_name
+        FROM facilities f
+        JOIN buildings b ON f.building_id = b.building_id
+        WHERE 1=1
+        """
+        params = []
+        if bookable_only:
+            query += " AND f.is_bookable = 1"
+        if eligible_role:
+            query += " AND (f.booking_eligibility_role = ? OR f.booking_eligibility_role = 'any')"
+            params.append(eligible_role)
+        if search_term:
+            query += " AND (f.name LIKE ? OR f.description LIKE ?)"
+            params.extend([f"%{search_term}%"] * 2)
+        if building_id:
+            query += " AND f.building_id = ?"
+            params.append(building_id)
+        if facility_type:
+            query += " AND f.type = ?"
+            params.append(facility_type)
+        if capacity:
+            query += " AND f.capacity = ?"
+            params.append(capacity)
+        if min_capacity:
+            query += " AND f.capacity >= ?"
+            params.append(min_capacity)
+        if max_capacity:
+            query += " AND f.capacity <= ?"
+            params.append(max_capacity)
+        query += " ORDER BY f.name ASC"
+        return self._select(query, params)
+
+    def get_booking_rule(self, facility_type):
+        return self._select("SELECT * FROM booking_rules WHERE facility_type = ?", (facility_type,))
+
+    def search_map_paths(self, start_point_desc, end_point_desc, is_accessible=None):
+        query = "SELECT * FROM map_paths WHERE start_point LIKE ? AND end_point LIKE ?"
+        params = [f"%{start_point_desc}%", f"%{end_point_desc}%"]
+        if is_accessible is not None:
+            query += " AND is_accessible = ?"
+            params.append(1 if is_accessible else 0)
+        query += " ORDER BY distance_meters ASC"
+        return self._select(query, params)
+
+    def get_user_bookings(self, user_id, status=None, start_date=None, end_date=None, facility_ids=None):
+        query = "SELECT * FROM bookings WHERE user_id = ?"
+        params = [user_id]
+        if status and status != "All":
+            query += " AND status = ?"
+            params.append(status)
+        if start_date:
+            query += " AND DATE(start_time) >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND DATE(end_time) <= ?"
+            params.append(str(end_date))
+        if facility_ids:
+            query += f" AND facility_id IN ({', '.join('?' for _ in facility_ids)})"
+            params.extend(facility_ids)
+        query += " ORDER BY start_time DESC"
+        return self._select(query, params)
+
+    def get_user_upcoming_bookings(self, user_id, max_booking_hours):
+        now = datetime.now()
+        return self._select(
+            "SELECT * FROM bookings WHERE user_id = ? AND status != 'Cancelled' AND start_time >= ? AND end_time >= ?"
+            " ORDER BY start_time",
+            (user_id, _to_sqlite(now - timedelta(hours=max_booking_hours)), _to_sqlite(now))
+        )
+
+    def get_user_booking_history(self, user_id, cancelled, before, limit):
+        if cancelled:
+            query = "SELECT * FROM bookings WHERE user_id = ? AND status = 'Cancelled'"
+            params = [user_id]
+        else:
+            query = "SELECT * FROM bookings WHERE user_id = ? AND status != 'Cancelled' AND end_time < ?"
+            params = [user_id, _to_sqlite(datetime.now())]
+        if before:
+            query += " AND (start_time < ? OR (start_time = ? AND booking_id < ?))"
+            params.extend([_to_sqlite(before[0]), _to_sqlite(before[0]), before[1]])
+        query += " ORDER BY start_time DESC, booking_id DESC LIMIT ?"
+        params.append(limit)
+        return self._select(query, params)
+
+
+_snapshot = None
+
+
+def get_snapshot():
+    """Return the process-wide snapshot, creating it on first use (None if disabled)."""
+    global _snapshot
+    if not SNAPSHOT_ENABLED:
+        return None
+    if _snapshot is None:
+        _snapshot = LocalSnapshot()
+    return _snapshot
@@ -4,6 +4,10 @@ from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QStackedWidget
 from PySide6.QtCore import Qt, QSize
 from PySide6.QtGui import QFont, QIcon
 from db_utils import test_connection, reset_debug_state
+from local_snapshot import get_snapshot
+from repository import reset_catalog
+from email_outbox import start_outbox_sender, stop_outbox_sender
+from booking_sweeper import start_sweeper, stop_sweeper
 
 # Assuming you have updated auth/user.py to include these roles
 from auth.user import User, UserRole
@@ -47,8 +51,9 @@ class MainApplication(QMainWindow):
         self.register_window.register_successful.connect(self.handle_login)
         self.register_window.switch_to_login.connect(lambda: self.stacked_widget.setCurrentWidget(self.login_window))
 
-        # Start with login window
+        # Start with login window, or go straight to the dashboard with a remembered session
         self.stacked_widget.setCurrentWidget(self.login_window)
+        self.login_window.restore_saved_session()
 
         # Center the window on the screen
         self.center_on_screen()
@@ -72,6 +77,12 @@ class MainApplication(QMainWindow):
 
         # Reset debug state for a new session
         reset_debug_state()
+        reset_catalog()  # fresh identity map per session
+
+        # Keep the local snapshot (catalog + this user's bookings) in sync for this session
+        snapshot = get_snapshot()
+        if snapshot:
+            snapshot.start_background_sync(user.user_id)
 
         # Create and show the appropriate dashboard based on user role
         # Updated roles and dashboard mappings for SCNFBS
@@ -94,6 +105,12 @@ class MainApplication(QMainWindow):
 
     def handle_logout(self):
         """Handle user logout by returning to login screen"""
+        snapshot = get_snapshot()
+        if snapshot:
+            snapshot.stop_background_sync()
+
+        self.login_window.end_session()
+
         # Get current widget and remove it from stacked widget
         current_widget = self.stacked_widget.currentWidget()
 
@@ -164,7 +181,19 @@ if __name__ == "__main__":
     """)
 
     # Test database connection
-    if not test_connection():
+    connected = test_connection()
+    snapshot = get_snapshot()
+    if not connected and snapshot and snapshot.has_data():
+        # Server unreachable, but we have a local copy of the catalog: start read-only
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setWindowTitle("Offline Mode")
+        msg.setText("Could not connect to the database server")
+        msg.setInformativeText("Campus data will be shown from the local snapshot in read-only mode. "
+                               "The last student or faculty member who signed in on this computer can sign in; "
+                               "bookings and other changes are unavailable until the server is reachable again.")
+        msg.exec()
+    elif not connected:
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Critical)
         msg.setWindowTitle("Database Error")
@@ -182,6 +211,13 @@ Please check the console output for more details.
         msg.exec()
         sys.exit(1)
 
+    # Deliver queued emails (booking confirmations etc.) and complete ended bookings in the background
+    if connected:
+        start_outbox_sender()
+        start_sweeper()
+    app.aboutToQuit.connect(stop_outbox_sender)
+    app.aboutToQuit.connect(stop_sweeper)
+
     # Start the application
     main_app = MainApplication()
     main_app.show()
@@ -0,0 +1,431 @@
+import mysql.connector
+import os
+import sys
+from datetime import date
+from db_utils import get_connection_config
+from shard_router import get_router
+
+# Schema changes for databases created by setup_database.py. Each migration runs
+# once per database and is recorded in schema_migrations. Migrations with scope
+# 'all' touch campus tables (bookings etc.) and also run on every local shard;
+# 'home' migrations only run on DB_NAME.
+#
+# Usage: python migrate_database.py
+
+# Months of partitions to keep ahead of today; the archive job tops this up
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', '3'))
+
+BOOKING_COLUMNS = [
+    'booking_id', 'user_id', 'facility_id', 'booking_number', 'start_time', 'end_time',
+    'status', 'purpose', 'created_at', 'updated_at', 'is_recurring'
+]
+
+
+def _month_start(day, offset=0):
+    """First day of the month `offset` months after `day`'s month."""
+    month_index = day.year * 12 + (day.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_definition(month):
+    """Partition holding the month *before* `month` (VALUES LESS THAN is exclusive)."""
+    previous = _month_start(month, -1)
+    return f"PARTITION p{previous.strftime('%Y%m')} VALUES LESS THAN ('{month.isoformat()}')"
+
+
+def _index_columns(cursor, table, index):
+    """Columns of an index in order ([] if it doesn't exist)."""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ORDER BY SEQ_IN_INDEX
+    """, (table, index))
+    return [row['COLUMN_NAME'] for row in cursor.fetchall()]
+
+
+def partition_bookings_by_month(cursor):
+    """Range-partition bookings by start_time month so hot queries prune to recent partitions."""
+    # Each DDL statement commits on its own, so every step checks whether it is still
+    # needed: a run that failed partway can simply be run again.
+
+    # MySQL can't partition a table that has foreign keys, so the bookings -> users /
+    # facilities cascades are dropped; db_utils deletes dependent bookings explicitly.
+    cursor.execute("""
+        SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bookings' AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+    """)
+    for row in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE bookings DROP FOREIGN KEY {row['CONSTRAINT_NAME']}")
+
+    # Every unique key must include the partitioning column
+    changes = []
+    if _index_columns(cursor, 'bookings', 'PRIMARY') != ['booking_id', 'start_time']:
+        changes += ["DROP PRIMARY KEY", "ADD PRIMARY KEY (booking_id, start_time)"]
+    if _index_columns(cursor, 'bookings', 'booking_number'):
+        changes.append("DROP INDEX booking_number")
+    if not _index_columns(cursor, 'bookings', 'uq_booking_number'):
+        changes.append("ADD UNIQUE KEY uq_booking_number (booking_number, start_time)")
+    if not _index_columns(cursor, 'bookings', 'idx_bookings_facility_start'):
+        changes.append("ADD INDEX idx_bookings_facility_start (facility_id, start_time)")
+    if not _index_columns(cursor, 'bookings', 'idx_bookings_user_start'):
+        changes.append("ADD INDEX idx_bookings_user_start (user_id, start_time)")
+    if changes:
+        cursor.execute(f"ALTER TABLE bookings {', '.join(changes)}")
+
+    cursor.execute("""
+        SELECT COUNT(*) AS partitions FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bookings' AND PARTITION_NAME IS NOT NULL
+    """)
+    if cursor.fetchone()['partitions']:
+        return  # already partitioned
+
+    cursor.execute("SELECT MIN(start_time) AS first_start FROM bookings")
+    first_start = cursor.fetchone()['first_start']
+    today = date.today()
+    first_month = _month_start(first_start.date() if first_start else today)
+    last_month = _month_start(today, PARTITION_MONTHS_AHEAD)
+
+    partitions = []
+    month = _month_start(first_month, 1)
+    while month <= last_month:
+        partitions.append(_partition_definition(month))
+        month = _month_start(month, 1)
+    partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+
+    cursor.execute(f"ALTER TABLE bookings PARTITION BY RANGE COLUMNS(start_time) ({', '.join(partitions)})")
+
+
+def create_bookings_archive(cursor):
+    """Archive table for old Completed/Cancelled bookings, plus a view over both for history reports."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bookings_archive (
+            booking_id INT NOT NULL PRIMARY KEY,
+            user_id INT,
+            facility_id INT,
+            booking_number VARCHAR(50) NOT NULL,
+            start_time DATETIME NOT NULL,
+            end_time DATETIME NOT NULL,
+            status ENUM('Confirmed', 'Cancelled', 'Pending Approval', 'Completed'),
+            purpose TEXT,
+            created_at TIMESTAMP NULL,
+            updated_at TIMESTAMP NULL,
+            is_recurring BOOLEAN DEFAULT FALSE,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_archive_start (start_time),
+            INDEX idx_archive_user (user_id, start_time),
+            INDEX idx_archive_facility (facility_id, start_time)
+        )
+    """)
+    columns = ', '.join(BOOKING_COLUMNS)
+    cursor.execute(f"""
+        CREATE OR REPLACE VIEW bookings_history AS
+        SELECT {columns} FROM bookings
+        UNION ALL
+        SELECT {columns} FROM bookings_archive
+    """)
+
+
+def create_user_sessions(cursor):
+    """Server-side "Remember me" sessions (see auth/sessions.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            session_id INT AUTO_INCREMENT PRIMARY KEY,
+            selector VARCHAR(32) NOT NULL,
+            validator_hash BINARY(32) NOT NULL,
+            user_id INT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME NOT NULL,
+            revoked_at TIMESTAMP NULL,
+            UNIQUE KEY uq_session_selector (selector),
+            INDEX idx_sessions_user (user_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+    """)
+
+
+def create_user_profiles(cursor):
+    """Student/faculty profile tables used by User.register and User.get_profile."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            user_id INT PRIMARY KEY,
+            student_id VARCHAR(20) NOT NULL UNIQUE,
+            major VARCHAR(100),
+            enrollment_date DATE,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS faculty (
+            user_id INT PRIMARY KEY,
+            faculty_id VARCHAR(20) NOT NULL UNIQUE,
+            department VARCHAR(100),
+            title VARCHAR(100),
+            hire_date DATE,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+    """)
+    # Existing accounts get the same default profile registration creates
+    cursor.execute("""
+        INSERT IGNORE INTO students (user_id, student_id, major, enrollment_date)
+        SELECT user_id, CONCAT('STU-', LPAD(user_id, 5, '0')), 'Undeclared', DATE(created_at)
+        FROM users WHERE role = 'student'
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO faculty (user_id, faculty_id, department, title, hire_date)
+        SELECT user_id, CONCAT('FAC-', LPAD(user_id, 5, '0')), 'General', 'Lecturer', DATE(created_at)
+        FROM users WHERE role = 'faculty'
+    """)
+
+
+def create_email_outbox(cursor):
+    """Queue of outgoing emails drained by the background sender in email_outbox.py."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            outbox_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            recipient VARCHAR(255) NOT NULL,
+            subject VARCHAR(255) NOT NULL,
+            body TEXT NOT NULL,
+            status ENUM('pending', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            claimed_at TIMESTAMP NULL,
+            last_error VARCHAR(500),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP NULL,
+            INDEX idx_outbox_due (status, next_attempt_at)
+        )
+    """)
+
+
+def add_bookings_status_end_index(cursor):
+    """Index for the status sweeper: Confirmed bookings by end time."""
+    cursor.execute("ALTER TABLE bookings ADD INDEX idx_bookings_status_end (status, end_time)")
+
+
+def add_bookings_start_index(cursor):
+    """Index for the admin bookings list: keyset pages by (start_time, booking_id)."""
+    cursor.execute("ALTER TABLE bookings ADD INDEX idx_bookings_start (start_time, booking_id)")
+
+
+def add_users_created_index(cursor):
+    """Indexes for the admin users list: keyset pages by (created_at, user_id), optionally per role."""
+    cursor.execute("""
+        ALTER TABLE users
+            ADD INDEX idx_users_created (created_at, user_id),
+            ADD INDEX idx_users_role_created (role, created_at, user_id)
+    """)
+
+
+def create_booking_tombstones(cursor):
+    """
+    Delta refresh for the admin bookings view: index updated_at (set on insert and on
+    every update) and record deleted bookings in booking_tombstones via a trigger.
+    With binary logging on, creating the trigger needs SUPER or log_bin_trust_function_creators=1.
+    """
+    cursor.execute("ALTER TABLE bookings ADD INDEX idx_bookings_updated (updated_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS booking_tombstones (
+            booking_id INT NOT NULL,
+            start_time DATETIME NOT NULL,
+            deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_tombstones_deleted (deleted_at)
+        )
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS trg_bookings_tombstone")
+    cursor.execute("""
+        CREATE TRIGGER trg_bookings_tombstone AFTER DELETE ON bookings
+        FOR EACH ROW INSERT INTO booking_tombstones (booking_id, start_time) VALUES (OLD.booking_id, OLD.start_time)
+    """)
+
+
+def _rollup_upsert(row, sign):
+    """Statement adding (sign=1) or removing (sign=-1) one booking row (NEW/OLD) to booking_rollup."""
+    return f"""
+        INSERT INTO booking_rollup (booking_date, facility_id, status, booking_count, booked_minutes)
+        VALUES (DATE({row}.start_time), COALESCE({row}.facility_id, 0), {row}.status,
+                {sign}, {sign} * TIMESTAMPDIFF(MINUTE, {row}.start_time, {row}.end_time))
+        ON DUPLICATE KEY UPDATE booking_count = booking_count + VALUES(booking_count),
+                                booked_minutes = booked_minutes + VALUES(booked_minutes)
+    """
+
+
+def rebuild_booking_rollup(cursor):
+    """Recompute booking_rollup from bookings_history (live and archived bookings)."""
+    cursor.execute("DELETE FROM booking_rollup")
+    cursor.execute("""
+        INSERT INTO booking_rollup (booking_date, facility_id, status, booking_count, booked_minutes)
+        SELECT DATE(start_time), COALESCE(facility_id, 0), status,
+               COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)), 0)
+        FROM bookings_history
+        GROUP BY DATE(start_time), COALESCE(facility_id, 0), status
+    """)
+
+
+def create_booking_rollup(cursor):
+    """
+    booking_rollup: booking count and minutes per (day, facility, status), kept current
+    by triggers on bookings so dashboards and reports read a few rows instead of
+    scanning bookings. It covers bookings_history: archive_bookings.py sets
+    @skip_booking_rollup while it moves rows, and re-checks the totals nightly.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS booking_rollup (
+            booking_date DATE NOT NULL,
+            facility_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            booking_count INT NOT NULL DEFAULT 0,
+            booked_minutes BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (booking_date, facility_id, status),
+            INDEX idx_rollup_status_date (status, booking_date)
+        )
+    """)
+    for name in ('trg_bookings_rollup_insert', 'trg_bookings_rollup_update', 'trg_bookings_rollup_delete'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_bookings_rollup_insert AFTER INSERT ON bookings
+        FOR EACH ROW {_rollup_upsert('NEW', 1)}
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_bookings_rollup_update AFTER UPDATE ON bookings
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.status <=> NEW.status AND OLD.facility_id <=> NEW.facility_id
+                    AND OLD.start_time <=> NEW.start_time AND OLD.end_time <=> NEW.end_time) THEN
+                {_rollup_upsert('OLD', -1)};
+                {_rollup_upsert('NEW', 1)};
+            END IF;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_bookings_rollup_delete AFTER DELETE ON bookings
+        FOR EACH ROW
+        BEGIN
+            IF @skip_booking_rollup IS NULL THEN
+                {_rollup_upsert('OLD', -1)};
+            END IF;
+        END
+    """)
+    rebuild_booking_rollup(cursor)
+
+
+def create_booking_daily_facts(cursor):
+    """
+    booking_daily_facts: booking count and minutes per (day, facility, user, status) for
+    the report pages, filled by booking_facts.py (backfilled on its first run).
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS booking_daily_facts (
+            fact_date DATE NOT NULL,
+            facility_id INT NOT NULL,
+            user_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            booking_count INT NOT NULL,
+            booked_minutes BIGINT NOT NULL,
+            PRIMARY KEY (fact_date, facility_id, user_id, status),
+            INDEX idx_facts_user_date (user_id, fact_date)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fact_refresh_state (
+            name VARCHAR(100) PRIMARY KEY,
+            watermark DATETIME NULL
+        )
+    """)
+
+
+# (version, scope, function) - append only, never reorder
+MIGRATIONS = [
+    ('001_partition_bookings_by_month', 'all', partition_bookings_by_month),
+    ('002_bookings_archive', 'all', create_bookings_archive),
+    ('003_user_sessions', 'home', create_user_sessions),
+    ('004_user_profiles', 'home', create_user_profiles),
+    ('005_email_outbox', 'home', create_email_outbox),
+    ('006_bookings_status_end_index', 'all', add_bookings_status_end_index),
+    ('007_bookings_start_index', 'all', add_bookings_start_index),
+    ('008_users_created_index', 'home', add_users_created_index),
+    ('009_booking_tombstones', 'all', create_booking_tombstones),
+    ('010_booking_rollup', 'all', create_booking_rollup),
+    ('011_booking_daily_facts', 'all', create_booking_daily_facts),
+]
+
+
+def ensure_future_partitions(cursor, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Split p_future so there is a partition for each month up to `months_ahead` from now."""
+    cursor.execute("""
+        SELECT PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bookings' AND PARTITION_NAME != 'p_future'
+        ORDER BY PARTITION_ORDINAL_POSITION DESC LIMIT 1
+    """)
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    last_bound = date.fromisoformat(row['PARTITION_DESCRIPTION'].strip("'")[:10])
+
+    partitions = []
+    month = _month_start(last_bound, 1)
+    while month <= _month_start(date.today(), months_ahead):
+        partitions.append(_partition_definition(month))
+        month = _month_start(month, 1)
+    if partitions:
+        partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(f"ALTER TABLE bookings REORGANIZE PARTITION p_future INTO ({', '.join(partitions)})")
+    return len(partitions) - 1 if partitions else 0
+
+
+def run_migrations(cursor, database, is_home=True):
+    """Apply pending migrations to `database` using an open dictionary cursor."""
+    cursor.execute(f"USE {database}")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied = {row['version'] for row in cursor.fetchall()}
+
+    for version, scope, migration in MIGRATIONS:
+        if version in applied or (scope == 'home' and not is_home):
+            continue
+        print(f"Applying migration {version} to {database}...")
+        migration(cursor)
+        cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        print(f"Migration applied: {version}")
+
+
+def run_all_migrations(cursor):
+    """Migrate DB_NAME and every campus shard on this server, leaving DB_NAME selected."""
+    home_database = os.environ.get('DB_NAME')
+    run_migrations(cursor, home_database)
+    router = get_router()
+    if router.is_sharded():
+        for shard in router.shards:
+            if shard['database'] == home_database:
+                continue
+            if shard.get('host'):
+                print(f"Skipping shard {shard['name']} on {shard['host']}: run this script there with DB_NAME={shard['database']}")
+                continue
+            run_migrations(cursor, shard['database'], is_home=False)
+    cursor.execute(f"USE {home_database}")
+
+
+def migrate_all():
+    config = get_connection_config()
+    config.pop('database', None)
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        run_all_migrations(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        migrate_all()
+        print("Database migrations completed successfully.")
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        sys.exit(1)
@@ -0,0 +1,31 @@
+import argparse
+import sys
+import time
+from auth.provisioning import provision_users, PROVISION_CHUNK_SIZE, PROVISION_WORKERS
+
+# Bulk-create student/faculty accounts from a CSV or JSONL roster.
+#
+# Usage: python provision_users.py roster.csv [--chunk-size 500] [--workers 8] [--report out.csv]
+#
+# CSV header: username,email,role[,password,major,department,title]
+# Rows without a password get a one-time password, listed in the report.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-create user accounts from a roster file")
+    parser.add_argument("roster", help="CSV (with header) or JSONL file")
+    parser.add_argument("--chunk-size", type=int, default=PROVISION_CHUNK_SIZE,
+                        help="accounts inserted per transaction")
+    parser.add_argument("--workers", type=int, default=PROVISION_WORKERS,
+                        help="processes used for password hashing")
+    parser.add_argument("--report", help="per-row result file (default: <roster>.report.csv)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        summary = provision_users(args.roster, args.chunk_size, args.workers, args.report,
+                                  progress=lambda done: print(f"Processed {done} rows..."))
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Created {summary['created']} accounts, {summary['failed']} failed "
+          f"in {time.perf_counter() - started:.1f}s. Report: {summary['report']}")
@@ -0,0 +1,230 @@
+import os
+import time
+import threading
+from db_utils import execute_query, search_buildings, search_facilities, get_usernames
+
+# In-memory catalog of buildings, facilities and users for the current session.
+# Each row is materialised once into a __slots__ entity and kept in an identity
+# map keyed by ID, so every page shares the same objects and bookings queries
+# only need to return IDs. Entities also support entity['name'] access so they
+# can be passed wherever the old row dicts were.
+CATALOG_MAX_AGE_SECONDS = int(os.environ.get('CATALOG_MAX_AGE_SECONDS', '300'))
+
+
+class Entity:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def _update(self, row):
+        for field in self.FIELDS:
+            setattr(self, field, row.get(field))
+
+
+class Building(Entity):
+    FIELDS = ('building_id', 'name', 'address', 'description', 'latitude', 'longitude')
+    __slots__ = FIELDS
+
+    def __init__(self, row):
+        self._update(row)
+
+    def __repr__(self):
+        return f"Building({self.building_id}, {self.name!r})"
+
+
+class Facility(Entity):
+    FIELDS = ('facility_id', 'building_id', 'name', 'type', 'capacity', 'description', 'is_bookable',
+              'booking_eligibility_role', 'image_url', 'location_description')
+    __slots__ = FIELDS + ('building',)
+
+    def __init__(self, row, building):
+        self._update(row)
+        self.building = building
+
+    @property
+    def building_name(self):
+        return self.building.name if self.building else 'Unknown'
+
+    def is_eligible(self, role):
+        return self.booking_eligibility_role in (role, 'any')
+
+    def __repr__(self):
+        return f"Facility({self.facility_id}, {self.name!r})"
+
+
+class UserSummary(Entity):
+    FIELDS = ('user_id', 'username', 'role')
+    __slots__ = FIELDS
+
+    def __init__(self, row):
+        self._update(row)
+
+
+class CatalogRepository:
+    def __init__(self, max_age_seconds=CATALOG_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._buildings = {}
+        self._facilities = {}
+        self._users = {}
+        self._missing = set()
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def load(self, force=False):
+        """Load (or refresh) the catalog. Existing entities are updated in place to keep their identity."""
+        with self._lock:
+            if not force and self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds:
+                return True
+
+            building_rows = search_buildings()
+            facility_rows = search_facilities()
+            if building_rows is None or facility_rows is None:
+                return self._loaded_at is not None  # keep serving what we have
+
+            buildings = {}
+            for row in building_rows:
+                building = self._buildings.get(row['building_id'])
+                if building:
+                    building._update(row)
+                else:
+                    building = Building(row)
+                buildings[building.building_id] = building
+
+            facilities = {}
+            for row in facility_rows:
+                facility = self._facilities.get(row['facility_id'])
+                if facility:
+                    facility._update(row)
+                    facility.building = buildings.get(facility.building_id)
+                else:
+                    facility = Facility(row, buildings.get(row['building_id']))
+                facilities[facility.facility_id] = facility
+
+            self._buildings = buildings
+            self._facilities = facilities
+            self._missing.clear()
+            self._loaded_at = time.monotonic()
+            return True
+
+    def invalidate(self):
+        """Force a reload on next access (after buildings/facilities are changed)."""
+        self._loaded_at = None
+
+    # --- Buildings / facilities ---
+
+    def building(self, building_id):
+        self.load()
+        return self._buildings.get(building_id)
+
+    def buildings(self):
+        self.load()
+        return sorted(self._buildings.values(), key=lambda b: b.name or '')
+
+    def facility(self, facility_id):
+        self.load()
+        facility = self._facilities.get(facility_id)
+        if facility is None and facility_id is not None and facility_id not in self._missing:
+            # Possibly created since we loaded; only reload once per unknown ID
+            self._missing.add(facility_id)
+            self.load(force=True)
+            facility = self._facilities.get(facility_id)
+        return facility
+
+    def facilities(self, search_term=None, building_id=None, facility_type=None, min_capacity=None,
+                   bookable_only=False, eligible_role=None):
+        """Filter the catalog in memory (same criteria as db_utils.search_facilities)."""
+        self.load()
+        term = search_term.lower() if search_term else None
+        result = []
+        for facility in self._facilities.values():
+            if bookable_only and not facility.is_bookable:
+                continue
+            if eligible_role and not facility.is_eligible(eligible_role):
+                continue
+            if building_id and facility.building_id != building_id:
+                continue
+            if facility_type and facility.type != facility_type:
+                continue
+            if min_capacity and (facility.capacity or 0) < min_capacity:
+                continue
+            if term and term not in (facility.name or '').lower() and term not in (facility.description or '').lower():
+                continue
+            result.append(facility)
+        result.sort(key=lambda f: f.name or '')
+        return result
+
+    def facility_ids_matching(self, search_term):
+        """IDs of facilities whose own or building name contains search_term (for bookings searches)."""
+        self.load()
+        term = search_term.lower()
+        return [
+            facility.facility_id for facility in self._facilities.values()
+            if term in (facility.name or '').lower() or term in facility.building_name.lower()
+        ]
+
+    # --- Users ---
+
+    def users(self, user_ids):
+        """Resolve user IDs to UserSummary entities, fetching only the ones not seen yet."""
+        with self._lock:
+            missing = {uid for uid in user_ids if uid is not None and uid not in self._users}
+            if missing:
+                for user_id, row in get_usernames(missing).items():
+                    self._users[user_id] = UserSummary(row)
+            return {uid: self._users[uid] for uid in user_ids if uid in self._users}
+
+    def user_ids_matching(self, search_term):
+        """IDs of users whose username contains search_term (cached for later name lookups)."""
+        rows = execute_query("SELECT user_id, username, role FROM users WHERE username LIKE %s",
+                             (f"%{search_term}%",)) or []
+        with self._lock:
+            for row in rows:
+                self._users[row['user_id']] = UserSummary(row)
+        return [row['user_id'] for row in rows]
+
+    def forget_user(self, user_id):
+        self._users.pop(user_id, None)
+
+    # --- Bookings ---
+
+    def attach_names(self, bookings, include_users=False):
+        """Add facility_name / building_name (and user_name) to ID-only booking rows in place."""
+        if not bookings:
+            return bookings
+        users = self.users([b.get('user_id') for b in bookings]) if include_users else {}
+        for booking in bookings:
+            facility = self.facility(booking.get('facility_id'))
+            booking['facility_name'] = facility.name if facility else 'Unknown'
+            booking['building_name'] = facility.building_name if facility else 'Unknown'
+            booking['facility_type'] = facility.type if facility else None
+            if include_users:
+                user = users.get(booking.get('user_id'))
+                booking['user_name'] = user.username if user else 'Unknown'
+        return bookings
+
+
+_catalog = None
+
+
+def get_catalog():
+    """Return the session's catalog repository."""
+    global _catalog
+    if _catalog is None:
+        _catalog = CatalogRepository()
+    return _catalog
+
+
+def reset_catalog():
+    """Drop the identity map - call at the start of a new session."""
+    global _catalog
+    _catalog = None
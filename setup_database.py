@@ -4,6 +4,8 @@ import os
 import platform
 from auth.user import User # Assuming User class has hash_password
 from db_utils import get_connection_config # Keep this for connection config
+from shard_router import get_router, SHARDED_TABLES
+from migrate_database import run_all_migrations, create_user_profiles
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +28,34 @@ print(f"DB_HOST: {os.environ.get('DB_HOST')}")
 print(f"DB_USER: {os.environ.get('DB_USER')}")
 print(f"DB_NAME: {os.environ.get('DB_NAME')}")
 
+def create_shard_databases(cursor, tables):
+    """Create a database per campus shard (see shard_router.py) holding its buildings, facilities and bookings."""
+    router = get_router()
+    if not router.is_sharded():
+        return
+
+    home = router.home_shard()
+    shard_tables = [t for t in tables if t.split('IF NOT EXISTS')[1].split()[0] in SHARDED_TABLES]
+    for shard in router.shards:
+        if shard.get('host'):
+            print(f"Skipping shard {shard['name']} on {shard['host']}: run this script there with DB_NAME={shard['database']}")
+            continue
+
+        if shard is not home:
+            cursor.execute(f"DROP DATABASE IF EXISTS {shard['database']}")
+            cursor.execute(f"CREATE DATABASE {shard['database']}")
+            cursor.execute(f"USE {shard['database']}")
+            for table in shard_tables:
+                # Users stay in the home database, so shard bookings can't reference them
+                cursor.execute(table.replace("FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,", ""))
+            print(f"Created shard database {shard['database']} for {shard['name']}")
+
+        # IDs in each shard come from its own range so an ID identifies its campus
+        for table in SHARDED_TABLES:
+            cursor.execute(f"ALTER TABLE {shard['database']}.{table} AUTO_INCREMENT = {int(shard.get('id_start', 1))}")
+
+    cursor.execute(f"USE {os.environ.get('DB_NAME')}")
+
 def create_database():
     try:
         # Get base configuration without database name
@@ -151,6 +181,11 @@ def create_database():
             cursor.execute(table)
             print(f"Table created successfully: {table.split('IF NOT EXISTS')[1].split()[0]}")
 
+        create_shard_databases(cursor, tables)
+
+        # Apply schema migrations (bookings partitioning, archive table, ...)
+        run_all_migrations(cursor)
+
         # Create an admin user
         admin_password = "admin123"
         admin_pwd_hash = User.hash_password(admin_password) # Uses the hash_password method from User class
@@ -171,6 +206,7 @@ def create_database():
             ('faculty1', 'faculty1@campus.com', %s, 'faculty', NOW()),
             ('student2', 'student2@campus.com', %s, 'student', NOW())
         """, (User.hash_password('student123'), User.hash_password('faculty123'), User.hash_password('student456'))) # Use dummy hashes
+        create_user_profiles(cursor)  # default student/faculty profiles for the sample users
 
         # Add sample buildings
         cursor.execute("""
@@ -0,0 +1,87 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Maps campuses to databases. Buildings, facilities and bookings live in the
+# campus shard; users, booking rules and map paths stay in the home database
+# (DB_NAME). Each shard hands out IDs from its own range (id_start..id_end,
+# applied as the AUTO_INCREMENT start by setup_database.py), so any building,
+# facility or booking ID identifies its shard. Without a shards file the app
+# runs unsharded against DB_NAME exactly as before.
+#
+# settings/shards.json:
+# {
+#     "shards": [
+#         {"name": "Main Campus", "database": "campus_main", "id_start": 1, "id_end": 9999999},
+#         {"name": "North Campus", "database": "campus_north", "host": "north-db",
+#          "id_start": 10000000, "id_end": 19999999}
+#     ]
+# }
+SHARDS_FILE = os.environ.get('DB_SHARDS_FILE', os.path.join('settings', 'shards.json'))
+
+# Tables that are split across shards
+SHARDED_TABLES = {'buildings', 'facilities', 'bookings'}
+
+
+class ShardRouter:
+    def __init__(self, path=SHARDS_FILE):
+        self.shards = []
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.shards = json.load(f).get('shards', [])
+            except Exception as e:
+                print(f"Error loading shard map from {path}: {e}")
+                self.shards = []
+
+    def is_sharded(self):
+        return len(self.shards) > 1
+
+    def home_shard(self):
+        """The shard that lives in DB_NAME (users, rules and map paths are kept there)."""
+        for shard in self.shards:
+            if shard.get('database') == os.environ.get('DB_NAME') and not shard.get('host'):
+                return shard
+        return self.shards[0] if self.shards else None
+
+    def is_home(self, shard):
+        return shard is None or shard is self.home_shard()
+
+    def shard_for_id(self, entity_id):
+        """Find the shard owning a building, facility or booking ID."""
+        if entity_id is None or not self.shards:
+            return None
+        entity_id = int(entity_id)
+        for shard in self.shards:
+            if shard.get('id_start', 1) <= entity_id <= shard.get('id_end', 2 ** 31 - 1):
+                return shard
+        print(f"Warning: no shard covers ID {entity_id}, using the home shard")
+        return self.home_shard()
+
+    def shard_for_campus(self, campus):
+        for shard in self.shards:
+            if shard['name'] == campus:
+                return shard
+        return None
+
+    def campuses(self):
+        return [shard['name'] for shard in self.shards]
+
+    def scatter(self, fn):
+        """Call fn(shard) on every shard in parallel; returns [(shard, result), ...] in shard order."""
+        if not self.shards:
+            return [(None, fn(None))]
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as pool:
+            results = list(pool.map(fn, self.shards))
+        return list(zip(self.shards, results))
+
+
+_router = None
+
+
+def get_router():
+    """Return the process-wide shard router, loading the shard map on first use."""
+    global _router
+    if _router is None:
+        _router = ShardRouter()
+    return _router
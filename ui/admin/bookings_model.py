@@ -0,0 +1,264 @@
+from collections import namedtuple
+from PySide6.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QEvent, QRect, QPoint, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+# Admin bookings table as model/view. Rows live in a compact tuple store and the
+# View / Change Status controls are painted by a delegate, so there are no
+# per-row widgets: memory and paint cost follow the visible rows, and a refresh
+# only emits dataChanged for rows whose values actually changed. Delta refreshes
+# patch single rows with upsert_booking()/remove_booking(). When the whole result
+# is small enough to hold, BookingsFilterProxy searches and sorts it in memory
+# against a lowercase key built once per row.
+
+COLUMNS = ["Booking #", "User", "Facility", "Building", "Time Slot", "Status", "Actions"]
+TIME_COLUMN = 4
+STATUS_COLUMN = 5
+ACTIONS_COLUMN = 6
+
+BookingRow = namedtuple('BookingRow', [
+    'booking_id', 'booking_number', 'user_name', 'facility_name', 'building_name',
+    'time_slot', 'status', 'start_time', 'search_key'
+])
+
+STATUS_COLORS = {
+    'Confirmed': QColor(Qt.GlobalColor.darkGreen),
+    'Cancelled': QColor(Qt.GlobalColor.red),
+    'Pending Approval': QColor(Qt.GlobalColor.darkYellow),
+    'Completed': QColor(Qt.GlobalColor.blue),
+}
+
+# Statuses an admin can still change, and the actions offered for each
+EDITABLE_STATUSES = ("Pending Approval", "Confirmed")
+
+BookingIdRole = Qt.ItemDataRole.UserRole + 1
+StatusRole = Qt.ItemDataRole.UserRole + 2
+SortRole = Qt.ItemDataRole.UserRole + 3
+
+
+def booking_to_row(booking):
+    """Convert a bookings row (with names attached by the catalog) to a BookingRow."""
+    start, end = booking['start_time'], booking['end_time']
+    booking_number = booking.get('booking_number') or f"N/A-{booking['booking_id']}"
+    user_name = booking.get('user_name', 'Unknown')
+    facility_name = booking.get('facility_name', 'Unknown')
+    building_name = booking.get('building_name', 'Unknown')
+    return BookingRow(
+        booking['booking_id'],
+        booking_number,
+        user_name,
+        facility_name,
+        building_name,
+        f"{start.strftime('%Y-%m-%d %H:%M')} - {end.strftime('%H:%M')}",
+        booking['status'],
+        start,
+        # Same fields the server-side search matches (booking number, user, facility)
+        "\n".join((booking_number, user_name, facility_name, building_name)).lower(),
+    )
+
+
+class BookingsTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._index = {}  # booking_id -> row number
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column < ACTIONS_COLUMN:
+                # booking_number .. status are fields 1..6 of BookingRow
+                return row[column + 1]
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole and column == STATUS_COLUMN:
+            return STATUS_COLORS.get(row.status)
+        if role == BookingIdRole:
+            return row.booking_id
+        if role == StatusRole:
+            return row.status
+        if role == SortRole:
+            # Time Slot sorts chronologically, not as text
+            return row.start_time if column == TIME_COLUMN else (row[column + 1] if column < ACTIONS_COLUMN else None)
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    # --- Row store ---
+
+    def row_at(self, row):
+        return self._rows[row]
+
+    def booking_ids(self):
+        return list(self._index)
+
+    def last_key(self):
+        """(start_time, booking_id) of the last row, the keyset cursor for the next page."""
+        return (self._rows[-1].start_time, self._rows[-1].booking_id) if self._rows else None
+
+    def _reindex(self):
+        self._index = {row.booking_id: i for i, row in enumerate(self._rows)}
+
+    def set_bookings(self, bookings):
+        """Replace the contents. Same rows in the same order -> only changed rows are repainted."""
+        new_rows = [booking_to_row(booking) for booking in bookings]
+        if [row.booking_id for row in new_rows] != [row.booking_id for row in self._rows]:
+            self.beginResetModel()
+            self._rows = new_rows
+            self._reindex()
+            self.endResetModel()
+            return
+
+        changed = [i for i, (old, new) in enumerate(zip(self._rows, new_rows)) if old != new]
+        self._rows = new_rows
+        for first, last in _ranges(changed):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+    def upsert_booking(self, booking):
+        """Update a booking in place, or insert it at its position (newest start_time first)."""
+        new = booking_to_row(booking)
+        row = self._index.get(new.booking_id)
+        if row is not None:
+            old = self._rows[row]
+            if old == new:
+                return
+            if old.start_time == new.start_time:
+                self._rows[row] = new
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+                return
+            self.remove_booking(new.booking_id)  # moved: re-insert at its new position
+
+        key = (new.start_time, new.booking_id)
+        position = next((i for i, existing in enumerate(self._rows)
+                         if (existing.start_time, existing.booking_id) < key), len(self._rows))
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, new)
+        self._reindex()
+        self.endInsertRows()
+
+    def remove_booking(self, booking_id):
+        row = self._index.get(booking_id)
+        if row is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self._reindex()
+        self.endRemoveRows()
+        return True
+
+    def trim(self, limit):
+        """Drop rows beyond `limit` (they now belong to the next page)."""
+        if len(self._rows) > limit:
+            self.beginRemoveRows(QModelIndex(), limit, len(self._rows) - 1)
+            del self._rows[limit:]
+            self._reindex()
+            self.endRemoveRows()
+
+    def clear(self):
+        self.set_bookings([])
+
+
+class BookingsFilterProxy(QSortFilterProxyModel):
+    """In-memory search, status filter and column sorting over a BookingsTableModel."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._term = ""
+        self._status = None
+        self.setSortRole(SortRole)
+        self.setDynamicSortFilter(True)
+
+    def set_filters(self, term=None, status=None):
+        term = (term or "").strip().lower()
+        if (term, status) == (self._term, self._status):
+            return
+        self._term, self._status = term, status
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        row = self.sourceModel().row_at(source_row)
+        if self._status and row.status != self._status:
+            return False
+        return not self._term or self._term in row.search_key
+
+
+def _ranges(indexes):
+    """Group sorted row numbers into contiguous (first, last) ranges."""
+    start = previous = None
+    for i in indexes:
+        if start is None:
+            start = previous = i
+        elif i == previous + 1:
+            previous = i
+        else:
+            yield start, previous
+            start = previous = i
+    if start is not None:
+        yield start, previous
+
+
+class BookingActionsDelegate(QStyledItemDelegate):
+    """Paints the View and Change Status buttons in the Actions column and reports clicks."""
+    view_clicked = Signal(int)                 # booking_id
+    status_clicked = Signal(int, str, QPoint)  # booking_id, current status, global position for the menu
+
+    VIEW_WIDTH = 60
+    STATUS_WIDTH = 120
+    SPACING = 5
+
+    def _button_rects(self, rect, status):
+        view_rect = QRect(rect.left() + 4, rect.top() + 4, self.VIEW_WIDTH, rect.height() - 8)
+        status_rect = None
+        if status in EDITABLE_STATUSES:
+            status_rect = QRect(view_rect.right() + self.SPACING, view_rect.top(), self.STATUS_WIDTH, view_rect.height())
+        return view_rect, status_rect
+
+    def _draw_button(self, painter, rect, text, option):
+        button = QStyleOptionButton()
+        button.rect = rect
+        button.text = text
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def paint(self, painter, option, index):
+        if index.column() != ACTIONS_COLUMN:
+            super().paint(painter, option, index)
+            return
+        view_rect, status_rect = self._button_rects(option.rect, index.data(StatusRole))
+        self._draw_button(painter, view_rect, "View", option)
+        if status_rect is not None:
+            self._draw_button(painter, status_rect, "Change Status ▾", option)
+
+    def editorEvent(self, event, model, option, index):
+        if index.column() != ACTIONS_COLUMN or event.type() != QEvent.Type.MouseButtonRelease:
+            return super().editorEvent(event, model, option, index)
+        position = event.position().toPoint()
+        status = index.data(StatusRole)
+        view_rect, status_rect = self._button_rects(option.rect, status)
+        booking_id = index.data(BookingIdRole)
+        if view_rect.contains(position):
+            self.view_clicked.emit(booking_id)
+            return True
+        if status_rect is not None and status_rect.contains(position):
+            viewport = self.parent().viewport() if self.parent() else None
+            global_pos = viewport.mapToGlobal(status_rect.bottomLeft()) if viewport else QPoint()
+            self.status_clicked.emit(booking_id, status, global_pos)
+            return True
+        return False
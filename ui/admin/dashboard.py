@@ -3,7 +3,7 @@ from PySide6.QtWidgets import (
     QSizePolicy, QSpacerItem, QStackedWidget, QTableWidget, QTableWidgetItem, QHeaderView,
     QDialog, QFormLayout, QLineEdit, QComboBox, QMessageBox, QRadioButton, QGroupBox,
     QDateEdit, QTabWidget, QCheckBox, QProgressDialog, QApplication, QProgressBar,
-    QMenu, QSpinBox, QTextEdit, QFileDialog, QListWidget, QListWidgetItem
+    QMenu, QSpinBox, QTextEdit, QFileDialog, QListWidget, QListWidgetItem, QTableView
 )
 from PySide6.QtCore import Qt, Signal, QDate, QDateTime, QTimer
 from PySide6.QtGui import QFont, QIcon, QPainter, QPixmap
@@ -17,12 +17,20 @@ import time
 import re
 import os
 import uuid # For generating unique IDs, especially for booking numbers
+import threading
 import datetime
-from db_utils import execute_query, get_booking_rule # Import new db_utils functions
+from db_utils import execute_query, get_booking, get_booking_rule, update_booking_status, get_bookings_page, get_bookings_watermark, get_booking_changes, count_bookings, get_users_page, count_users, ADMIN_PAGE_SIZE, CLIENT_FILTER_MAX_ROWS, get_admin_summary, get_booking_facts, aggregate_usage, FACT_DIMENSIONS, get_recent_bookings, get_usernames, delete_building, delete_facility, delete_user # Import new db_utils functions
+from repository import get_catalog
+from shard_router import get_router
+from analytics import load_booking_columns
+from ui.admin.bookings_model import BookingsTableModel, BookingsFilterProxy, BookingActionsDelegate, ACTIONS_COLUMN, TIME_COLUMN
+from ui.admin.pagination import KeysetPager
+from auth.provisioning import provision_users
 from functools import partial
 
 class AdminDashboard(QWidget):
     logout_requested = Signal()
+    provisioning_finished = Signal(object, str)  # (summary, error) from the bulk import thread
 
     def __init__(self, user):
         super().__init__()
@@ -36,6 +44,7 @@ class AdminDashboard(QWidget):
         # Flag to track if we should skip refresh
         self._skip_refresh = False
 
+        self.provisioning_finished.connect(self.on_provisioning_finished)
         self.initUI()
 
     def initUI(self):
@@ -198,42 +207,18 @@ class AdminDashboard(QWidget):
         stats_frame = QFrame()
         stats_layout = QHBoxLayout(stats_frame)
 
-        # Load actual stats from database with fallbacks - Updated queries
-        try:
-            facility_count = execute_query("SELECT COUNT(*) as count FROM facilities")
-            facility_count = facility_count[0]['count'] if facility_count else 0
-        except Exception as e:
-            print(f"Error getting facility count: {e}")
-            facility_count = 0
-
-        try:
-            user_count = execute_query("SELECT COUNT(*) as count FROM users WHERE role IN ('student', 'faculty')")
-            user_count = user_count[0]['count'] if user_count else 0
-        except Exception as e:
-            print(f"Error getting user count: {e}")
-            user_count = 0
-
-        try:
-            today_bookings = execute_query("SELECT COUNT(*) as count FROM bookings WHERE DATE(start_time) = CURDATE() AND status != 'Cancelled'")
-            today_bookings = today_bookings[0]['count'] if today_bookings else 0
-        except Exception as e:
-            print(f"Error getting today's bookings: {e}")
-            today_bookings = 0
-
-        try:
-            # Total confirmed booking hours (sum of duration)
-            total_booking_hours = execute_query("SELECT SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total FROM bookings WHERE status = 'Confirmed'")
-            total_booking_hours = total_booking_hours[0]['total'] if total_booking_hours and total_booking_hours[0]['total'] is not None else 0
-        except Exception as e:
-            print(f"Error getting total booking hours: {e}")
-            total_booking_hours = 0
+        # Load actual stats from database with fallbacks (summed across campuses when sharded)
+        summary = get_admin_summary() or {}
+        facility_count = summary.get('facility_count', 0)
+        today_bookings = summary.get('today_bookings', 0)
+        total_booking_hours = summary.get('total_booking_hours', 0)
 
         # Create stat cards and store references for refreshing
         self.stat_widgets = {}
 
         stat_cards = [
             {"id": "facility_count", "title": "Total Facilities", "value": str(facility_count), "icon": "📍"},
-            {"id": "user_count", "title": "Active Users", "value": str(user_count), "icon": "👥"},
+            {"id": "user_count", "title": "Active Users", "value": self.format_user_count(summary), "icon": "👥"},
             {"id": "today_bookings", "title": "Bookings Today", "value": str(today_bookings), "icon": "📅"},
             {"id": "total_booking_hours", "title": "Total Booked Hrs", "value": f"{total_booking_hours:.1f} hrs", "icon": "⏰"}
         ]
@@ -273,15 +258,7 @@ class AdminDashboard(QWidget):
 
         # Load recent bookings with fallback - Updated query
         try:
-            recent_bookings = execute_query("""
-                SELECT bk.booking_id, bk.booking_number, u.username as user_name, f.name as facility_name,
-                       bk.start_time, bk.end_time, bk.status
-                FROM bookings bk
-                JOIN users u ON bk.user_id = u.user_id
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                ORDER BY bk.created_at DESC
-                LIMIT 5
-            """)
+            recent_bookings = get_recent_bookings(5)
 
             if recent_bookings:
                 self.recent_bookings_table.setRowCount(len(recent_bookings))
@@ -372,7 +349,7 @@ class AdminDashboard(QWidget):
     def load_buildings(self):
         self.building_table.setRowCount(0)
         try:
-            buildings = execute_query("SELECT * FROM buildings ORDER BY name ASC")
+            buildings = get_catalog().buildings()
             if not buildings:
                 self.display_no_data_message(self.building_table, "No buildings found.")
                 return
@@ -418,7 +395,7 @@ class AdminDashboard(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 # db_utils.delete_building handles cascading deletion
-                result = execute_query("DELETE FROM buildings WHERE building_id = %s", (building_id,), fetch=False)
+                result = delete_building(building_id)
                 if result is not None:
                     QMessageBox.information(self, "Success", "Building and associated data deleted successfully.")
                     self.load_buildings()
@@ -520,37 +497,40 @@ class AdminDashboard(QWidget):
 
         layout.addLayout(header_layout)
         layout.addWidget(self.facility_table)
+        self._facility_rows = None
+        self._facility_row_keys = []
+        self._facilities_local = False
         self.load_facilities()
         return page
 
     def load_buildings_into_combo(self, combo_box):
         """Helper to load buildings into a QComboBox."""
         try:
-            buildings = execute_query("SELECT building_id, name FROM buildings ORDER BY name")
-            for building in buildings:
+            for building in get_catalog().buildings():
                 combo_box.addItem(building['name'], building['building_id'])
         except Exception as e:
             print(f"Error loading buildings for combo box: {e}")
 
     def load_facilities(self, building_id=None, facility_type=None):
-        self.facility_table.setRowCount(0)
         try:
-            query = """
-                SELECT f.*, b.name as building_name
-                FROM facilities f
-                JOIN buildings b ON f.building_id = b.building_id
-                WHERE 1=1
-            """
-            params = []
-            if building_id:
-                query += " AND f.building_id = %s"
-                params.append(building_id)
-            if facility_type and facility_type != "All Types":
-                query += " AND f.type = %s"
-                params.append(facility_type)
-
-            query += " ORDER BY f.name ASC"
-            facilities = execute_query(query, params)
+            if facility_type == "All Types":
+                facility_type = None
+            facilities = get_catalog().facilities()
+            # Few enough to show all and hide the filtered-out rows; otherwise let the catalog filter
+            self._facilities_local = len(facilities) <= CLIENT_FILTER_MAX_ROWS
+            if not self._facilities_local:
+                facilities = get_catalog().facilities(building_id=building_id, facility_type=facility_type)
+
+            # Auto-refresh: keep the table if nothing changed, just re-apply the filter
+            # Catalog entities are updated in place, so compare value snapshots
+            rows = [tuple(facility[field] for field in facility.FIELDS) + (facility.building_name,)
+                    for facility in facilities]
+            if rows == self._facility_rows:
+                self.apply_facility_filters(building_id, facility_type)
+                return
+            self._facility_rows = rows
+            self._facility_row_keys = [(facility['building_id'], facility['type']) for facility in facilities]
+            self.facility_table.setRowCount(0)
 
             if not facilities:
                 self.display_no_data_message(self.facility_table, "No facilities found matching criteria.")
@@ -587,8 +567,10 @@ class AdminDashboard(QWidget):
                 buttons_layout.addWidget(edit_btn)
                 buttons_layout.addWidget(delete_btn)
                 self.facility_table.setCellWidget(row_idx, 7, buttons_widget)
+            self.apply_facility_filters(building_id, facility_type)
         except Exception as e:
             print(f"Error loading facilities: {e}")
+            self._facility_rows = None
             self.display_db_error_message(self.facility_table, "Failed to load facilities.")
 
     def filter_facilities(self):
@@ -596,7 +578,19 @@ class AdminDashboard(QWidget):
         facility_type = self.facility_type_filter.currentText()
         if facility_type == "All Types":
             facility_type = None # Pass None to query if "All Types" is selected
-        self.load_facilities(building_id, facility_type)
+        if self._facilities_local:
+            self.apply_facility_filters(building_id, facility_type)
+        else:
+            self.load_facilities(building_id, facility_type)
+
+    def apply_facility_filters(self, building_id=None, facility_type=None):
+        """Hide rows outside the building/type filter (in-memory mode only)."""
+        if not self._facilities_local:
+            return
+        for row, (row_building_id, row_type) in enumerate(self._facility_row_keys):
+            visible = ((building_id is None or row_building_id == building_id)
+                       and (facility_type is None or row_type == facility_type))
+            self.facility_table.setRowHidden(row, not visible)
 
     def add_edit_facility(self, facility=None):
         dialog = FacilityDialog(self, facility)
@@ -611,7 +605,7 @@ class AdminDashboard(QWidget):
         )
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                result = execute_query("DELETE FROM facilities WHERE facility_id = %s", (facility_id,), fetch=False)
+                result = delete_facility(facility_id)
                 if result is not None:
                     QMessageBox.information(self, "Success", "Facility and associated bookings deleted successfully.")
                     self.load_facilities()
@@ -667,6 +661,11 @@ class AdminDashboard(QWidget):
         header_layout.addWidget(QLabel("Registered after:"))
         header_layout.addWidget(self.date_filter)
 
+        self.import_users_btn = QPushButton("Bulk Import...")
+        self.import_users_btn.setToolTip("Create accounts from a CSV or JSONL roster")
+        self.import_users_btn.clicked.connect(self.import_users)
+        header_layout.addWidget(self.import_users_btn)
+
         self.date_filter.setStyleSheet("""
             QDateEdit {
                 background-color: white;
@@ -693,6 +692,14 @@ class AdminDashboard(QWidget):
         self.users_table.setHorizontalHeaderLabels(["ID", "Username", "Email", "Role", "Created", "Actions"])
         self.users_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.users_table.setStyleSheet("QTableWidget { background-color: #f9f9f9; color: black; }")
+
+        # Keyset pages of ADMIN_PAGE_SIZE users, or all of them filtered in memory when few enough
+        self._users_filter = ("All Users", None)
+        self._users_page_rows = None
+        self._users_row_keys = []
+        self._users_local = self._fits_in_memory(count_users())
+        self.users_pager = KeysetPager("users")
+        self.users_pager.page_changed.connect(self.load_users)
         # Load users
         self.load_users()
 
@@ -700,36 +707,45 @@ class AdminDashboard(QWidget):
         layout.addLayout(header_layout)
         layout.addSpacing(10)
         layout.addWidget(self.users_table)
+        layout.addWidget(self.users_pager)
 
         return page
 
-    def load_users(self, role_filter="All Users",date_filter=None):
-        # Map filter to database role - Updated for SCNFBS roles
-        role_map = {
-            "All Users": None,
-            "Students": "student",
-            "Faculty": "faculty",
-            "Admins": "admin"
-        }
+    # Map filter to database role - Updated for SCNFBS roles
+    USER_ROLE_FILTERS = {
+        "All Users": None,
+        "Students": "student",
+        "Faculty": "faculty",
+        "Admins": "admin"
+    }
 
-        self.users_table.setRowCount(0)
+    def load_users(self):
+        """Load the current page of users for the active role/date filter."""
+        role_filter, date_filter = self._users_filter
+        if self._users_local:
+            role_filter, date_filter = "All Users", None  # apply_user_filters() narrows it down
 
         try:
-            # Build query based on filter
-            
-            if role_map[role_filter] and date_filter:
-                query = "SELECT * FROM users WHERE role = %s AND DATE(created_at) >= %s ORDER BY created_at DESC"
-                users = execute_query(query, (role_map[role_filter], date_filter))
-            if role_map[role_filter]:
-                query = "SELECT * FROM users WHERE role = %s ORDER BY created_at DESC"
-                users = execute_query(query, (role_map[role_filter],))
-            elif date_filter:
-                query = "SELECT * FROM users WHERE DATE(created_at) >= %s ORDER BY created_at DESC"
-                users = execute_query(query, (date_filter,))
-            else:
-                query = "SELECT * FROM users ORDER BY created_at DESC"
-                users = execute_query(query)
+            db_role = self.USER_ROLE_FILTERS[role_filter]
+            limit = CLIENT_FILTER_MAX_ROWS if self._users_local else ADMIN_PAGE_SIZE
+            users, has_more = get_users_page(db_role, date_filter, after=self.users_pager.after(), limit=limit)
+            if users is None:
+                raise RuntimeError("Could not load users")
+            if not users and self.users_pager.page_number() > 1:
+                self.users_pager.previous_page()  # the last page emptied out
+                return
 
+            last_key = (users[-1]['created_at'], users[-1]['user_id']) if users else None
+            self.users_pager.update_page(last_key, has_more, count_users(db_role, date_filter), limit)
+
+            # Auto-refresh: leave the table alone if this page hasn't changed
+            page_rows = [tuple(user.values()) for user in users]
+            if page_rows == self._users_page_rows:
+                return
+            self._users_page_rows = page_rows
+            self._users_row_keys = [(user['role'], user['created_at']) for user in users]
+
+            self.users_table.setRowCount(0)
             if not users:
                 self.display_no_data_message(self.users_table, "No users found.")
                 return
@@ -785,15 +801,64 @@ class AdminDashboard(QWidget):
                 actions_layout.addWidget(delete_btn)
 
                 self.users_table.setCellWidget(i, 5, actions_widget)
+            self.apply_user_filters()
         except Exception as e:
             print(f"Error loading users: {e}")
+            self._users_page_rows = None
             self.display_db_error_message(self.users_table)
 
     def filter_users(self, index = None):
         role_text = self.role_filter.currentText()
         selected_date = self.date_filter.date().toPython()
-    
-        self.load_users(role_text, selected_date)
+
+        self._users_filter = (role_text, selected_date)
+        if self._users_local:
+            self.apply_user_filters()  # no query: every user is already loaded
+            return
+        self.users_pager.reset()
+        self.load_users()
+
+    def apply_user_filters(self):
+        """Hide rows outside the role/date filter (in-memory mode only)."""
+        if not self._users_local:
+            return
+        role_filter, date_filter = self._users_filter
+        role = self.USER_ROLE_FILTERS[role_filter]
+        for row, (user_role, created_at) in enumerate(self._users_row_keys):
+            visible = ((role is None or user_role == role)
+                       and (date_filter is None or (created_at is not None and created_at.date() >= date_filter)))
+            self.users_table.setRowHidden(row, not visible)
+
+    def import_users(self):
+        """Bulk-create accounts from a roster file on a background thread."""
+        roster_file, _ = QFileDialog.getOpenFileName(
+            self, "Select Roster", "", "Roster Files (*.csv *.jsonl *.ndjson);;All Files (*)"
+        )
+        if not roster_file:
+            return
+
+        def run():
+            try:
+                self.provisioning_finished.emit(provision_users(roster_file), "")
+            except Exception as e:
+                self.provisioning_finished.emit(None, str(e))
+
+        self.import_users_btn.setEnabled(False)
+        self.import_users_btn.setText("Importing...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_provisioning_finished(self, summary, error):
+        self.import_users_btn.setEnabled(True)
+        self.import_users_btn.setText("Bulk Import...")
+        if error:
+            QMessageBox.critical(self, "Import Failed", f"Failed to import users: {error}")
+            return
+        QMessageBox.information(
+            self, "Import Complete",
+            f"Created {summary['created']} accounts, {summary['failed']} rows failed.\n\n"
+            f"Per-row results (including one-time passwords) were written to:\n{summary['report']}"
+        )
+        self.filter_users()
 
     def view_user(self, user_id):
         user = execute_query("SELECT * FROM users WHERE user_id = %s", (user_id,))
@@ -866,7 +931,7 @@ class AdminDashboard(QWidget):
                     f"User account {'activated' if active_status else 'suspended'} successfully"
                 )
                 # Refresh current view
-                self.load_users(self.role_filter.currentText())
+                self.load_users()
             else:
                 QMessageBox.critical(
                     self, 
@@ -890,19 +955,15 @@ class AdminDashboard(QWidget):
         if confirm == QMessageBox.StandardButton.Yes:
             success = True
             try:
-                # Delete user's bookings first (due to CASCADE on user_id in bookings table)
-                # No need for explicit delete on 'customers', 'restaurants', 'delivery_personnel'
-                # as those tables are gone or conceptually merged into users table.
-                # If specific foreign key relationships exist, they should be defined with ON DELETE CASCADE.
-                
-                # Delete the user itself (this should cascade delete related bookings if setup correctly)
-                result = execute_query("DELETE FROM users WHERE user_id = %s", (user_id,), fetch=False)
+                # db_utils.delete_user removes the user's bookings (on every campus) and then the user;
+                # bookings is partitioned, so there is no ON DELETE CASCADE to rely on.
+                result = delete_user(user_id)
                 if result is None:
                     success = False
 
                 if success:
                     QMessageBox.information(self, "Success", f"User '{user[0]['username']}' and all associated data have been deleted successfully.")
-                    self.load_users(self.role_filter.currentText()) # Refresh the users list
+                    self.load_users() # Refresh the users list
                 else:
                     QMessageBox.warning(self, "Error", "Failed to delete user. There may be associated data that couldn't be deleted.")
             except Exception as e:
@@ -1009,20 +1070,46 @@ class AdminDashboard(QWidget):
         search_layout.addWidget(search_btn)
         search_layout.addLayout(refresh_bar)
 
-        self.bookings_table = QTableWidget()
-        self.bookings_table.setColumnCount(7)
-        self.bookings_table.setHorizontalHeaderLabels([
-            "Booking #", "User", "Facility", "Building", "Time Slot", "Status", "Actions"
-        ])
+        # Model/view: rows live in the model, View/Change Status are painted by the delegate
+        self.bookings_model = BookingsTableModel(self)
+        self.bookings_proxy = BookingsFilterProxy(self)
+        self.bookings_proxy.setSourceModel(self.bookings_model)
+        self.bookings_table = QTableView()
+        self.bookings_table.setModel(self.bookings_proxy)
+        self.bookings_actions = BookingActionsDelegate(self.bookings_table)
+        self.bookings_actions.view_clicked.connect(self.view_booking_details)
+        self.bookings_actions.status_clicked.connect(self.show_booking_status_menu)
+        self.bookings_table.setItemDelegateForColumn(ACTIONS_COLUMN, self.bookings_actions)
         self.bookings_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.bookings_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.bookings_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.bookings_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.bookings_table.verticalHeader().setDefaultSectionSize(40)
+        self.bookings_table.verticalHeader().setVisible(False)
+        self.bookings_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.bookings_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.bookings_table.setAlternatingRowColors(True)
-        self.bookings_table.setStyleSheet("QTableWidget { background-color: #f9f9f9; color: black; }")
+        self.bookings_table.setStyleSheet("QTableView { background-color: #f9f9f9; color: black; }")
+
+        self.bookings_message = QLabel()
+        self.bookings_message.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.bookings_message.hide()
         layout.addWidget(header)
         layout.addLayout(search_layout)
+        layout.addWidget(self.bookings_message)
         layout.addWidget(self.bookings_table)
 
+        # Keyset pages of ADMIN_PAGE_SIZE bookings, for the filters of the last search
+        self._booking_filters = {}
+        self._bookings_watermark = None  # database time of the last full load / delta refresh
+        self._bookings_has_more = False
+        self.bookings_pager = KeysetPager("bookings")
+        self.bookings_pager.page_changed.connect(self.load_bookings)
+        layout.addWidget(self.bookings_pager)
+
+        # Small enough to hold: load everything once, then search/filter/sort in memory as you type
+        self._set_bookings_local(self._fits_in_memory(count_bookings()))
+        self.booking_search_input.textChanged.connect(self.apply_booking_filters)
+        self.booking_status_filter.currentIndexChanged.connect(self.apply_booking_filters)
+
         return page
 
     def search_bookings(self):
@@ -1034,161 +1121,140 @@ class AdminDashboard(QWidget):
         if status == "All Status":
             status = None
 
-        self.load_bookings(force_refresh=True, search_term=search_term, start_date=start_date, end_date=end_date, status=status)
-
-    def load_bookings(self, force_refresh=False, search_term=None, start_date=None, end_date=None, status=None):
-        try:
-            # Reusing search_bookings from db_utils (which replaced search_orders)
-            from db_utils import get_user_bookings # Renamed for clarity, it takes user_id, status, dates
-            
-            # For admin, we want all bookings, so no user_id filter needed initially.
-            # We'll adapt search_bookings to handle general search.
-            # (Assuming get_user_bookings in db_utils can be adapted or a new function created for admin)
-            
-            # For simplicity, let's craft the query directly here for admin view.
-            query = """
-                SELECT bk.*, u.username as user_name, f.name as facility_name, bu.name as building_name
-                FROM bookings bk
-                JOIN users u ON bk.user_id = u.user_id
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings bu ON f.building_id = bu.building_id
-                WHERE 1=1
-            """
-            params = []
-
-            if search_term:
-                query += " AND (u.username LIKE %s OR f.name LIKE %s OR bk.booking_number LIKE %s)"
-                params.extend([f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"])
-
-            if status:
-                query += " AND bk.status = %s"
-                params.append(status)
-
-            if start_date:
-                query += " AND bk.start_time >= %s"
-                params.append(f"{start_date} 00:00:00")
-
-            if end_date:
-                query += " AND bk.end_time <= %s"
-                params.append(f"{end_date} 23:59:59") # Include entire end day
-
-            query += " ORDER BY bk.start_time DESC"
-
-            bookings = execute_query(query, params)
-
-            if not bookings:
-                self.display_no_data_message(self.bookings_table, "No bookings found matching the criteria.")
-                return
-
-            current_booking_ids = {}
-            for row in range(self.bookings_table.rowCount()):
-                booking_num_item = self.bookings_table.item(row, 0)
-                if booking_num_item:
-                    current_booking_ids[booking_num_item.text()] = row
-
-            for booking in bookings:
-                booking_num = booking.get('booking_number', f"N/A-{booking['booking_id']}")
-                row = current_booking_ids.pop(booking_num, None) # Use pop to remove processed items
-                if row is None:
-                    row = self.bookings_table.rowCount()
-                    self.bookings_table.insertRow(row)
-
-                self.bookings_table.setItem(row, 0, QTableWidgetItem(booking_num))
-                self.bookings_table.setItem(row, 1, QTableWidgetItem(booking['user_name']))
-                self.bookings_table.setItem(row, 2, QTableWidgetItem(booking['facility_name']))
-                self.bookings_table.setItem(row, 3, QTableWidgetItem(booking['building_name']))
-
-                time_slot = f"{booking['start_time'].strftime('%Y-%m-%d %H:%M')} - {booking['end_time'].strftime('%H:%M')}"
-                self.bookings_table.setItem(row, 4, QTableWidgetItem(time_slot))
-
-                status_item = QTableWidgetItem(booking['status'])
-                # Set color based on status
-                if booking['status'] == 'Confirmed':
-                    status_item.setForeground(Qt.GlobalColor.darkGreen)
-                elif booking['status'] == 'Cancelled':
-                    status_item.setForeground(Qt.GlobalColor.red)
-                elif booking['status'] == 'Pending Approval':
-                    status_item.setForeground(Qt.GlobalColor.darkYellow)
-                elif booking['status'] == 'Completed':
-                    status_item.setForeground(Qt.GlobalColor.blue)
-                self.bookings_table.setItem(row, 5, status_item)
-
-                # Actions - view/manage button
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout()
-                actions_layout.setContentsMargins(0, 0, 0, 0)
-                actions_layout.setSpacing(5)
+        dates = {'start_date': start_date, 'end_date': end_date}
+        if self._bookings_local and self._booking_filters == dates:
+            self.apply_booking_filters()  # same rows already loaded
+            return
 
-                # View button
-                view_btn = QPushButton("View")
-                view_btn.setObjectName("action-button")
-                view_btn.clicked.connect(partial(self.view_booking_details, booking['booking_id']))
-                actions_layout.addWidget(view_btn)
+        self.bookings_pager.reset()
+        if self._fits_in_memory(count_bookings(**dates)):
+            # Only the date range goes to the server; search and status are applied by the proxy
+            self._set_bookings_local(True)
+            self._booking_filters = dates
+        else:
+            self._set_bookings_local(False)
+            self._booking_filters = {'search_term': search_term, 'start_date': start_date, 'end_date': end_date, 'status': status}
+        self.load_bookings(force_refresh=True)
+
+    @staticmethod
+    def _fits_in_memory(total):
+        return total is not None and not total['capped'] and total['count'] <= CLIENT_FILTER_MAX_ROWS
+
+    def _set_bookings_local(self, local):
+        """Switch the bookings page between in-memory filtering and server-side keyset pages."""
+        self._bookings_local = local
+        self._bookings_page_size = CLIENT_FILTER_MAX_ROWS if local else ADMIN_PAGE_SIZE
+        if local:
+            self.bookings_table.horizontalHeader().setSortIndicator(TIME_COLUMN, Qt.SortOrder.DescendingOrder)
+        self.bookings_table.setSortingEnabled(local)  # sorting one server page would mislead
+        if not local:
+            self.bookings_proxy.sort(-1)  # back to the server's newest-first order
+        self.apply_booking_filters()
+
+    def apply_booking_filters(self):
+        """Apply the search box and status filter in memory (in-memory mode only)."""
+        if self._bookings_local:
+            status = self.booking_status_filter.currentText()
+            self.bookings_proxy.set_filters(self.booking_search_input.text(), None if status == "All Status" else status)
+        else:
+            self.bookings_proxy.set_filters()  # the server already applied them
+        self._update_bookings_message()
 
-                # Dropdown (only for editable statuses)
-                editable_statuses = ["Pending Approval", "Confirmed"]
-                if booking['status'] in editable_statuses:
-                    status_combo = QComboBox()
-                    status_combo.addItem("Change Status")
-                    if booking['status'] == "Pending Approval":
-                        status_combo.addItem("Approve")
-                    status_combo.addItem("Cancel")
-                    status_combo.addItem("Mark Completed")
-
-                    status_combo.currentIndexChanged.connect(
-                        partial(self.handle_booking_status_change, booking['booking_id'], status_combo)
-                    )
-                    actions_layout.addWidget(status_combo)
-                    status_combo.setStyleSheet("""
-                        QComboBox {
-                            background-color: yellow;
-                            color: black;
-                            padding: 4px;
-                            border-radius: 4px;
-                        }
-                        QComboBox QAbstractItemView {
-                            background-color: white;
-                            color: black;
-                            selection-background-color: #3498db;
-                            selection-color: white;
-                        }
-                    """)
+    def _update_bookings_message(self):
+        if self.bookings_proxy.rowCount():
+            self.bookings_message.hide()
+        else:
+            self.show_bookings_message("No bookings found matching the criteria.")
 
-                # Apply layout
-                actions_widget.setLayout(actions_layout)
-                actions_widget.setMinimumHeight(40)
-                self.bookings_table.setCellWidget(row, 6, actions_widget)
+    def load_bookings(self, force_refresh=False):
+        """Load the current page of bookings for the filters of the last search."""
+        try:
+            # Taken before the page is read, so nothing changing meanwhile is missed by refresh_bookings()
+            watermark = get_bookings_watermark()
+            bookings, has_more = get_bookings_page(after=self.bookings_pager.after(), limit=self._bookings_page_size,
+                                                   **self._booking_filters)
+            if bookings is None:
+                raise RuntimeError("database unavailable")
+            if not bookings and self.bookings_pager.page_number() > 1:
+                self.bookings_pager.previous_page()  # the last page emptied out
+                return
 
+            self._bookings_watermark = watermark
+            self._bookings_has_more = has_more
+            last_key = (bookings[-1]['start_time'], bookings[-1]['booking_id']) if bookings else None
+            self.bookings_pager.update_page(last_key, has_more, count_bookings(**self._booking_filters),
+                                            self._bookings_page_size)
 
-            # Remove any rows that are no longer in the query results
-            rows_to_remove = sorted(current_booking_ids.values(), reverse=True)
-            for row in rows_to_remove:
-                self.bookings_table.removeRow(row)
+            # Unchanged rows cost nothing; changed rows are repainted via dataChanged
+            self.bookings_model.set_bookings(bookings)
+            self._update_bookings_message()
 
         except Exception as e:
             error_msg = f"Failed to load bookings: {str(e)}"
             if force_refresh:
                 print(error_msg)
-            self.display_db_error_message(self.bookings_table, error_msg)
+            self._bookings_watermark = None  # reload fully once the database is back
+            self.bookings_model.clear()
+            self.show_bookings_message(error_msg, error=True)
+
+    def refresh_bookings(self):
+        """
+        Delta refresh: fetch only bookings changed or deleted since the last watermark
+        and patch those rows, instead of re-reading the page.
+        """
+        if self._bookings_watermark is None:
+            self.load_bookings()
+            return
+        changes = get_booking_changes(self._bookings_watermark, self.bookings_model.booking_ids(),
+                                      **self._booking_filters)
+        if changes is None:
+            return  # keep showing what we have; the next tick retries
+        changed, deleted_ids, self._bookings_watermark = changes
+        if not changed and not deleted_ids:
+            return
+
+        # This page holds keys below the previous page's last row and, if there is a next
+        # page, not below this page's last row
+        page_start = self.bookings_pager.after()
+        page_end = self.bookings_model.last_key() if self._bookings_has_more else None
+        for booking in changed:
+            key = (booking['start_time'], booking['booking_id'])
+            on_page = (booking['matches'] and booking['booking_id'] not in deleted_ids
+                       and (page_start is None or key < page_start) and (page_end is None or key >= page_end))
+            if on_page:
+                self.bookings_model.upsert_booking(booking)
+            else:
+                self.bookings_model.remove_booking(booking['booking_id'])
+        for booking_id in deleted_ids:
+            self.bookings_model.remove_booking(booking_id)
+
+        rows = self.bookings_model.rowCount()
+        if self._bookings_has_more and rows < self._bookings_page_size:
+            self.load_bookings()  # rows left the page: pull the next ones up
+            return
+        if rows > self._bookings_page_size:
+            self.bookings_model.trim(self._bookings_page_size)
+            self._bookings_has_more = True
+        self.bookings_pager.update_page(self.bookings_model.last_key(), self._bookings_has_more,
+                                        count_bookings(**self._booking_filters), self._bookings_page_size)
+        self._update_bookings_message()
+
+    def show_bookings_message(self, message, error=False):
+        self.bookings_message.setText(message)
+        self.bookings_message.setStyleSheet(f"color: {'red' if error else '#2c3e50'}; padding: 10px;")
+        self.bookings_message.show()
 
     def view_booking_details(self, booking_id):
         try:
-            booking = execute_query("""
-                SELECT bk.*, u.username as user_name, u.email as user_email, u.role as user_role,
-                       f.name as facility_name, f.type as facility_type, f.capacity,
-                       b.name as building_name, b.address as building_address
-                FROM bookings bk
-                JOIN users u ON bk.user_id = u.user_id
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings b ON f.building_id = b.building_id
-                WHERE bk.booking_id = %s
-            """, (booking_id,))
-
+            booking = get_booking(booking_id)
             if not booking:
                 QMessageBox.warning(self, "Error", f"Booking #{booking_id} not found.")
                 return
 
-            booking = booking[0]
+            user = execute_query("SELECT username, email, role FROM users WHERE user_id = %s", (booking['user_id'],))
+            user = user[0] if user else {'username': 'Unknown', 'email': 'N/A', 'role': 'unknown'}
+            facility = get_catalog().facility(booking['facility_id'])
+            building = facility.building if facility else None
             dialog = QDialog(self)
             dialog.setWindowTitle(f"Booking {booking['booking_number']} Details")
             dialog.setMinimumWidth(600)
@@ -1225,18 +1291,18 @@ class AdminDashboard(QWidget):
 
             user_group = QGroupBox("Booked By")
             user_layout = QFormLayout(user_group)
-            user_layout.addRow("Username:", QLabel(booking['user_name']))
-            user_layout.addRow("Email:", QLabel(booking['user_email']))
-            user_layout.addRow("Role:", QLabel(booking['user_role'].capitalize()))
+            user_layout.addRow("Username:", QLabel(user['username']))
+            user_layout.addRow("Email:", QLabel(user['email']))
+            user_layout.addRow("Role:", QLabel(user['role'].capitalize()))
             layout.addWidget(user_group)
 
             facility_group = QGroupBox("Facility Details")
             facility_layout = QFormLayout(facility_group)
-            facility_layout.addRow("Facility Name:", QLabel(booking['facility_name']))
-            facility_layout.addRow("Type:", QLabel(booking['facility_type']))
-            facility_layout.addRow("Capacity:", QLabel(str(booking['capacity'])))
-            facility_layout.addRow("Building:", QLabel(booking['building_name']))
-            facility_layout.addRow("Building Address:", QLabel(booking['building_address']))
+            facility_layout.addRow("Facility Name:", QLabel(facility.name if facility else 'Unknown'))
+            facility_layout.addRow("Type:", QLabel(facility.type if facility else 'N/A'))
+            facility_layout.addRow("Capacity:", QLabel(str(facility.capacity) if facility else 'N/A'))
+            facility_layout.addRow("Building:", QLabel(building.name if building else 'Unknown'))
+            facility_layout.addRow("Building Address:", QLabel(building.address if building else 'N/A'))
             layout.addWidget(facility_group)
 
             close_btn = QPushButton("Close")
@@ -1249,35 +1315,33 @@ class AdminDashboard(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to load booking details: {str(e)}")
             print(f"Error loading booking details: {e}")
 
-    def handle_booking_status_change(self, booking_id, new_status_text, combo_box):
-        """Handle status change from dropdown in bookings table."""
-        if new_status_text == "Change Status": # Default item, no action
-            return
-
-        db_status = new_status_text.replace(" ", "") # Remove spaces for enum
-
+    def show_booking_status_menu(self, booking_id, current_status, position):
+        """Status actions for an editable booking, shown under its Change Status button."""
+        menu = QMenu(self)
+        if current_status == "Pending Approval":
+            menu.addAction("Approve", partial(self.handle_booking_status_change, booking_id, "Approve", "Confirmed"))
+        menu.addAction("Cancel", partial(self.handle_booking_status_change, booking_id, "Cancel", "Cancelled"))
+        menu.addAction("Mark Completed", partial(self.handle_booking_status_change, booking_id, "Mark Completed", "Completed"))
+        menu.exec(position)
+
+    def handle_booking_status_change(self, booking_id, action_text, new_status):
+        """Apply a status action chosen from the bookings table."""
         reply = QMessageBox.question(
             self, "Confirm Status Change",
-            f"Are you sure you want to change booking status to '{new_status_text}'?",
+            f"Are you sure you want to {action_text.lower()} booking #{booking_id}?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
 
-        if reply == QMessageBox.StandardButton.Yes:
-            try:
-                # Update booking status in DB
-                query = "UPDATE bookings SET status = %s WHERE booking_id = %s"
-                result = execute_query(query, (db_status, booking_id), fetch=False)
-
-                if result is not None:
-                    QMessageBox.information(self, "Success", f"Booking #{booking_id} status updated to {new_status_text}.")
-                    self.load_bookings() # Refresh table
-                else:
-                    QMessageBox.critical(self, "Error", "Failed to update booking status.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to update booking status: {str(e)}")
-        else:
-            # If user cancels, reset combo box to original state (or 'Change Status')
-            combo_box.setCurrentIndex(0) # Reset to "Change Status"
+        try:
+            if update_booking_status(booking_id, new_status):
+                QMessageBox.information(self, "Success", f"Booking #{booking_id} status updated to {new_status}.")
+                self.refresh_bookings() # Patch the changed row
+            else:
+                QMessageBox.critical(self, "Error", "Failed to update booking status.")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to update booking status: {str(e)}")
 
     # --- Reports Page (Updated for SCNFBS) ---
     def create_reports_page(self):
@@ -1428,8 +1492,34 @@ class AdminDashboard(QWidget):
         self.user_activity_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         user_activity_layout.addWidget(self.user_activity_table)
 
+        # Facility Utilization Tab
+        utilization_tab = QWidget()
+        utilization_tab_layout = QVBoxLayout(utilization_tab)
+        self.facility_utilization_table = QTableWidget()
+        self.facility_utilization_table.setColumnCount(4)
+        self.facility_utilization_table.setHorizontalHeaderLabels(["Facility Name", "Building", "Occupied Hours", "Utilization"])
+        self.facility_utilization_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        utilization_tab_layout.addWidget(self.facility_utilization_table)
+        # Same figures rolled up per building and per facility type
+        self.utilization_groups_table = QTableWidget()
+        self.utilization_groups_table.setColumnCount(4)
+        self.utilization_groups_table.setHorizontalHeaderLabels(["Group", "Name", "Occupied Hours", "Utilization"])
+        self.utilization_groups_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        utilization_tab_layout.addWidget(self.utilization_groups_table)
+
+        # Busiest Hours Tab (hour-of-week occupancy heatmap)
+        occupancy_tab = QWidget()
+        occupancy_tab_layout = QVBoxLayout(occupancy_tab)
+        self.occupancy_chart = QFrame()
+        self.occupancy_chart.setMinimumHeight(300)
+        chart_layout = QVBoxLayout(self.occupancy_chart)
+        chart_layout.setContentsMargins(0, 0, 0, 0)
+        occupancy_tab_layout.addWidget(self.occupancy_chart)
+
         reports_tabs.addTab(facilities_tab, "Top Facilities")
         reports_tabs.addTab(user_activity_tab, "User Activity")
+        reports_tabs.addTab(utilization_tab, "Facility Utilization")
+        reports_tabs.addTab(occupancy_tab, "Busiest Hours")
 
         scroll_layout.addWidget(header)
         scroll_layout.addLayout(date_range_layout)
@@ -1460,67 +1550,52 @@ class AdminDashboard(QWidget):
 
     def refresh_analytics(self):
         start_date = self.reports_start_date.date().toString("yyyy-MM-dd")
-        end_date_obj = self.reports_end_date.date().addDays(1)
-        end_date = end_date_obj.toString("yyyy-MM-dd")
+        end_date = self.reports_end_date.date().toString("yyyy-MM-dd")
 
         try:
-            # Get key metrics
-            metrics_query = """
-                SELECT
-                    COUNT(*) as total_bookings,
-                    SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total_booked_hours,
-                    AVG(TIMESTAMPDIFF(MINUTE, start_time, end_time)) as avg_booking_duration_minutes
-                FROM bookings
-                WHERE start_time BETWEEN %s AND %s AND status = 'Confirmed'
-            """
-            metrics = execute_query(metrics_query, (start_date, end_date))
+            # One read of the daily facts (see booking_facts.py) is folded into every grouping
+            # the page shows: the status pie counts all bookings, the rest Confirmed and Completed
+            # ones (the sweeper marks ended Confirmed bookings Completed)
+            fact_rows = get_booking_facts(start_date, end_date, group_by=FACT_DIMENSIONS)
+            if fact_rows is None:
+                return
+            usage = aggregate_usage(fact_rows, statuses=('Confirmed', 'Completed'), groupings=('facility', 'user', 'day'))
+            by_status = aggregate_usage(fact_rows, groupings=('status',))['status']
+
+            # Get key metrics (totals are summed across campus shards, averages derived from them)
+            metrics = [{
+                'total_bookings': usage['total']['total_bookings'],
+                'total_booked_hours': usage['total']['total_minutes'] / 60,
+                'avg_booking_duration_minutes': usage['total']['avg_minutes']
+            }]
 
             if metrics and metrics[0]:
                 self.total_bookings_label.setText(str(metrics[0]['total_bookings'] or 0))
                 self.total_hours_label.setText(f"{float(metrics[0]['total_booked_hours'] or 0):.1f} hrs")
                 self.avg_duration_label.setText(f"{int(metrics[0]['avg_booking_duration_minutes'] or 0)} min")
             
-            # Calculate average utilization rate (needs more complex logic, simplified for now)
-            # This requires total available hours for all facilities within the date range
-            # For a basic approximation, let's assume maximum possible is a fixed number of facilities * hours/day * days
-            
-            # Simplified utilization: Sum of booked hours / (Number of bookable facilities * total hours in period)
+            # Utilization and occupancy need the booking intervals themselves: they come from the
+            # columnar analytics engine, which reads the range once and keeps it for a minute
             try:
-                bookable_facilities_count = execute_query("SELECT COUNT(*) as count FROM facilities WHERE is_bookable = TRUE")
-                bookable_facilities_count = bookable_facilities_count[0]['count'] if bookable_facilities_count else 0
-                
-                # Calculate total available hours in the period for all bookable facilities
-                # Assuming 12 hours/day for each facility for simplicity (e.g., 8 AM - 8 PM)
-                time_diff_days = (self.reports_end_date.date().toPython() - self.reports_start_date.date().toPython()).days + 1
-                total_available_hours_in_period = bookable_facilities_count * time_diff_days * 12 # 12 hours per day
-                
-                if total_available_hours_in_period > 0 and metrics[0]['total_booked_hours'] is not None:
-                    utilization_rate = (metrics[0]['total_booked_hours'] / total_available_hours_in_period) * 100
-                    self.utilization_label.setText(f"{utilization_rate:.1f}%")
-                else:
-                    self.utilization_label.setText("0.0%")
+                columns = load_booking_columns(self.reports_start_date.date().toPython(),
+                                               self.reports_end_date.date().toPython())
+                if columns is None:
+                    raise RuntimeError("bookings could not be loaded")
+                # Overlapping bookings count once; only time within opening hours counts
+                bookable = get_catalog().facilities(bookable_only=True)
+                utilization = columns.utilization(bookable)
+                self.utilization_label.setText(f"{utilization['total']['utilization'] * 100:.1f}%")
+                self.show_facility_utilization(bookable, utilization)
+                self.show_occupancy_heatmap(columns.hour_of_week_occupancy())
             except Exception as e:
                 print(f"Error calculating utilization: {e}")
                 self.utilization_label.setText("N/A")
 
             # Get bookings by status
-            status_query = """
-                SELECT status, COUNT(*) as count
-                FROM bookings
-                WHERE start_time BETWEEN %s AND %s
-                GROUP BY status
-            """
-            status_data = execute_query(status_query, (start_date, end_date))
+            status_data = [{'status': status, 'count': totals['total_bookings']} for status, totals in by_status.items()]
 
             # Get booking trend
-            booking_trend_query = """
-                SELECT DATE(start_time) as date, COUNT(*) as count
-                FROM bookings
-                WHERE start_time BETWEEN %s AND %s AND status = 'Confirmed'
-                GROUP BY DATE(start_time)
-                ORDER BY date
-            """
-            booking_trend_data = execute_query(booking_trend_query, (start_date, end_date))
+            booking_trend_data = [{'date': day, 'count': usage['day'][day]['total_bookings']} for day in sorted(usage['day'])]
 
             # Clear previous charts
             for i in reversed(range(self.status_chart.layout().count())):
@@ -1569,23 +1644,19 @@ class AdminDashboard(QWidget):
                 booking_trend_fig.tight_layout()
                 booking_trend_canvas.draw()
 
-            # Get top facilities (by total hours booked)
-            facilities_query = """
-                SELECT
-                    f.name,
-                    b.name as building_name,
-                    f.type,
-                    COUNT(bk.booking_id) as total_bookings,
-                    SUM(TIMESTAMPDIFF(MINUTE, bk.start_time, bk.end_time)) / 60 as total_hours
-                FROM facilities f
-                JOIN buildings b ON f.building_id = b.building_id
-                LEFT JOIN bookings bk ON f.facility_id = bk.facility_id
-                WHERE bk.start_time BETWEEN %s AND %s AND bk.status = 'Confirmed'
-                GROUP BY f.facility_id, f.name, b.name, f.type
-                ORDER BY total_hours DESC
-                LIMIT 10
-            """
-            facilities_data = execute_query(facilities_query, (start_date, end_date))
+            # Get top facilities (by total hours booked); names and types come from the catalog
+            catalog = get_catalog()
+            facilities_data = []
+            for facility_id, totals in sorted(usage['facility'].items(), key=lambda item: item[1]['total_minutes'], reverse=True):
+                facility = catalog.facility(facility_id)
+                if facility is None:
+                    continue
+                facilities_data.append({
+                    'name': facility.name, 'building_name': facility.building_name, 'type': facility.type,
+                    'total_bookings': totals['total_bookings'], 'total_hours': totals['total_minutes'] / 60,
+                })
+                if len(facilities_data) == 10:
+                    break
 
             if facilities_data:
                 self.top_facilities_table.setRowCount(len(facilities_data))
@@ -1596,21 +1667,17 @@ class AdminDashboard(QWidget):
                     self.top_facilities_table.setItem(i, 3, QTableWidgetItem(str(facility['total_bookings'])))
                     self.top_facilities_table.setItem(i, 4, QTableWidgetItem(f"{float(facility['total_hours'] or 0):.1f} hrs"))
 
-            # Get user activity (by total hours booked)
-            user_activity_query = """
-                SELECT
-                    u.username,
-                    u.role,
-                    COUNT(bk.booking_id) as total_bookings,
-                    SUM(TIMESTAMPDIFF(MINUTE, bk.start_time, bk.end_time)) / 60 as total_hours_booked
-                FROM users u
-                JOIN bookings bk ON u.user_id = bk.user_id
-                WHERE bk.start_time BETWEEN %s AND %s AND bk.status = 'Confirmed'
-                GROUP BY u.user_id, u.username, u.role
-                ORDER BY total_hours_booked DESC
-                LIMIT 10
-            """
-            user_activity_data = execute_query(user_activity_query, (start_date, end_date))
+            # Get user activity (by total hours booked); names come from the home database
+            user_totals = {
+                user_id: {'total_bookings': totals['total_bookings'], 'total_hours_booked': totals['total_minutes'] / 60}
+                for user_id, totals in usage['user'].items()
+            }
+            top_user_ids = sorted(user_totals, key=lambda uid: user_totals[uid]['total_hours_booked'], reverse=True)[:10]
+            users = get_usernames(top_user_ids)
+            user_activity_data = [
+                dict(user_totals[uid], username=users[uid]['username'], role=users[uid]['role'])
+                for uid in top_user_ids if uid in users
+            ]
 
             if user_activity_data:
                 self.user_activity_table.setRowCount(len(user_activity_data))
@@ -1624,6 +1691,54 @@ class AdminDashboard(QWidget):
             print(f"Error refreshing analytics: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load analytics data: {str(e)}")
 
+    def show_facility_utilization(self, facilities, utilization):
+        """Fill the Facility Utilization tab, most used first, with building and type totals below."""
+        by_facility = utilization['facility']
+        rows = sorted(facilities, key=lambda f: by_facility[f.facility_id]['utilization'], reverse=True)
+        self.facility_utilization_table.setRowCount(len(rows))
+        for i, facility in enumerate(rows):
+            totals = by_facility[facility.facility_id]
+            self.facility_utilization_table.setItem(i, 0, QTableWidgetItem(facility.name))
+            self.facility_utilization_table.setItem(i, 1, QTableWidgetItem(facility.building_name))
+            self.facility_utilization_table.setItem(i, 2, QTableWidgetItem(f"{totals['occupied_minutes'] / 60:.1f} hrs"))
+            self.facility_utilization_table.setItem(i, 3, QTableWidgetItem(f"{totals['utilization'] * 100:.1f}%"))
+
+        catalog = get_catalog()
+        groups = []
+        for building_id, totals in utilization['building'].items():
+            building = catalog.building(building_id)
+            groups.append(("Building", building.name if building else "Unknown", totals))
+        for facility_type, totals in utilization['type'].items():
+            groups.append(("Type", facility_type or "Unknown", totals))
+        groups.sort(key=lambda group: (group[0], -group[2]['utilization']))
+        self.utilization_groups_table.setRowCount(len(groups))
+        for i, (group, name, totals) in enumerate(groups):
+            self.utilization_groups_table.setItem(i, 0, QTableWidgetItem(group))
+            self.utilization_groups_table.setItem(i, 1, QTableWidgetItem(name))
+            self.utilization_groups_table.setItem(i, 2, QTableWidgetItem(f"{totals['occupied_minutes'] / 60:.1f} hrs"))
+            self.utilization_groups_table.setItem(i, 3, QTableWidgetItem(f"{totals['utilization'] * 100:.1f}%"))
+
+    def show_occupancy_heatmap(self, occupancy):
+        """Draw the 7 x 24 average bookings-in-progress grid on the Busiest Hours tab."""
+        for i in reversed(range(self.occupancy_chart.layout().count())):
+            widget = self.occupancy_chart.layout().itemAt(i).widget()
+            if widget: widget.setParent(None)
+
+        occupancy_fig = Figure(figsize=(8, 3), dpi=100)
+        occupancy_canvas = FigureCanvas(occupancy_fig)
+        ax = occupancy_fig.add_subplot(111)
+        image = ax.imshow(occupancy, aspect='auto', cmap='Blues')
+        ax.set_yticks(range(7))
+        ax.set_yticklabels(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+        ax.set_xticks(range(0, 24, 2))
+        ax.set_xlabel('Hour of Day')
+        ax.set_title('Average Bookings in Progress')
+        occupancy_fig.colorbar(image, ax=ax)
+
+        self.occupancy_chart.layout().addWidget(occupancy_canvas)
+        occupancy_fig.tight_layout()
+        occupancy_canvas.draw()
+
     # --- System Settings Page (Adjusted for SCNFBS) ---
     def create_settings_page(self):
         page = QWidget()
@@ -2273,7 +2388,7 @@ class AdminDashboard(QWidget):
 
     def manage_users(self):
         self.content_area.setCurrentWidget(self.users_page)
-        self.load_users(self.role_filter.currentText()) # Refresh users when shown
+        self.load_users() # Refresh users when shown
 
     def manage_buildings(self): # New slot
         self.content_area.setCurrentWidget(self.buildings_page)
@@ -2325,10 +2440,10 @@ class AdminDashboard(QWidget):
                 self._bookings_refresh_counter += 1
                 if self._bookings_refresh_counter >= 3: # Every 1.5 seconds
                     self._bookings_refresh_counter = 0
-                    if hasattr(self, 'booking_search_input') and not self.booking_search_input.text().strip():
-                        self._skip_refresh = True
-                        self.load_bookings(force_refresh=False)
-                        self._skip_refresh = False
+                    # Refreshes use the filters of the last search, whatever is being typed
+                    self._skip_refresh = True
+                    self.refresh_bookings()
+                    self._skip_refresh = False
 
             # Users page refresh
             elif current_widget == self.users_page:
@@ -2338,7 +2453,7 @@ class AdminDashboard(QWidget):
                     self._users_refresh_counter = 0
                     if hasattr(self, 'role_filter'):
                         self._skip_refresh = True
-                        self.load_users(self.role_filter.currentText())
+                        self.load_users()
                         self._skip_refresh = False
 
             # Buildings page refresh
@@ -2446,41 +2561,27 @@ class AdminDashboard(QWidget):
                 f"Failed to generate booking numbers: {str(e)}"
             )
 
+    def format_user_count(self, summary):
+        # The count is approximate past a cap (see get_admin_summary): show it as "N+"
+        user_count = summary.get('user_count', 0)
+        return f"{user_count:,}+" if summary.get('user_count_capped') else str(user_count)
+
     def refresh_dashboard_stats(self):
         try:
-            # Update facility count
-            facility_count = execute_query("SELECT COUNT(*) as count FROM facilities")
-            if facility_count and hasattr(self, 'stat_widgets') and 'facility_count_value' in self.stat_widgets:
-                self.stat_widgets['facility_count_value'].setText(str(facility_count[0]['count']))
-
-            # Update user count
-            user_count = execute_query("SELECT COUNT(*) as count FROM users WHERE role IN ('student', 'faculty')")
-            if user_count and hasattr(self, 'stat_widgets') and 'user_count_value' in self.stat_widgets:
-                self.stat_widgets['user_count_value'].setText(str(user_count[0]['count']))
-
-            # Update today's bookings
-            today_bookings = execute_query("SELECT COUNT(*) as count FROM bookings WHERE DATE(start_time) = CURDATE() AND status != 'Cancelled'")
-            if today_bookings and hasattr(self, 'stat_widgets') and 'today_bookings_value' in self.stat_widgets:
-                self.stat_widgets['today_bookings_value'].setText(str(today_bookings[0]['count']))
-
-            # Update total booking hours
-            total_booking_hours = execute_query("SELECT SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total FROM bookings WHERE status = 'Confirmed'")
-            if total_booking_hours and total_booking_hours[0]['total'] is not None and hasattr(self, 'stat_widgets') and 'total_booking_hours_value' in self.stat_widgets:
-                self.stat_widgets['total_booking_hours_value'].setText(f"{float(total_booking_hours[0]['total']):.1f} hrs")
-            elif hasattr(self, 'stat_widgets') and 'total_booking_hours_value' in self.stat_widgets:
-                self.stat_widgets['total_booking_hours_value'].setText("0.0 hrs")
+            summary = get_admin_summary()
+            if summary and hasattr(self, 'stat_widgets'):
+                if 'facility_count_value' in self.stat_widgets:
+                    self.stat_widgets['facility_count_value'].setText(str(summary['facility_count']))
+                if 'user_count_value' in self.stat_widgets:
+                    self.stat_widgets['user_count_value'].setText(self.format_user_count(summary))
+                if 'today_bookings_value' in self.stat_widgets:
+                    self.stat_widgets['today_bookings_value'].setText(str(summary['today_bookings']))
+                if 'total_booking_hours_value' in self.stat_widgets:
+                    self.stat_widgets['total_booking_hours_value'].setText(f"{summary['total_booking_hours']:.1f} hrs")
 
             # Update recent bookings table
             if hasattr(self, 'recent_bookings_table'):
-                recent_bookings = execute_query("""
-                    SELECT bk.booking_id, bk.booking_number, u.username as user_name, f.name as facility_name,
-                           bk.start_time, bk.end_time, bk.status
-                    FROM bookings bk
-                    JOIN users u ON bk.user_id = u.user_id
-                    JOIN facilities f ON bk.facility_id = f.facility_id
-                    ORDER BY bk.created_at DESC
-                    LIMIT 5
-                """)
+                recent_bookings = get_recent_bookings(5)
 
                 if recent_bookings:
                     current_row_count = self.recent_bookings_table.rowCount()
@@ -2540,6 +2641,17 @@ class BuildingDialog(QDialog):
         layout.addRow("Latitude:", self.latitude_input)
         layout.addRow("Longitude:", self.longitude_input)
 
+        # New buildings go to a campus shard; existing ones stay where their ID puts them
+        self.campus_combo = None
+        router = get_router()
+        if not self.building and router.is_sharded():
+            self.campus_combo = QComboBox()
+            self.campus_combo.addItems(router.campuses())
+            home = router.home_shard()
+            if home:
+                self.campus_combo.setCurrentText(home['name'])
+            layout.addRow("Campus:", self.campus_combo)
+
         button_layout = QHBoxLayout()
         save_btn = QPushButton("Save")
         save_btn.clicked.connect(self.save_building)
@@ -2568,7 +2680,8 @@ class BuildingDialog(QDialog):
             else:
                 # Add new
                 from db_utils import add_building
-                result = add_building(name, address, description, latitude, longitude)
+                campus = self.campus_combo.currentText() if self.campus_combo else None
+                result = add_building(name, address, description, latitude, longitude, campus=campus)
 
             if result is not None:
                 QMessageBox.information(self, "Success", "Building saved successfully.")
@@ -2659,7 +2772,7 @@ class FacilityDialog(QDialog):
 
     def load_buildings_into_combo(self, combo_box):
         try:
-            buildings = execute_query("SELECT building_id, name FROM buildings ORDER BY name")
+            buildings = get_catalog().buildings()
             if not buildings:
                 QMessageBox.warning(self, "No Buildings", "Please add buildings first before adding facilities.")
                 return
@@ -0,0 +1,76 @@
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton
+
+
+class KeysetPager(QWidget):
+    """
+    Previous/Next bar for keyset-paginated lists. A page is identified by the sort
+    key of the last row before it, so the pager remembers the start key of every
+    page visited to be able to go back.
+    """
+    page_changed = Signal()
+
+    def __init__(self, noun, parent=None):
+        super().__init__(parent)
+        self._noun = noun
+        self._starts = [None]   # start key of page 1, 2, ... up to the current page
+        self._next_start = None
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.prev_btn = QPushButton("◀ Previous")
+        self.prev_btn.setObjectName("action-button")
+        self.prev_btn.clicked.connect(self.previous_page)
+        self.next_btn = QPushButton("Next ▶")
+        self.next_btn.setObjectName("action-button")
+        self.next_btn.clicked.connect(self.next_page)
+        self.label = QLabel()
+        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label.setStyleSheet("color: #2c3e50;")
+
+        layout.addWidget(self.prev_btn)
+        layout.addStretch()
+        layout.addWidget(self.label)
+        layout.addStretch()
+        layout.addWidget(self.next_btn)
+        self.update_page(None, False)
+
+    def after(self):
+        """Keyset cursor for the current page (None for the first page)."""
+        return self._starts[-1]
+
+    def page_number(self):
+        return len(self._starts)
+
+    def reset(self):
+        """Back to page 1, e.g. when the filters change."""
+        self._starts = [None]
+        self._next_start = None
+
+    def update_page(self, last_key, has_more, total=None, page_size=None):
+        """Record the current page's last row key and refresh the buttons and label."""
+        self._next_start = last_key if has_more else None
+        self.prev_btn.setEnabled(len(self._starts) > 1)
+        self.next_btn.setEnabled(self._next_start is not None)
+
+        text = f"Page {self.page_number()}"
+        if total is not None and page_size:
+            count = total['count']
+            pages = max(self.page_number(), -(-count // page_size))
+            if total['capped']:
+                text += f" of {pages}+ · {count:,}+ {self._noun}"
+            elif total['estimate']:
+                text += f" of ~{pages} · ~{count:,} {self._noun}"
+            else:
+                text += f" of {pages} · {count:,} {self._noun}"
+        self.label.setText(text)
+
+    def next_page(self):
+        if self._next_start is not None:
+            self._starts.append(self._next_start)
+            self.page_changed.emit()
+
+    def previous_page(self):
+        if len(self._starts) > 1:
+            self._starts.pop()
+            self.page_changed.emit()
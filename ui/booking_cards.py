@@ -0,0 +1,287 @@
+import datetime
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QWidget, QFrame, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea, QTabWidget
+from db_utils import get_user_booking_history, get_user_upcoming_bookings, HISTORY_PAGE_SIZE
+from repository import get_catalog
+
+# "My Bookings" card lists shared by the student and faculty dashboards. Cards
+# are pooled by booking_id: a refresh updates the labels of cards that already
+# exist, creates cards only for new bookings and deletes only the ones that are
+# gone, so the 2.5 s auto-refresh neither churns widgets nor flickers.
+#
+# Only the Upcoming tab is reloaded on refresh. Past and Cancelled bookings are
+# read a page at a time when their tab is opened or scrolled to the bottom, and
+# kept for the session in a BookingHistoryWindow. MyBookingsTabs puts the three
+# tabs together for the student and faculty dashboards.
+
+TABS = ("Upcoming", "Past", "Cancelled")
+
+STATUS_COLORS = {
+    "Confirmed": "#2ecc71",         # Green
+    "Pending Approval": "#f39c12",  # Orange
+    "Completed": "#3498db",         # Blue
+    "Cancelled": "#e74c3c",         # Red
+}
+
+
+def group_bookings_by_tab(bookings, now=None):
+    """Split bookings into the Upcoming / Past / Cancelled tabs, keeping their order."""
+    now = now or datetime.datetime.now()
+    groups = {tab: [] for tab in TABS}
+    for booking in bookings or []:
+        tab_status = "Upcoming" # Default
+        if booking['status'] == 'Cancelled':
+            tab_status = "Cancelled"
+        elif booking['end_time'] < now and booking['status'] == 'Confirmed':
+            tab_status = "Past"
+            booking['status'] = 'Completed' # The status sweeper will persist this; display only
+        elif booking['end_time'] < now:
+            tab_status = "Past"
+        groups[tab_status].append(booking)
+    return groups
+
+
+class BookingCard(QFrame):
+    cancel_requested = Signal(int)  # booking_id
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.booking_id = None
+        self._shown = None  # values currently displayed, to skip no-op updates
+        self.setObjectName("booking-card")
+        card_layout = QVBoxLayout(self)
+
+        # Booking header
+        header_layout = QHBoxLayout()
+        self.booking_number_label = QLabel()
+        self.booking_number_label.setObjectName("booking-id")
+        self.booking_number_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        self.time_label = QLabel()
+        self.time_label.setObjectName("booking-time")
+        header_layout.addWidget(self.booking_number_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.time_label)
+
+        # Status label
+        status_layout = QHBoxLayout()
+        self.status_value = QLabel()
+        status_layout.addWidget(QLabel("Status:"))
+        status_layout.addWidget(self.status_value)
+        status_layout.addStretch()
+
+        # Facility info
+        self.facility_label = QLabel()
+        self.facility_label.setObjectName("facility-info")
+        self.purpose_label = QLabel()
+
+        # Only upcoming bookings can be cancelled
+        buttons_layout = QHBoxLayout()
+        self.cancel_btn = QPushButton("Cancel Booking")
+        self.cancel_btn.setObjectName("delete-button")
+        self.cancel_btn.clicked.connect(lambda: self.cancel_requested.emit(self.booking_id))
+        buttons_layout.addWidget(self.cancel_btn)
+
+        card_layout.addLayout(header_layout)
+        card_layout.addLayout(status_layout)
+        card_layout.addWidget(self.facility_label)
+        card_layout.addWidget(self.purpose_label)
+        card_layout.addLayout(buttons_layout)
+
+    def update_booking(self, booking, cancellable):
+        values = (
+            booking['booking_number'],
+            f"{booking['start_time'].strftime('%Y-%m-%d %H:%M')} - {booking['end_time'].strftime('%H:%M')}",
+            booking['status'],
+            f"Facility: {booking['facility_name']} ({booking['building_name']})",
+            f"Purpose: {booking['purpose']}",
+            cancellable,
+        )
+        self.booking_id = booking['booking_id']
+        if values == self._shown:
+            return
+        self._shown = values
+        booking_number, time_slot, status, facility, purpose, cancellable = values
+        self.booking_number_label.setText(f"Booking {booking_number}")
+        self.time_label.setText(time_slot)
+        self.status_value.setText(status)
+        self.status_value.setStyleSheet(f"color: {STATUS_COLORS.get(status, '#95a5a6')}; font-weight: bold;")
+        self.facility_label.setText(facility)
+        self.purpose_label.setText(purpose)
+        self.cancel_btn.setVisible(cancellable)
+
+
+class BookingHistoryWindow:
+    """The part of one history tab ('Past' or 'Cancelled') loaded so far this session."""
+
+    def __init__(self, user_id, tab_status, page_size=HISTORY_PAGE_SIZE):
+        self.user_id = user_id
+        self.tab_status = tab_status
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self):
+        """Forget the loaded rows; the next load_more() starts from the newest again."""
+        self.rows = []
+        self.has_more = True
+        self.loaded = False
+
+    def load_more(self):
+        """Append the next page of older bookings. Returns False on a database error."""
+        if not self.has_more:
+            return True
+        before = (self.rows[-1]['start_time'], self.rows[-1]['booking_id']) if self.rows else None
+        rows, has_more = get_user_booking_history(
+            self.user_id, cancelled=self.tab_status == "Cancelled", before=before, limit=self.page_size
+        )
+        if rows is None:
+            return False
+        get_catalog().attach_names(rows)
+        self.rows.extend(group_bookings_by_tab(rows)[self.tab_status])
+        self.has_more = has_more
+        self.loaded = True
+        return True
+
+
+def connect_infinite_scroll(scroll_area, load_more):
+    """Call load_more() whenever the scroll area is scrolled (near) to the bottom."""
+    scroll_bar = scroll_area.verticalScrollBar()
+    scroll_bar.valueChanged.connect(
+        lambda value: load_more() if scroll_bar.maximum() and value >= scroll_bar.maximum() - 40 else None
+    )
+
+
+class BookingCardList(QWidget):
+    """One tab's cards, kept in step with a list of bookings by booking_id."""
+    cancel_requested = Signal(int)
+    load_more_requested = Signal()
+
+    def __init__(self, tab_status, read_only=False, parent=None):
+        super().__init__(parent)
+        self.tab_status = tab_status
+        self.read_only = read_only  # offline session: no Cancel buttons
+        self._cards = {}   # booking_id -> BookingCard
+        self._order = []   # booking_ids in display order
+        self._layout = QVBoxLayout(self)
+        self._layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.empty_label = QLabel(f"No {tab_status.lower()} bookings")
+        self.empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._layout.addWidget(self.empty_label)
+        # Stays below the cards; shown while older history can still be loaded
+        self.load_more_btn = QPushButton("Load older bookings")
+        self.load_more_btn.setObjectName("action-button")
+        self.load_more_btn.clicked.connect(self.load_more_requested)
+        self.load_more_btn.hide()
+        self._layout.addWidget(self.load_more_btn)
+
+    def set_bookings(self, bookings, empty_text=None):
+        """Show exactly `bookings`, in order, reusing the cards that already exist."""
+        wanted = [booking['booking_id'] for booking in bookings]
+        for booking_id in set(self._cards) - set(wanted):
+            card = self._cards.pop(booking_id)
+            self._layout.removeWidget(card)
+            card.deleteLater()
+
+        for booking in bookings:
+            card = self._cards.get(booking['booking_id'])
+            if card is None:
+                card = BookingCard(self)
+                card.cancel_requested.connect(self.cancel_requested)
+                self._cards[booking['booking_id']] = card
+            card.update_booking(booking, self.tab_status == "Upcoming" and not self.read_only)
+
+        if wanted != self._order:
+            # Re-insert in order; moving a widget within the layout does not recreate it
+            for position, booking_id in enumerate(wanted):
+                card = self._cards[booking_id]
+                if self._layout.indexOf(card) != position + 1:  # +1: the empty label stays first
+                    self._layout.removeWidget(card)
+                    self._layout.insertWidget(position + 1, card)
+            self._order = wanted
+
+        self.empty_label.setText(empty_text or f"No {self.tab_status.lower()} bookings")
+        self.empty_label.setVisible(not bookings)
+
+    def set_has_more(self, has_more):
+        self.load_more_btn.setVisible(has_more)
+
+
+class MyBookingsTabs(QTabWidget):
+    """
+    The Upcoming / Past / Cancelled tabs of "My Bookings". Search results replace
+    all three until the next reload().
+    """
+    cancel_requested = Signal(int)
+
+    def __init__(self, user_id, read_only=False, parent=None):
+        super().__init__(parent)
+        self.card_lists = {}
+        self.history = {status: BookingHistoryWindow(user_id, status) for status in ("Past", "Cancelled")}
+        self.user_id = user_id
+        self._upcoming_ids = set()
+        self._showing_search = False
+        for status in TABS:
+            self.addTab(self._create_tab(status, read_only), f"{status} Bookings")
+        self.currentChanged.connect(self._on_tab_changed)
+
+    def _create_tab(self, status, read_only):
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        card_list = BookingCardList(status, read_only)
+        card_list.cancel_requested.connect(self.cancel_requested)
+        if status in self.history:
+            # Older history is fetched on demand: scrolling to the end or the footer button
+            card_list.load_more_requested.connect(lambda: self.load_more(status))
+            connect_infinite_scroll(scroll, lambda: self.load_more(status))
+        scroll.setWidget(card_list)
+        self.card_lists[status] = card_list
+        return scroll
+
+    def reload(self):
+        """Reload the Upcoming tab; history pages are only re-read once a booking has left it"""
+        upcoming = get_user_upcoming_bookings(self.user_id)
+        if upcoming is None:
+            return
+        upcoming_ids = {booking['booking_id'] for booking in upcoming}
+        if self._upcoming_ids - upcoming_ids:
+            # A booking ended or was cancelled: it now belongs at the top of a history tab
+            for window in self.history.values():
+                window.reset()
+        self._upcoming_ids = upcoming_ids
+
+        groups = group_bookings_by_tab(get_catalog().attach_names(upcoming))
+        self.card_lists['Upcoming'].set_bookings(groups['Upcoming'])
+        self._showing_search = False
+        current = TABS[self.currentIndex()]
+        for status in self.history:
+            self._show_history(status, load=status == current)
+
+    def show_search_results(self, bookings, empty_text=None):
+        """Group search results into the three tabs and update their cards in place."""
+        groups = group_bookings_by_tab(bookings)
+        self._showing_search = True
+        for status, card_list in self.card_lists.items():
+            card_list.set_bookings(groups[status], empty_text.format(status=status.lower()) if empty_text else None)
+            card_list.set_has_more(False)
+
+    def load_more(self, status):
+        """Append the next page of older bookings to a history tab"""
+        window = self.history[status]
+        if self._showing_search or not window.has_more:
+            return
+        if window.load_more():
+            self._show_history(status)
+
+    def _show_history(self, status, load=False):
+        """Show the loaded part of a history tab, reading its first page if `load` and not read yet"""
+        window = self.history[status]
+        if load and not window.loaded:
+            window.load_more()
+        card_list = self.card_lists[status]
+        card_list.set_bookings(window.rows)
+        card_list.set_has_more(window.loaded and window.has_more)
+
+    def _on_tab_changed(self, index):
+        status = TABS[index]
+        if status in self.history and not self._showing_search:
+            self._show_history(status, load=True)
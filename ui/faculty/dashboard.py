@@ -7,16 +7,17 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QRunnable, QThreadPool, Signal, QObject
 from PySide6.QtCore import Qt, Signal, QSize, QDate, QTimer, QDateTime, QThread
 from PySide6.QtGui import QFont, QIcon, QPixmap, QColor
-from db_utils import execute_query, get_facility_availability, create_booking, cancel_booking, get_user_bookings # Import relevant SCNFBS DB functions
+from db_utils import get_facility_availability, create_booking, cancel_booking, get_user_bookings, get_user_dashboard_stats, get_booking_facts, aggregate_usage, FACT_DIMENSIONS, get_booking_rule # Import relevant SCNFBS DB functions
+from repository import get_catalog
+from email_outbox import enqueue_email
+from ui.reminders import ReminderScheduler
+from ui.booking_cards import MyBookingsTabs
 import matplotlib.pyplot as plt
 import numpy as np
 import re 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # Use QTAgg for better integration
 from matplotlib.figure import Figure
 import datetime # Import the datetime module explicitly
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 
 class AvailabilityWorker(QObject):
@@ -44,15 +45,14 @@ class FacultyDashboard(QWidget):
         self.user = user
         self.user_id = user.user_id # Access user ID directly from the User object
         
-        # Initialize booking layouts dictionary
-        self.booking_layouts = {
-            'Upcoming': None,
-            'Past': None,
-            'Cancelled': None
-        }
-
         self.initUI()
 
+        # Reminders are scheduled once and fired by a timer - no polling queries
+        self.reminders = ReminderScheduler(self)
+        self.reminders.upcoming_changed.connect(self.update_reminder_count)
+        self.reminders.reminder_due.connect(self.show_booking_reminder)
+        self.reminders.load(self.user_id)
+
         # Load initial data
         self.load_dashboard_stats()
         self.load_facilities_for_booking() # Load facilities when dashboard starts
@@ -91,6 +91,11 @@ class FacultyDashboard(QWidget):
 
         user_info_layout.addWidget(welcome_label)
         user_info_layout.addWidget(user_role_label)
+        if self.user.offline:
+            # Signed in against the local snapshot: everything that writes is disabled
+            offline_label = QLabel("Offline - read-only")
+            offline_label.setStyleSheet("color: #f39c12; font-weight: bold;")
+            user_info_layout.addWidget(offline_label)
         sidebar_layout.addWidget(user_info)
 
         # Navigation buttons - Updated for SCNFBS
@@ -427,176 +432,31 @@ class FacultyDashboard(QWidget):
         search_layout.addWidget(search_btn)
         search_layout.addWidget(refresh_btn)
 
-        # Tab widget for different booking statuses
-        tabs = QTabWidget()
-
-        # Create tabs for different booking states
-        upcoming_bookings_tab = self.create_bookings_tab("Upcoming")
-        past_bookings_tab = self.create_bookings_tab("Past")
-        cancelled_bookings_tab = self.create_bookings_tab("Cancelled")
-
-        # Add tabs to widget
-        tabs.addTab(upcoming_bookings_tab, "Upcoming Bookings")
-        tabs.addTab(past_bookings_tab, "Past Bookings")
-        tabs.addTab(cancelled_bookings_tab, "Cancelled Bookings")
+        # Upcoming / Past / Cancelled tabs; Past and Cancelled load page by page
+        tabs = self.my_bookings_tabs = MyBookingsTabs(self.user_id, read_only=self.user.offline)
+        tabs.cancel_requested.connect(self.cancel_my_booking)
 
         layout.addWidget(header)
         layout.addLayout(search_layout)
         layout.addWidget(tabs)
 
-        # Store tab references
-        self.booking_tabs = {
-            "Upcoming": upcoming_bookings_tab,
-            "Past": past_bookings_tab,
-            "Cancelled": cancelled_bookings_tab
-        }
-
         # Load orders
         self.load_all_my_bookings()
 
         return page
 
-    def create_bookings_tab(self, status):
-        """Create a tab for bookings with the given status"""
-        tab = QWidget()
-        layout = QVBoxLayout(tab)
-
-        # Create scroll area for bookings
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-
-        # Content widget
-        content = QWidget()
-        self.booking_layouts[status] = QVBoxLayout(content)
-        self.booking_layouts[status].setAlignment(Qt.AlignmentFlag.AlignTop)
-
-        scroll.setWidget(content)
-        layout.addWidget(scroll)
-
-        return tab
-
     def load_all_my_bookings(self):
-        """Load bookings for all tabs for the logged-in user"""
-        # Clear existing bookings
-        for status, layout in self.booking_layouts.items():
-            while layout.count():
-                item = layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-
-        # Add "No bookings" message to each tab initially
-        for status, layout in self.booking_layouts.items():
-            no_bookings = QLabel(f"No {status.lower()} bookings")
-            no_bookings.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.addWidget(no_bookings)
-
-        # Get all bookings for this user
+        """Reload the Upcoming tab (history tabs reload only once a booking has left it)"""
         try:
-            # get_user_bookings is a new function in db_utils
-            my_bookings = get_user_bookings(self.user_id)
-
-            if not my_bookings:
-                return
-
-            # Clear "No bookings" messages
-            for status, layout in self.booking_layouts.items():
-                while layout.count():
-                    item = layout.takeAt(0)
-                    widget = item.widget()
-                    if widget:
-                        widget.deleteLater()
-
-            # Group by status (Upcoming, Past, Cancelled)
-            now = datetime.datetime.now()
-            
-            for booking in my_bookings:
-                tab_status = "Upcoming" # Default
-                if booking['status'] == 'Cancelled':
-                    tab_status = "Cancelled"
-                elif booking['end_time'] < now and booking['status'] == 'Confirmed':
-                    tab_status = "Past"
-                    execute_query("UPDATE bookings SET status = 'Completed' WHERE booking_id = %s", (booking['booking_id'],), fetch=False)
-                    booking['status'] = 'Completed' # Update locally for display
-                elif booking['end_time'] < now:
-                    tab_status = "Past"
-                
-                self.add_booking_card(booking, tab_status)
-
+            self.my_bookings_tabs.reload()
         except Exception as e:
             print(f"Error loading my bookings: {e}")
             self.show_error_message("Error", f"Failed to load your bookings: {str(e)}")
 
-    def add_booking_card(self, booking, tab_status):
-        """Add a booking card to the appropriate tab"""
-        card = QFrame()
-        card.setObjectName("booking-card")
-        card_layout = QVBoxLayout(card)
-
-        # Booking header
-        header_layout = QHBoxLayout()
-
-        booking_number_label = QLabel(f"Booking {booking['booking_number']}")
-        booking_number_label.setObjectName("booking-id")
-        booking_number_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-
-        time_label = QLabel(f"{booking['start_time'].strftime('%Y-%m-%d %H:%M')} - {booking['end_time'].strftime('%H:%M')}")
-        time_label.setObjectName("booking-time")
-
-        header_layout.addWidget(booking_number_label)
-        header_layout.addStretch()
-        header_layout.addWidget(time_label)
-
-        # Status label
-        status_layout = QHBoxLayout()
-        status_label = QLabel("Status:")
-        status_value = QLabel(booking['status'])
-
-        # Set color based on status
-        status_color = "#95a5a6"  # Default gray
-        if booking['status'] == "Confirmed":
-            status_color = "#2ecc71"  # Green
-        elif booking['status'] == "Pending Approval":
-            status_color = "#f39c12"  # Orange
-        elif booking['status'] == "Completed":
-            status_color = "#3498db"  # Blue
-        elif booking['status'] == "Cancelled":
-            status_color = "#e74c3c"  # Red
-
-        status_value.setStyleSheet(f"color: {status_color}; font-weight: bold;")
-
-        status_layout.addWidget(status_label)
-        status_layout.addWidget(status_value)
-        status_layout.addStretch()
-
-        # Facility info
-        facility_label = QLabel(f"Facility: {booking['facility_name']} ({booking['building_name']})")
-        facility_label.setObjectName("facility-info")
-        
-        purpose_label = QLabel(f"Purpose: {booking['purpose']}")
-        
-        # Action buttons based on tab status
-        buttons_layout = QHBoxLayout()
-
-        if tab_status == "Upcoming":
-            cancel_btn = QPushButton("Cancel Booking")
-            cancel_btn.setObjectName("delete-button")
-            cancel_btn.clicked.connect(lambda: self.cancel_my_booking(booking['booking_id']))
-            buttons_layout.addWidget(cancel_btn)
-        
-        # Add all components to card
-        card_layout.addLayout(header_layout)
-        card_layout.addLayout(status_layout)
-        card_layout.addWidget(facility_label)
-        card_layout.addWidget(purpose_label)
-        card_layout.addLayout(buttons_layout)
-
-        # Add card to appropriate layout
-        if tab_status in self.booking_layouts:
-            self.booking_layouts[tab_status].addWidget(card)
-
     def cancel_my_booking(self, booking_id):
         """Cancel a user's booking"""
+        if self.user.offline:
+            return
         reply = self.show_question_message(
             "Confirm Cancellation",
             "Are you sure you want to cancel this booking? This action cannot be undone."
@@ -605,6 +465,7 @@ class FacultyDashboard(QWidget):
             result = cancel_booking(booking_id) # Uses the function from db_utils
 
             if result:
+                self.reminders.remove_booking(booking_id)
                 self.show_info_message(
     "📧 Email",
     "Dear Faculty,\n\nYour booking has been cancelled.\n\nRegards,\nSmart Campus Team"
@@ -620,74 +481,15 @@ class FacultyDashboard(QWidget):
         start_date = self.bookings_start_date.date().toString("yyyy-MM-dd")
         end_date = self.bookings_end_date.date().toString("yyyy-MM-dd")
 
-        # Clear existing bookings in all tabs
-        for status, layout in self.booking_layouts.items():
-            while layout.count():
-                item = layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-        
-        # Add "No bookings" message to each tab initially
-        for status, layout in self.booking_layouts.items():
-            no_bookings = QLabel(f"No {status.lower()} bookings found matching criteria.")
-            no_bookings.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.addWidget(no_bookings)
-
         try:
-            # Adapt get_user_bookings to handle search term as well
-            # This requires a modification to get_user_bookings in db_utils to accept search_term
-            # For now, let's construct the query directly or assume get_user_bookings is extended
-            
-            query = """
-                SELECT bk.*, f.name as facility_name, bu.name as building_name
-                FROM bookings bk
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings bu ON f.building_id = bu.building_id
-                WHERE bk.user_id = %s
-            """
-            params = [self.user_id]
-
-            if search_term:
-                query += " AND (f.name LIKE %s OR bu.name LIKE %s)"
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-            if start_date:
-                query += " AND DATE(bk.start_time) >= %s"
-                params.append(start_date)
+            # Facility/building name matching happens against the in-memory catalog
+            catalog = get_catalog()
+            facility_ids = catalog.facility_ids_matching(search_term) if search_term else None
+            filtered_bookings = catalog.attach_names(get_user_bookings(
+                self.user_id, start_date=start_date, end_date=end_date, facility_ids=facility_ids
+            ))
 
-            if end_date:
-                query += " AND DATE(bk.end_time) <= %s"
-                params.append(end_date)
-
-            query += " ORDER BY bk.start_time DESC"
-            
-            filtered_bookings = execute_query(query, params)
-
-            if not filtered_bookings:
-                return # Keep "No bookings found" messages
-
-            # Clear "No bookings" messages again as we have data
-            for status, layout in self.booking_layouts.items():
-                while layout.count():
-                    item = layout.takeAt(0)
-                    widget = item.widget()
-                    if widget:
-                        widget.deleteLater()
-
-            now = datetime.datetime.now()
-            for booking in filtered_bookings:
-                tab_status = "Upcoming"
-                if booking['status'] == 'Cancelled':
-                    tab_status = "Cancelled"
-                elif booking['end_time'] < now and booking['status'] == 'Confirmed':
-                    tab_status = "Past"
-                    execute_query("UPDATE bookings SET status = 'Completed' WHERE booking_id = %s", (booking['booking_id'],), fetch=False)
-                    booking['status'] = 'Completed' # Update locally for display
-                elif booking['end_time'] < now:
-                    tab_status = "Past"
-                
-                self.add_booking_card(booking, tab_status)
+            self.my_bookings_tabs.show_search_results(filtered_bookings, "No {status} bookings found matching criteria.")
 
         except Exception as e:
             print(f"Error searching my bookings: {e}")
@@ -769,8 +571,7 @@ class FacultyDashboard(QWidget):
     def load_buildings_into_combo(self, combo_box):
         """Helper to load buildings into a QComboBox."""
         try:
-            buildings = execute_query("SELECT building_id, name FROM buildings ORDER BY name")
-            for building in buildings:
+            for building in get_catalog().buildings():
                 combo_box.addItem(building['name'], building['building_id'])
         except Exception as e:
             print(f"Error loading buildings for combo box: {e}")
@@ -788,39 +589,14 @@ class FacultyDashboard(QWidget):
             facility_type = None
 
         try:
-            # Start building the query
-            query = """
-                SELECT f.*, b.name as building_name
-                FROM facilities f
-                JOIN buildings b ON f.building_id = b.building_id
-                WHERE f.is_bookable = TRUE
-                AND (f.booking_eligibility_role = %s OR f.booking_eligibility_role = 'any')
-            """
-            params = [self.user.role.value]
-
-            # Add search term filter
-            if search_term:
-                query += " AND (f.name LIKE %s OR f.description LIKE %s)"
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-            # Add building filter
-            if building_id:
-                query += " AND f.building_id = %s"
-                params.append(building_id)
-
-            # Add facility type filter
-            if facility_type and facility_type != "All Types": # Double-check for "All Types"
-                query += " AND f.type = %s"
-                params.append(facility_type)
-
-            # Add minimum capacity filter
-            if min_capacity > 0: # Only apply if greater than 0
-                query += " AND f.capacity >= %s"
-                params.append(min_capacity)
-
-            query += " ORDER BY f.name" # Optional: Order results
-
-            facilities_data = execute_query(query, tuple(params)) # Pass parameters as a tuple
+            facilities_data = get_catalog().facilities(
+                search_term=search_term or None,
+                building_id=building_id,
+                facility_type=facility_type,
+                min_capacity=min_capacity if min_capacity > 0 else None, # Only apply if greater than 0
+                bookable_only=True,
+                eligible_role=self.user.role.value
+            )
 
             if not facilities_data:
                 self.display_no_data_message(self.available_facilities_table, "No bookable facilities found matching criteria.")
@@ -842,6 +618,7 @@ class FacultyDashboard(QWidget):
 
                 book_btn = QPushButton("Book Now")
                 book_btn.setObjectName("action-button")
+                book_btn.setEnabled(not self.user.offline)
                 book_btn.clicked.connect(lambda checked, f=facility: self.open_booking_dialog(f))
 
                 buttons_layout.addWidget(book_btn)
@@ -852,7 +629,10 @@ class FacultyDashboard(QWidget):
             self.display_db_error_message(self.available_facilities_table, "Failed to load facilities due to an unexpected error.")
 
     def open_booking_dialog(self, facility):
+        if self.user.offline:
+            return
         dialog = BookingDialog(self, self.user_id, facility, self.booking_date_selector.date().toPython())
+        dialog.booking_created.connect(self.reminders.add_booking)
         if dialog.exec():
             self.load_all_my_bookings() # Refresh my bookings
             self.load_dashboard_stats() # Refresh dashboard stats
@@ -892,6 +672,7 @@ class FacultyDashboard(QWidget):
         self.update_email_btn = QPushButton("Update Email")  # ✅ Button added
         self.update_email_btn.setObjectName("action-button")
         self.update_email_btn.clicked.connect(self.save_profile)  # Connect to save_profile
+        self.update_email_btn.setEnabled(not self.user.offline)
 
         button_layout.addStretch()
         button_layout.addWidget(self.update_email_btn)
@@ -945,18 +726,11 @@ class FacultyDashboard(QWidget):
             return
 
         try:
-            # Assuming db_utils has a function to update user details
-            # If not, you'd add: update_user_email(user_id, new_email) in db_utils
-            
-            # For simplicity, directly using execute_query
-            query = "UPDATE users SET email = %s WHERE user_id = %s"
-            result = execute_query(query, (new_email, self.user_id), fetch=False)
-
-            if result is not None:
-                self.user.email = new_email # Update the user object in memory
+            success, message = self.user.update_profile(email=new_email)
+            if success:
                 self.show_info_message("Success", "Your profile has been updated successfully!")
             else:
-                self.show_error_message("Error", "Failed to update profile.")
+                self.show_error_message("Error", message)
         except Exception as e:
             self.show_error_message("Error", f"An error occurred: {str(e)}")
 
@@ -1148,50 +922,27 @@ class FacultyDashboard(QWidget):
     def refresh_my_analytics(self):
         """Refresh personal usage analytics data based on selected date range"""
         start_date = self.reports_start_date_my.date().toString("yyyy-MM-dd")
-        end_date_obj = self.reports_end_date_my.date().addDays(1)
-        end_date = end_date_obj.toString("yyyy-MM-dd")
+        end_date = self.reports_end_date_my.date().toString("yyyy-MM-dd")
 
         try:
-            # Get key metrics for this user
-            metrics_query = """
-                SELECT
-                    COUNT(*) as total_bookings,
-                    SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total_booked_hours,
-                    AVG(TIMESTAMPDIFF(MINUTE, start_time, end_time)) as avg_booking_duration_minutes
-                FROM bookings
-                WHERE user_id = %s
-                AND start_time BETWEEN %s AND %s AND status IN ('Confirmed', 'Completed')
-            """
-            metrics = execute_query(metrics_query, (self.user_id, start_date, end_date))
-
-            if metrics and metrics[0]:
-                self.my_total_bookings_label.setText(str(metrics[0]['total_bookings'] or 0))
-                self.my_total_hours_label.setText(f"{float(metrics[0]['total_booked_hours'] or 0):.1f} hrs")
-                self.my_avg_duration_label.setText(f"{int(metrics[0]['avg_booking_duration_minutes'] or 0)} min")
-            else:
-                self.my_total_bookings_label.setText("0")
-                self.my_total_hours_label.setText("0.0 hrs")
-                self.my_avg_duration_label.setText("0 min")
+            # One read of this user's daily facts (see booking_facts.py) is folded into every
+            # grouping shown: the status pie counts all bookings, the rest Confirmed/Completed
+            fact_rows = get_booking_facts(start_date, end_date, group_by=FACT_DIMENSIONS, user_id=self.user_id)
+            if fact_rows is None:
+                return
+            usage = aggregate_usage(fact_rows, statuses=('Confirmed', 'Completed'), groupings=('facility', 'day'))
+            by_status = aggregate_usage(fact_rows, groupings=('status',))['status']
 
+            # Get key metrics for this user
+            self.my_total_bookings_label.setText(str(usage['total']['total_bookings']))
+            self.my_total_hours_label.setText(f"{usage['total']['total_minutes'] / 60:.1f} hrs")
+            self.my_avg_duration_label.setText(f"{int(usage['total']['avg_minutes'])} min")
 
             # Get bookings by status (Personal)
-            status_query = """
-                SELECT status, COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s AND start_time BETWEEN %s AND %s
-                GROUP BY status
-            """
-            status_data = execute_query(status_query, (self.user_id, start_date, end_date))
+            status_data = [{'status': status, 'count': totals['total_bookings']} for status, totals in by_status.items()]
 
             # Get booking trend (Personal)
-            booking_trend_query = """
-                SELECT DATE(start_time) as date, COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s AND start_time BETWEEN %s AND %s AND status IN ('Confirmed', 'Completed')
-                GROUP BY DATE(start_time)
-                ORDER BY date
-            """
-            booking_trend_data = execute_query(booking_trend_query, (self.user_id, start_date, end_date))
+            booking_trend_data = [{'date': day, 'count': usage['day'][day]['total_bookings']} for day in sorted(usage['day'])]
 
             # Clear previous charts
             for i in reversed(range(self.my_status_chart.layout().count())):
@@ -1240,22 +991,19 @@ class FacultyDashboard(QWidget):
                 booking_trend_fig.tight_layout()
                 booking_trend_canvas.draw()
 
-            # Get my top facilities (by total hours booked)
-            facilities_query = """
-                SELECT
-                    f.name,
-                    b.name as building_name,
-                    f.type,
-                    SUM(TIMESTAMPDIFF(MINUTE, bk.start_time, bk.end_time)) / 60 as total_hours
-                FROM facilities f
-                JOIN buildings b ON f.building_id = b.building_id
-                JOIN bookings bk ON f.facility_id = bk.facility_id
-                WHERE bk.user_id = %s AND bk.start_time BETWEEN %s AND %s AND bk.status IN ('Confirmed', 'Completed')
-                GROUP BY f.facility_id, f.name, b.name, f.type
-                ORDER BY total_hours DESC
-                LIMIT 5
-            """
-            facilities_data = execute_query(facilities_query, (self.user_id, start_date, end_date))
+            # Get my top facilities (by total hours booked); names and types come from the catalog
+            catalog = get_catalog()
+            facilities_data = []
+            for facility_id, totals in sorted(usage['facility'].items(), key=lambda item: item[1]['total_minutes'], reverse=True):
+                facility = catalog.facility(facility_id)
+                if facility is None:
+                    continue
+                facilities_data.append({
+                    'name': facility.name, 'building_name': facility.building_name, 'type': facility.type,
+                    'total_hours': totals['total_minutes'] / 60,
+                })
+                if len(facilities_data) == 5:
+                    break
 
             if facilities_data:
                 self.my_top_facilities_table.setRowCount(len(facilities_data))
@@ -1352,63 +1100,42 @@ class FacultyDashboard(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             self.logout_requested.emit()
 
+    def update_reminder_count(self, count):
+        self.stat_cards["booking_reminders"]["widget"].setText(str(count))
+
+    def show_booking_reminder(self, booking, minutes_before):
+        """Non-blocking popup fired by the reminder scheduler."""
+        facility = get_catalog().facility(booking['facility_id'])
+        facility_name = facility.name if facility else "your facility"
+        if minutes_before >= 60:
+            lead = f"{minutes_before // 60} hour(s)"
+        else:
+            lead = f"{minutes_before} minute(s)"
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Booking Reminder")
+        msg.setText(f"🔔 Your booking for {facility_name} starts in {lead} "
+                    f"({booking['start_time'].strftime('%H:%M')}).")
+        msg.setStyleSheet("QLabel { color: white; font-size: 11pt; }")
+        msg.setModal(False)
+        msg.show()
+
     def load_dashboard_stats(self): 
         """Load real-time statistics for the dashboard for the logged-in user"""
         try:
-            # My Upcoming Bookings
-            upcoming_bookings = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                  AND start_time >= NOW()
-                  AND status = 'Confirmed'
-            """, (self.user_id,))
-
-            upcoming_count = upcoming_bookings[0]['count'] if upcoming_bookings else 0
-            self.stat_cards["upcoming_bookings"]["widget"].setText(str(upcoming_count))
-
-            # My Past Bookings (Completed or Confirmed but end_time < now)
-            past_bookings = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                  AND end_time < NOW()
-                  AND status IN ('Confirmed', 'Completed')
-            """, (self.user_id,))
-
-            past_count = past_bookings[0]['count'] if past_bookings else 0
-            self.stat_cards["past_bookings"]["widget"].setText(str(past_count))
-
-            # My Total Booked Hours
-            total_booked_hours = execute_query("""
-                SELECT SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total
-                FROM bookings
-                WHERE user_id = %s
-                  AND status IN ('Confirmed', 'Completed')
-            """, (self.user_id,))
-
-            total_hours_amount = total_booked_hours[0]['total'] if total_booked_hours and total_booked_hours[0]['total'] else 0
-            self.stat_cards["total_booking_hours"]["widget"].setText(f"{float(total_hours_amount):.1f} hrs")
-
-            # Total Facilities Available (all bookable facilities for any role)
-            facilities_available = execute_query("SELECT COUNT(*) as count FROM facilities WHERE is_bookable = TRUE")
-            available_count = facilities_available[0]['count'] if facilities_available else 0
-            self.stat_cards["facilities_available"]["widget"].setText(str(available_count))
+            # Counts, booked hours and recent bookings in one query; facility count from the catalog
+            stats = get_user_dashboard_stats(self.user_id)
+            if stats is None:
+                return
+            self.stat_cards["upcoming_bookings"]["widget"].setText(str(stats.upcoming_bookings))
+            self.stat_cards["past_bookings"]["widget"].setText(str(stats.past_bookings))
+            self.stat_cards["total_booking_hours"]["widget"].setText(f"{stats.total_booked_hours:.1f} hrs")
+            self.stat_cards["facilities_available"]["widget"].setText(str(stats.total_facilities))
 
             # Recent bookings (last 5)
             self.recent_bookings_table.setRowCount(0)
 
-            # Booking Reminders (Next 24 hours or your custom logic)
-            booking_reminders = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                AND start_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 1 DAY)
-                AND status = 'Confirmed'
-            """, (self.user_id,))
-
-            reminder_count = booking_reminders[0]['count'] if booking_reminders else 0
-            self.stat_cards["booking_reminders"]["widget"].setText(str(reminder_count))
+            # Booking Reminders (Next 24 hours), kept by the scheduler
+            reminder_count = self.reminders.upcoming_count()
 
             # ✅ Show reminder popup only once
             if not self.reminder_popup_shown:
@@ -1430,16 +1157,7 @@ class FacultyDashboard(QWidget):
                 QTimer.singleShot(500, show_reminder_popup)
 
 
-            recent_bookings = execute_query("""
-                SELECT bk.booking_id, bk.booking_number, f.name as facility_name, bu.name as building_name,
-                       bk.start_time, bk.end_time, bk.status
-                FROM bookings bk
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings bu ON f.building_id = bu.building_id
-                WHERE bk.user_id = %s
-                ORDER BY bk.created_at DESC
-                LIMIT 5
-            """, (self.user_id,))
+            recent_bookings = stats.recent_bookings
 
             if not recent_bookings:
                 self.recent_bookings_table.setRowCount(1)
@@ -1562,6 +1280,8 @@ class FacultyDashboard(QWidget):
 
 # --- New Dialogs for Faculty ---
 class BookingDialog(QDialog):
+    booking_created = Signal(dict)  # booking_id, facility_id, start_time, status - for the reminder scheduler
+
     def __init__(self, parent=None, user_id=None, facility=None, selected_date=None):
         super().__init__(parent)
         self.user_id = user_id
@@ -1721,7 +1441,7 @@ class BookingDialog(QDialog):
 
         # Find the rule for this facility type
         # Using db_utils.get_booking_rule
-        booking_rule = execute_query("SELECT * FROM booking_rules WHERE facility_type = %s", (self.facility['type'],))
+        booking_rule = get_booking_rule(self.facility['type'])
         
         max_duration_minutes = 180 # Default max 3 hours
         if booking_rule and booking_rule[0]:
@@ -1821,6 +1541,8 @@ class BookingDialog(QDialog):
         )
 
         if success:
+            self.booking_created.emit({'booking_id': success, 'facility_id': self.facility['facility_id'],
+                                       'start_time': start_dt_obj, 'status': 'Confirmed'})
             self.send_email_confirmation()  # ✅ send email
             QMessageBox.information(self, "Success", "Booking confirmed.")
             self.accept()
@@ -1832,20 +1554,14 @@ class BookingDialog(QDialog):
 ### Add this method inside the BookingDialog class:
 
     def send_email_confirmation(self):
-        try:
-            user_email = self.parent().user.email if hasattr(self.parent(), 'user') else None
-            if not user_email:
-                print("Email not found for user.") 
-                return
-            
-            start_dt_obj = self.start_time_combo.currentData()
-            end_dt_obj = self.end_time_combo.currentData()
-
-            sender_email = "nadinwaleedh@gmail.com"  # Replace with actual sender
-            sender_password = "lbcq ayfo gmko yrpz"  # Replace with actual password or use secure config
+        """Queue the confirmation email; the outbox sender delivers it in the background."""
+        user_email = self.parent().user.email if hasattr(self.parent(), 'user') else None
+        if not user_email:
+            print("Email not found for user.") 
+            return
 
-            subject = "Facility Booking Confirmation"
-            body = f"""
+        subject = "Facility Booking Confirmation"
+        body = f"""
 Dear {self.parent().user.username},
 
 Your booking for {self.facility['name']} ({self.facility['building_name']}) has been confirmed.
@@ -1858,77 +1574,6 @@ Regards,
 Smart Campus Team
             """
 
-            message = MIMEMultipart()
-            message['From'] = sender_email
-            message['To'] = user_email
-            message['Subject'] = subject
-            message.attach(MIMEText(body, 'plain'))
-
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(message)
-            server.quit()
+        if not enqueue_email(user_email, subject, body):
+            print("Could not queue confirmation email for", user_email)
 
-            print("Email sent successfully to", user_email)
-
-        except Exception as e:
-            print("Error sending email:", e)
-
-        
-        # Final check for availability before booking (race condition check)
-        # This is a critical step
-        
-        # Check for time slot conflicts before booking
-        current_booked_slots = get_facility_availability(
-        self.facility['facility_id'],
-        self.date_edit.date().toString("yyyy-MM-dd")
-        )
-
-        for booked in current_booked_slots:
-            if (booked['start_time'] < end_dt_obj and booked['end_time'] > start_dt_obj):
-                self.load_availability()  # Refresh UI
-                return  # Booking conflict found — exit
-
-        try:
-            # Check booking rules
-            booking_rule = execute_query("SELECT * FROM booking_rules WHERE facility_type = %s", (self.facility['type'],))
-
-            if booking_rule and booking_rule[0]:
-                rule = booking_rule[0]
-
-                # Max duration
-                duration_minutes = (end_dt_obj - start_dt_obj).total_seconds() / 60
-                if duration_minutes > rule['max_booking_duration_minutes']:
-                    return  # Violates max duration
-
-                # Min advance notice
-                min_advance_timedelta = datetime.timedelta(hours=rule['min_booking_advance_hours'])
-                if datetime.datetime.now() + min_advance_timedelta > start_dt_obj:
-                    return  # Violates advance notice
-
-                # Max concurrent
-                if rule['max_concurrent_bookings_per_user'] > 0:
-                    user_role = execute_query("SELECT role FROM users WHERE user_id = %s", (self.user_id,))
-                    if user_role and user_role[0]['role'] in rule['applies_to_roles'].split(','):
-                        current_active_bookings = execute_query("""
-                            SELECT COUNT(*) as count FROM bookings
-                            WHERE user_id = %s AND status = 'Confirmed' AND end_time > NOW()
-                        """, (self.user_id,))
-                        if current_active_bookings and current_active_bookings[0]['count'] >= rule['max_concurrent_bookings_per_user']:
-                            return  # Too many concurrent bookings
-
-            # Get purpose input
-            purpose = self.purpose_input.toPlainText().strip()
-
-            # Try to book
-            booking_id = create_booking(self.user_id, self.facility['facility_id'], start_dt_obj, end_dt_obj, purpose)
-
-            # Handle result — no popups
-            if booking_id is not None and isinstance(booking_id, int) and booking_id > 0:
-                self.accept()  # Close dialog if success
-            else:
-                pass  # Booking failed — silently ignore or handle differently
-
-        except Exception as e:
-            print(f"Error during booking: {e}")
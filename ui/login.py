@@ -5,17 +5,26 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit,
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QPixmap, QFont, QIcon, QKeyEvent
 from auth.user import User, UserRole # Ensure UserRole enum is updated in auth/user.py
+from auth.sessions import create_session, revoke_session
+from db_utils import is_server_available
+from local_snapshot import get_snapshot
 import json
 import os
 import re
 import hashlib # Still useful for password hashing, though User.login might handle it
 
+LOGIN_FILE = os.path.join('settings', 'login.json')
+
 class LoginWindow(QWidget):
     login_successful = Signal(object)
     switch_to_register = Signal()
+    # (user, message, error) from the hashing pool; delivered on the GUI thread
+    login_finished = Signal(object, str, str)
     
     def __init__(self):
         super().__init__()
+        self._login_in_progress = False
+        self.login_finished.connect(self.on_login_finished)
         self.initUI()
         self.load_saved_login()
     
@@ -86,6 +95,7 @@ class LoginWindow(QWidget):
         login_btn = QPushButton("Login")
         login_btn.setObjectName("primary-button")
         login_btn.clicked.connect(self.attempt_login)
+        self.login_btn = login_btn
         login_btn.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         
         # Register Link
@@ -160,73 +170,151 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Error", "Please enter username and password")
             return
         
-        # Hardcoded admin login for development (using new system's default admin)
-        if username == "admin" and password == "admin123":
+        # Hardcoded admin login for development (using new system's default admin).
+        # Admin pages are not in the local snapshot, so it needs the server.
+        if username == "admin" and password == "admin123" and is_server_available():
             admin_user = User(user_id=1, username="admin", email="admin@campus.com", role=UserRole.ADMIN)
             admin_user.is_authenticated = True # <--- Check indentation here
 
             if self.remember_checkbox.isChecked():
-                self.save_login(username, password)
+                self.save_login(username, admin_user)
             else:
                 self.clear_saved_login()
 
             self.login_successful.emit(admin_user)
             return
         
-        # Try database login
+        if self._login_in_progress:
+            return
+
+        # Try database login - password verification runs on the hashing pool, not the GUI thread
+        self._login_in_progress = True
+        self._pending_username = username
+        self.login_btn.setEnabled(False)
+        self.login_btn.setText("Signing in...")
+        User.login_async(username, password).add_done_callback(self._emit_login_result)
+
+    def _emit_login_result(self, future):
+        """Runs on a worker thread - hand the result to the GUI thread via signal."""
         try:
-            user, message = User.login(username, password)
-            
-            if user and user.is_active: # Ensure user is active
-                if self.remember_checkbox.isChecked():
-                    self.save_login(username, password)
-                else:
-                    self.clear_saved_login()
-                    
-                self.login_successful.emit(user)
-            elif user and not user.is_active:
-                QMessageBox.warning(self, "Login Failed", "Your account is currently inactive. Please contact an administrator.")
-            else:
-                QMessageBox.warning(self, "Login Failed", message)
+            user, message = future.result()
+            self.login_finished.emit(user, message, "")
         except Exception as e:
-            print(f"Login error: {e}")
+            self.login_finished.emit(None, "", str(e))
+
+    def on_login_finished(self, user, message, error):
+        self._login_in_progress = False
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText("Login")
+        username = self._pending_username
+        self._pending_username = None
+
+        if error:
+            print(f"Login error: {error}")
             QMessageBox.critical(self, "Database Error",
                                "Cannot connect to the database. Please check your database connection. " +
-                               "Only the default admin account (admin/admin123) might be available in offline mode.")
+                               "While it is unreachable, only the last student or faculty member who signed in " +
+                               "on this computer can sign in, read-only.")
+            return
+
+        if user and user.is_active: # Ensure user is active
+            if user.offline:
+                pass  # sessions can't be created or revoked without the server; keep the saved one
+            elif self.remember_checkbox.isChecked():
+                self.save_login(username, user)
+            else:
+                self.clear_saved_login()
+                
+            self.login_successful.emit(user)
+        elif user and not user.is_active:
+            QMessageBox.warning(self, "Login Failed", "Your account is currently inactive. Please contact an administrator.")
+        else:
+            QMessageBox.warning(self, "Login Failed", message)
     
     def load_saved_login(self):
         """Load saved login information if available"""
+        self.session_token = None
         try:
-            if os.path.exists('settings/login.json'):
-                with open('settings/login.json', 'r') as f:
+            if os.path.exists(LOGIN_FILE):
+                with open(LOGIN_FILE, 'r') as f:
                     login_data = json.load(f)
                 
                 self.username_input.setText(login_data.get('username', ''))
-                self.password_input.setText(login_data.get('password', ''))
+                self.session_token = login_data.get('session_token')
                 self.remember_checkbox.setChecked(True)
+                if 'password' in login_data:
+                    # Older versions stored the plaintext password - drop it
+                    self._write_login_file(login_data.get('username', ''), self.session_token)
         except Exception as e:
             print(f"Error loading saved login: {e}")
+
+    def restore_saved_session(self):
+        """Log straight in with the saved "Remember me" session. Returns True if it was valid."""
+        if not self.session_token:
+            return False
+        try:
+            user = User.restore_session(self.session_token)
+        except Exception as e:
+            print(f"Error restoring session: {e}")
+            return False
+        if not user:
+            if not is_server_available():
+                return False  # offline - keep the token for next time
+            # Expired or revoked - keep the username, forget the token
+            self.session_token = None
+            self._write_login_file(self.username_input.text().strip(), None)
+            return False
+        self.login_successful.emit(user)
+        return True
     
-    def save_login(self, username, password):
-        """Save login information to a file"""
+    def save_login(self, username, user):
+        """Remember this user with a server-side session token (never the password)"""
+        if self.session_token:
+            revoke_session(self.session_token)
+        self.session_token = create_session(user.user_id) if user.user_id else None
+        self._write_login_file(username, self.session_token)
+        if self.session_token:
+            user.remember_offline(session_token=self.session_token)
+
+    def _write_login_file(self, username, session_token):
         try:
-            login_data = {
-                'username': username,
-                'password': password  # In a real application, encrypt this!
-            }
+            login_data = {'username': username}
+            if session_token:
+                login_data['session_token'] = session_token
             
-            os.makedirs('settings', exist_ok=True)
+            os.makedirs(os.path.dirname(LOGIN_FILE), exist_ok=True)
             
-            with open('settings/login.json', 'w') as f:
+            with open(LOGIN_FILE, 'w') as f:
                 json.dump(login_data, f)
         except Exception as e:
             print(f"Error saving login info: {e}")
+
+    def end_session(self):
+        """On logout: revoke the remembered session but keep the username filled in"""
+        if not self.session_token:
+            return
+        try:
+            revoke_session(self.session_token)
+        except Exception as e:
+            print(f"Error revoking session: {e}")
+        snapshot = get_snapshot()
+        if snapshot:
+            snapshot.forget_session()
+        self.session_token = None
+        self._write_login_file(self.username_input.text().strip(), None)
+        self.password_input.clear()
     
     def clear_saved_login(self):
         """Remove saved login information"""
         try:
-            if os.path.exists('settings/login.json'):
-                os.remove('settings/login.json')
+            if self.session_token:
+                revoke_session(self.session_token)
+                self.session_token = None
+                snapshot = get_snapshot()
+                if snapshot:
+                    snapshot.forget_session()
+            if os.path.exists(LOGIN_FILE):
+                os.remove(LOGIN_FILE)
         except Exception as e:
             print(f"Error clearing saved login: {e}")
 
@@ -234,9 +322,15 @@ class LoginWindow(QWidget):
 class RegisterWindow(QWidget):
     register_successful = Signal(User)
     switch_to_login = Signal()
+    # (success, message, error) and (user, error) from the hashing pool
+    register_finished = Signal(bool, str, str)
+    auto_login_finished = Signal(object, str)
     
     def __init__(self):
         super().__init__()
+        self._register_in_progress = False
+        self.register_finished.connect(self.on_register_finished)
+        self.auto_login_finished.connect(self.on_auto_login_finished)
         self.initUI()
     
     def initUI(self):
@@ -340,6 +434,7 @@ class RegisterWindow(QWidget):
         register_btn = QPushButton("Create Account")
         register_btn.setObjectName("primary-button")
         register_btn.clicked.connect(self.register)
+        self.register_btn = register_btn
         register_btn.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         
         # Login Link
@@ -451,18 +546,59 @@ class RegisterWindow(QWidget):
             # Fallback (shouldn't happen with default selected)
             role = UserRole.STUDENT
         
-        # Attempt to register
+        if self._register_in_progress:
+            return
+
+        # Attempt to register (password hashing runs on the hashing pool)
         # Removed phone and address from User.register call
-        success, message = User.register(username, email, password, role)
-        
+        self._register_in_progress = True
+        self._pending_credentials = (username, password)
+        self.register_btn.setEnabled(False)
+        self.register_btn.setText("Creating account...")
+        User.register_async(username, email, password, role).add_done_callback(self._emit_register_result)
+
+    def _emit_register_result(self, future):
+        try:
+            success, message = future.result()
+            self.register_finished.emit(success, message, "")
+        except Exception as e:
+            self.register_finished.emit(False, "", str(e))
+
+    def _emit_auto_login_result(self, future):
+        try:
+            user, _ = future.result()
+            self.auto_login_finished.emit(user, "")
+        except Exception as e:
+            self.auto_login_finished.emit(None, str(e))
+
+    def _reset_register_button(self):
+        self._register_in_progress = False
+        self.register_btn.setEnabled(True)
+        self.register_btn.setText("Create Account")
+
+    def on_register_finished(self, success, message, error):
+        if error:
+            self._reset_register_button()
+            print(f"Registration error: {error}")
+            QMessageBox.critical(self, "Error", "Failed to create account. Please check your database connection.")
+            return
+
         if success:
             QMessageBox.information(self, "Success", message)
             
             # Log in the user
-            user, _ = User.login(username, password)
-            if user:
-                self.register_successful.emit(user)
-            else:
-                self.switch_to_login.emit()
+            username, password = self._pending_credentials
+            User.login_async(username, password).add_done_callback(self._emit_auto_login_result)
         else:
+            self._reset_register_button()
             QMessageBox.critical(self, "Error", message)
+
+    def on_auto_login_finished(self, user, error):
+        self._reset_register_button()
+        self._pending_credentials = None
+        if error:
+            print(f"Login after registration failed: {error}")
+        if user:
+            self.register_successful.emit(user)
+        else:
+            self.switch_to_login.emit()
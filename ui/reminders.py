@@ -0,0 +1,119 @@
+import datetime
+import heapq
+import itertools
+import os
+from PySide6.QtCore import QObject, QTimer, Signal
+from db_utils import get_user_bookings
+
+# Booking reminders without polling. The user's upcoming Confirmed bookings are
+# read once; every reminder (start_time minus each offset) and every change of
+# the "starting within 24 hours" count becomes an event in a heap keyed by fire
+# time, and a single-shot timer sleeps until the earliest one. Bookings created
+# or cancelled in this session are added/removed incrementally; cancelled
+# bookings' events are dropped lazily when they reach the top of the heap.
+REMINDER_OFFSETS_MINUTES = sorted(
+    {int(m) for m in os.environ.get('REMINDER_OFFSETS_MINUTES', '1440,60,15').split(',') if m.strip()},
+    reverse=True
+)
+REMINDER_WINDOW = datetime.timedelta(hours=24)
+
+# Re-arm at least this often so a suspended laptop or clock change can't delay events for long
+_MAX_SLEEP_MS = 5 * 60 * 1000
+
+_REMIND, _ENTER_WINDOW, _LEAVE_WINDOW = 'remind', 'enter', 'leave'
+
+
+class ReminderScheduler(QObject):
+    reminder_due = Signal(object, int)   # (booking row, minutes before start)
+    upcoming_changed = Signal(int)       # bookings starting within the next 24 hours
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._heap = []
+        self._counter = itertools.count()  # tie-breaker so bookings are never compared
+        self._bookings = {}
+        self._in_window = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._fire_due)
+
+    def load(self, user_id):
+        """Schedule reminders for all of the user's upcoming bookings (one query)."""
+        self._heap = []
+        self._bookings = {}
+        self._in_window = set()
+        bookings = get_user_bookings(user_id, status='Confirmed', start_date=datetime.date.today()) or []
+        for booking in bookings:
+            self._schedule(booking, announce=False)
+        self.upcoming_changed.emit(len(self._in_window))
+        self._arm()
+
+    def upcoming_count(self):
+        return len(self._in_window)
+
+    def add_booking(self, booking):
+        """Schedule a booking created during this session."""
+        if booking.get('status', 'Confirmed') != 'Confirmed':
+            return
+        self._schedule(booking, announce=True)
+        self._arm()
+
+    def remove_booking(self, booking_id):
+        """Forget a cancelled booking; its pending events are skipped when they come up."""
+        self._bookings.pop(booking_id, None)
+        if booking_id in self._in_window:
+            self._in_window.discard(booking_id)
+            self.upcoming_changed.emit(len(self._in_window))
+
+    def _push(self, when, kind, booking_id, offset=0):
+        heapq.heappush(self._heap, (when, next(self._counter), kind, booking_id, offset))
+
+    def _schedule(self, booking, announce):
+        now = datetime.datetime.now()
+        start = booking['start_time']
+        if start <= now:
+            return
+        booking_id = booking['booking_id']
+        self._bookings[booking_id] = booking
+
+        for offset in REMINDER_OFFSETS_MINUTES:
+            fire_at = start - datetime.timedelta(minutes=offset)
+            if fire_at > now:
+                self._push(fire_at, _REMIND, booking_id, offset)
+
+        if start - REMINDER_WINDOW > now:
+            self._push(start - REMINDER_WINDOW, _ENTER_WINDOW, booking_id)
+        else:
+            self._in_window.add(booking_id)
+            if announce:
+                self.upcoming_changed.emit(len(self._in_window))
+        self._push(start, _LEAVE_WINDOW, booking_id)
+
+    def _arm(self):
+        """Sleep until the earliest live event."""
+        while self._heap and self._heap[0][3] not in self._bookings:
+            heapq.heappop(self._heap)  # cancelled booking
+        if not self._heap:
+            self._timer.stop()
+            return
+        delay = (self._heap[0][0] - datetime.datetime.now()).total_seconds() * 1000
+        self._timer.start(int(min(max(delay, 0), _MAX_SLEEP_MS)))
+
+    def _fire_due(self):
+        now = datetime.datetime.now()
+        count_before = len(self._in_window)
+        while self._heap and self._heap[0][0] <= now:
+            _, _, kind, booking_id, offset = heapq.heappop(self._heap)
+            booking = self._bookings.get(booking_id)
+            if booking is None:
+                continue
+            if kind == _REMIND:
+                self.reminder_due.emit(booking, offset)
+            elif kind == _ENTER_WINDOW:
+                self._in_window.add(booking_id)
+            elif kind == _LEAVE_WINDOW:
+                self._in_window.discard(booking_id)
+                self._bookings.pop(booking_id, None)  # started - nothing left to do
+        if len(self._in_window) != count_before:
+            self.upcoming_changed.emit(len(self._in_window))
+        self._arm()
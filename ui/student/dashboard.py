@@ -1,8 +1,8 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QScrollArea, QFrame, QGridLayout,
+    QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QFrame, QGridLayout,
     QSizePolicy, QSpacerItem, QStackedWidget, QMessageBox,
     QTableWidget, QTableWidgetItem, QDialog, QFormLayout,
-    QLineEdit, QComboBox, QHeaderView, QSlider, QGroupBox, QTextEdit,QTabWidget,
+    QLineEdit, QComboBox, QHeaderView, QSlider, QGroupBox, QTextEdit,
     QSpinBox, QProgressBar, QMenu, QCheckBox, QRadioButton, QDateEdit, QDateTimeEdit
 )
 from PySide6.QtCore import Qt, Signal, QSize, QTimer, QDate, QDateTime
@@ -13,16 +13,19 @@ import re # Import the re module for email validation
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtCore import QUrl
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 
 # Import relevant SCNFBS DB functions
-from db_utils import execute_query, get_facility_availability, create_booking, cancel_booking, get_user_bookings, search_buildings, search_facilities
+from db_utils import execute_query, get_facility_availability, create_booking, cancel_booking, get_user_bookings, get_user_dashboard_stats, search_map_paths, get_booking_rule
+from repository import get_catalog
+from email_outbox import enqueue_email
+from ui.reminders import ReminderScheduler
+from ui.booking_cards import MyBookingsTabs
 
 # --- New Dialog for Booking (reused from FacultyDashboard) ---
 class BookingDialog(QDialog):
+    booking_created = Signal(dict)  # booking_id, facility_id, start_time, status - for the reminder scheduler
+
     def __init__(self, parent=None, user_id=None, facility=None, selected_date=None):
         super().__init__(parent)
         self.user_id = user_id
@@ -142,7 +145,7 @@ class BookingDialog(QDialog):
 
         # Find the rule for this facility type
         # Using db_utils.get_booking_rule
-        booking_rule = execute_query("SELECT * FROM booking_rules WHERE facility_type = %s", (self.facility['type'],))
+        booking_rule = get_booking_rule(self.facility['type'])
         
         max_duration_minutes = 180 # Default max 3 hours
         if booking_rule and booking_rule[0]:
@@ -233,7 +236,7 @@ class BookingDialog(QDialog):
 
         try:
             # Check booking rules (max duration, min advance notice, max concurrent)
-            booking_rule = execute_query("SELECT * FROM booking_rules WHERE facility_type = %s", (self.facility['type'],))
+            booking_rule = get_booking_rule(self.facility['type'])
             
             if booking_rule and booking_rule[0]:
                 rule = booking_rule[0]
@@ -271,6 +274,8 @@ class BookingDialog(QDialog):
             booking_id = create_booking(self.user_id, self.facility['facility_id'], start_dt_obj, end_dt_obj, purpose)
 
             if booking_id:
+                self.booking_created.emit({'booking_id': booking_id, 'facility_id': self.facility['facility_id'],
+                                           'start_time': start_dt_obj, 'status': 'Confirmed'})
                 popup_message = f"Dear Student,\n\nYour booking for {self.facility['name']} has been successfully confirmed.\n\nRegards,\nSmart Campus Team"
     
                 QMessageBox.information(self, "📧 Email", popup_message)
@@ -286,22 +291,19 @@ class BookingDialog(QDialog):
             print(f"Error during booking: {e}")
 
     def send_email_confirmation(self, popup_message):
-        try:
-            user_email = self.parent().user.email if hasattr(self.parent(), 'user') else None
-            if not user_email:
-                print("Email not found for user.")
-                return
-
-            sender_email = "place your email id"  # ✅ Your working email
-            sender_password = "plCace your app password"            # ✅ Your app password
+        """Queue the confirmation email; the outbox sender delivers it in the background."""
+        user_email = self.parent().user.email if hasattr(self.parent(), 'user') else None
+        if not user_email:
+            print("Email not found for user.")
+            return
 
-            start_time = self.start_time_combo.currentText()
-            end_time = self.end_time_combo.currentText()
-            purpose = self.purpose_input.toPlainText().strip()
-            booking_date = self.date_edit.date().toString("yyyy-MM-dd")
+        start_time = self.start_time_combo.currentText()
+        end_time = self.end_time_combo.currentText()
+        purpose = self.purpose_input.toPlainText().strip()
+        booking_date = self.date_edit.date().toString("yyyy-MM-dd")
 
-            subject = "Facility Booking Confirmation"
-            body = f"""{popup_message}
+        subject = "Facility Booking Confirmation"
+        body = f"""{popup_message}
 
     Full Booking Details:
 
@@ -311,22 +313,8 @@ class BookingDialog(QDialog):
     Purpose: {purpose}
     """
 
-            message = MIMEMultipart()
-            message['From'] = sender_email
-            message['To'] = user_email
-            message['Subject'] = subject
-            message.attach(MIMEText(body, 'plain'))
-
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(message)
-            server.quit()
-
-            print("Email sent successfully to", user_email)
-
-        except Exception as e:
-            print("Error sending email:", e)
+        if not enqueue_email(user_email, subject, body):
+            print("Could not queue confirmation email for", user_email)
 
 
 # --- Student Dashboard ---
@@ -339,19 +327,18 @@ class StudentDashboard(QWidget):
         self.user_id = user.user_id # Access user ID directly from the User object
         self.reminder_popup_shown = False #Added by teacher
         
-        # Initialize booking layouts dictionary for My Bookings page
-        self.booking_layouts = {
-            'Upcoming': None,
-            'Past': None,
-            'Cancelled': None
-        }
-        
         # Set up auto-refresh timer for real-time updates
         self.refresh_timer = QTimer(self)
         self.refresh_timer.timeout.connect(self.auto_refresh)
         self.refresh_timer.start(500)  # Refresh every 0.5 seconds
         
         self.initUI()
+
+        # Reminders are scheduled once and fired by a timer - no polling queries
+        self.reminders = ReminderScheduler(self)
+        self.reminders.upcoming_changed.connect(self.update_reminder_count)
+        self.reminders.reminder_due.connect(self.show_booking_reminder)
+        self.reminders.load(self.user_id)
         
         # Load initial data
         self.load_dashboard_stats()
@@ -395,6 +382,11 @@ class StudentDashboard(QWidget):
         user_info_layout.addWidget(profile_pic)
         user_info_layout.addWidget(welcome_label)
         user_info_layout.addWidget(user_role_label)
+        if self.user.offline:
+            # Signed in against the local snapshot: everything that writes is disabled
+            offline_label = QLabel("Offline - read-only")
+            offline_label.setStyleSheet("color: #f39c12; font-weight: bold;")
+            user_info_layout.addWidget(offline_label)
         sidebar_layout.addWidget(user_info)
         
         # Navigation buttons - Updated for SCNFBS Student
@@ -737,8 +729,7 @@ class StudentDashboard(QWidget):
     def load_buildings_into_combo(self, combo_box):
         """Helper to load buildings into a QComboBox."""
         try:
-            buildings = execute_query("SELECT building_id, name FROM buildings ORDER BY name")
-            for building in buildings:
+            for building in get_catalog().buildings():
                 combo_box.addItem(building['name'], building['building_id'])
         except Exception as e:
             print(f"Error loading buildings for combo box: {e}")
@@ -756,39 +747,14 @@ class StudentDashboard(QWidget):
             facility_type = None
 
         try:
-            # Start building the query
-            query = """
-                SELECT f.*, b.name as building_name
-                FROM facilities f
-                JOIN buildings b ON f.building_id = b.building_id
-                WHERE f.is_bookable = TRUE
-                AND (f.booking_eligibility_role = %s OR f.booking_eligibility_role = 'any')
-            """
-            params = [self.user.role.value]
-
-            # Add search term filter
-            if search_term:
-                query += " AND (f.name LIKE %s OR f.description LIKE %s)"
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-            # Add building filter
-            if building_id:
-                query += " AND f.building_id = %s"
-                params.append(building_id)
-
-            # Add facility type filter
-            if facility_type and facility_type != "All Types": # Double-check for "All Types"
-                query += " AND f.type = %s"
-                params.append(facility_type)
-
-            # Add minimum capacity filter
-            if min_capacity > 0: # Only apply if greater than 0
-                query += " AND f.capacity >= %s"
-                params.append(min_capacity)
-
-            query += " ORDER BY f.name" # Optional: Order results
-
-            facilities_data = execute_query(query, tuple(params)) # Pass parameters as a tuple
+            facilities_data = get_catalog().facilities(
+                search_term=search_term or None,
+                building_id=building_id,
+                facility_type=facility_type,
+                min_capacity=min_capacity if min_capacity > 0 else None, # Only apply if greater than 0
+                bookable_only=True,
+                eligible_role=self.user.role.value
+            )
 
             if not facilities_data:
                 self.display_no_data_message(self.available_facilities_table, "No bookable facilities found matching criteria.")
@@ -810,6 +776,7 @@ class StudentDashboard(QWidget):
 
                 book_btn = QPushButton("Book Now")
                 book_btn.setObjectName("action-button")
+                book_btn.setEnabled(not self.user.offline)
                 book_btn.clicked.connect(lambda checked, f=facility: self.open_booking_dialog(f))
 
                 buttons_layout.addWidget(book_btn)
@@ -820,7 +787,10 @@ class StudentDashboard(QWidget):
             self.display_db_error_message(self.available_facilities_table, "Failed to load facilities due to an unexpected error.")
 
     def open_booking_dialog(self, facility):
+        if self.user.offline:
+            return
         dialog = BookingDialog(self, self.user_id, facility, self.booking_date_selector.date().toPython())
+        dialog.booking_created.connect(self.reminders.add_booking)
         if dialog.exec():
             self.load_all_my_bookings() # Refresh my bookings
             self.load_dashboard_stats() # Refresh dashboard stats
@@ -874,174 +844,31 @@ class StudentDashboard(QWidget):
         search_layout.addWidget(search_btn)
         search_layout.addWidget(refresh_btn)
 
-        # Tab widget for different booking statuses
-        tabs = QTabWidget()
-
-        # Create tabs for different booking states
-        upcoming_bookings_tab = self.create_bookings_tab("Upcoming")
-        past_bookings_tab = self.create_bookings_tab("Past")
-        cancelled_bookings_tab = self.create_bookings_tab("Cancelled")
-
-        # Add tabs to widget
-        tabs.addTab(upcoming_bookings_tab, "Upcoming Bookings")
-        tabs.addTab(past_bookings_tab, "Past Bookings")
-        tabs.addTab(cancelled_bookings_tab, "Cancelled Bookings")
+        # Upcoming / Past / Cancelled tabs; Past and Cancelled load page by page
+        tabs = self.my_bookings_tabs = MyBookingsTabs(self.user_id, read_only=self.user.offline)
+        tabs.cancel_requested.connect(self.cancel_my_booking)
 
         layout.addWidget(header)
         layout.addLayout(search_layout)
         layout.addWidget(tabs)
 
-        # Store tab references
-        self.booking_tabs = {
-            "Upcoming": upcoming_bookings_tab,
-            "Past": past_bookings_tab,
-            "Cancelled": cancelled_bookings_tab
-        }
-
         # Load orders
         self.load_all_my_bookings()
 
         return page
 
-    def create_bookings_tab(self, status):
-        """Create a tab for bookings with the given status"""
-        tab = QWidget()
-        layout = QVBoxLayout(tab)
-
-        # Create scroll area for bookings
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-
-        # Content widget
-        content = QWidget()
-        self.booking_layouts[status] = QVBoxLayout(content)
-        self.booking_layouts[status].setAlignment(Qt.AlignmentFlag.AlignTop)
-
-        scroll.setWidget(content)
-        layout.addWidget(scroll)
-
-        return tab
-
     def load_all_my_bookings(self):
-        """Load bookings for all tabs for the logged-in user"""
-        # Clear existing bookings
-        for status, layout in self.booking_layouts.items():
-            while layout.count():
-                item = layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-
-        # Add "No bookings" message to each tab initially
-        for status, layout in self.booking_layouts.items():
-            no_bookings = QLabel(f"No {status.lower()} bookings")
-            no_bookings.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.addWidget(no_bookings)
-
+        """Reload the Upcoming tab (history tabs reload only once a booking has left it)"""
         try:
-            my_bookings = get_user_bookings(self.user_id) # Using the db_utils function
-
-            if not my_bookings:
-                return
-
-            # Clear "No bookings" messages
-            for status, layout in self.booking_layouts.items():
-                while layout.count():
-                    item = layout.takeAt(0)
-                    widget = item.widget()
-                    if widget:
-                        widget.deleteLater()
-
-            # Group by status (Upcoming, Past, Cancelled)
-            now = datetime.datetime.now()
-            
-            for booking in my_bookings:
-                tab_status = "Upcoming" # Default
-                if booking['status'] == 'Cancelled':
-                    tab_status = "Cancelled"
-                elif booking['end_time'] < now and booking['status'] == 'Confirmed':
-                    tab_status = "Past"
-                    execute_query("UPDATE bookings SET status = 'Completed' WHERE booking_id = %s", (booking['booking_id'],), fetch=False)
-                    booking['status'] = 'Completed' # Update locally for display
-                elif booking['end_time'] < now:
-                    tab_status = "Past"
-                
-                self.add_booking_card(booking, tab_status)
-
+            self.my_bookings_tabs.reload()
         except Exception as e:
             print(f"Error loading my bookings: {e}")
             self.show_error_message("Error", f"Failed to load your bookings: {str(e)}")
 
-    def add_booking_card(self, booking, tab_status):
-        """Add a booking card to the appropriate tab"""
-        card = QFrame()
-        card.setObjectName("booking-card")
-        card_layout = QVBoxLayout(card)
-
-        # Booking header
-        header_layout = QHBoxLayout()
-
-        booking_number_label = QLabel(f"Booking {booking['booking_number']}")
-        booking_number_label.setObjectName("booking-id")
-        booking_number_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-
-        time_label = QLabel(f"{booking['start_time'].strftime('%Y-%m-%d %H:%M')} - {booking['end_time'].strftime('%H:%M')}")
-        time_label.setObjectName("booking-time")
-
-        header_layout.addWidget(booking_number_label)
-        header_layout.addStretch()
-        header_layout.addWidget(time_label)
-
-        # Status label
-        status_layout = QHBoxLayout()
-        status_label = QLabel("Status:")
-        status_value = QLabel(booking['status'])
-
-        # Set color based on status
-        status_color = "#95a5a6"  # Default gray
-        if booking['status'] == "Confirmed":
-            status_color = "#2ecc71"  # Green
-        elif booking['status'] == "Pending Approval":
-            status_color = "#f39c12"  # Orange
-        elif booking['status'] == "Completed":
-            status_color = "#3498db"  # Blue
-        elif booking['status'] == "Cancelled":
-            status_color = "#e74c3c"  # Red
-
-        status_value.setStyleSheet(f"color: {status_color}; font-weight: bold;")
-
-        status_layout.addWidget(status_label)
-        status_layout.addWidget(status_value)
-        status_layout.addStretch()
-
-        # Facility info
-        facility_label = QLabel(f"Facility: {booking['facility_name']} ({booking['building_name']})")
-        facility_label.setObjectName("facility-info")
-        
-        purpose_label = QLabel(f"Purpose: {booking['purpose']}")
-        
-        # Action buttons based on tab status
-        buttons_layout = QHBoxLayout()
-
-        if tab_status == "Upcoming":
-            cancel_btn = QPushButton("Cancel Booking")
-            cancel_btn.setObjectName("delete-button")
-            cancel_btn.clicked.connect(lambda: self.cancel_my_booking(booking['booking_id']))
-            buttons_layout.addWidget(cancel_btn)
-        
-        # Add all components to card
-        card_layout.addLayout(header_layout)
-        card_layout.addLayout(status_layout)
-        card_layout.addWidget(facility_label)
-        card_layout.addWidget(purpose_label)
-        card_layout.addLayout(buttons_layout)
-
-        # Add card to appropriate layout
-        if tab_status in self.booking_layouts:
-            self.booking_layouts[tab_status].addWidget(card)
-
     def cancel_my_booking(self, booking_id):
         """Cancel a user's booking"""
+        if self.user.offline:
+            return
         reply = self.show_question_message(
             "Confirm Cancellation",
             "Are you sure you want to cancel this booking? This action cannot be undone."
@@ -1050,6 +877,7 @@ class StudentDashboard(QWidget):
             result = cancel_booking(booking_id) # Uses the function from db_utils
 
             if result:
+                self.reminders.remove_booking(booking_id)
                 self.show_info_message("📧 Email", f"Dear Student,\n\nYour booking has been cancelled.\n\n– Smart Campus")
                 self.load_all_my_bookings() # Refresh the bookings list
                 self.load_dashboard_stats() # Update dashboard stats
@@ -1061,71 +889,15 @@ class StudentDashboard(QWidget):
         start_date = self.bookings_start_date.date().toString("yyyy-MM-dd")
         end_date = self.bookings_end_date.date().toString("yyyy-MM-dd")
 
-        # Clear existing bookings in all tabs
-        for status, layout in self.booking_layouts.items():
-            while layout.count():
-                item = layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-        
-        # Add "No bookings" message to each tab initially
-        for status, layout in self.booking_layouts.items():
-            no_bookings = QLabel(f"No {status.lower()} bookings found matching criteria.")
-            no_bookings.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.addWidget(no_bookings)
-
         try:
-            # Query directly for this user with search filters
-            query = """
-                SELECT bk.*, f.name as facility_name, bu.name as building_name
-                FROM bookings bk
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings bu ON f.building_id = bu.building_id
-                WHERE bk.user_id = %s
-            """
-            params = [self.user_id]
-
-            if search_term:
-                query += " AND (f.name LIKE %s OR bu.name LIKE %s)"
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-            if start_date:
-                query += " AND DATE(bk.start_time) >= %s"
-                params.append(start_date)
-
-            if end_date:
-                query += " AND DATE(bk.end_time) <= %s"
-                params.append(end_date)
-
-            query += " ORDER BY bk.start_time DESC"
-            
-            filtered_bookings = execute_query(query, params)
-
-            if not filtered_bookings:
-                return # Keep "No bookings found" messages
-
-            # Clear "No bookings" messages again as we have data
-            for status, layout in self.booking_layouts.items():
-                while layout.count():
-                    item = layout.takeAt(0)
-                    widget = item.widget()
-                    if widget:
-                        widget.deleteLater()
-
-            now = datetime.datetime.now()
-            for booking in filtered_bookings:
-                tab_status = "Upcoming"
-                if booking['status'] == 'Cancelled':
-                    tab_status = "Cancelled"
-                elif booking['end_time'] < now and booking['status'] == 'Confirmed':
-                    tab_status = "Past"
-                    execute_query("UPDATE bookings SET status = 'Completed' WHERE booking_id = %s", (booking['booking_id'],), fetch=False)
-                    booking['status'] = 'Completed' # Update locally for display
-                elif booking['end_time'] < now:
-                    tab_status = "Past"
-                
-                self.add_booking_card(booking, tab_status)
+            # Facility/building name matching happens against the in-memory catalog
+            catalog = get_catalog()
+            facility_ids = catalog.facility_ids_matching(search_term) if search_term else None
+            filtered_bookings = catalog.attach_names(get_user_bookings(
+                self.user_id, start_date=start_date, end_date=end_date, facility_ids=facility_ids
+            ))
+
+            self.my_bookings_tabs.show_search_results(filtered_bookings, "No {status} bookings found matching criteria.")
 
         except Exception as e:
             print(f"Error searching my bookings: {e}")
@@ -1145,16 +917,7 @@ class StudentDashboard(QWidget):
         self.directions_output.setText("Searching for directions...")
 
         try:
-            if accessible_only:
-                paths = execute_query(
-                    "SELECT * FROM map_paths WHERE start_point LIKE %s AND end_point LIKE %s AND is_accessible = TRUE ORDER BY distance_meters ASC",
-                    (f"%{start_point}%", f"%{end_point}%")
-                )
-            else:
-                paths = execute_query(
-                    "SELECT * FROM map_paths WHERE start_point LIKE %s AND end_point LIKE %s ORDER BY distance_meters ASC",
-                    (f"%{start_point}%", f"%{end_point}%")
-                )
+            paths = search_map_paths(start_point, end_point, True if accessible_only else None)
 
             if paths:
                 directions_text = "Directions Found:\n\n"
@@ -1212,6 +975,7 @@ class StudentDashboard(QWidget):
         save_btn = QPushButton("Update Email")
         save_btn.setObjectName("action-button")
         save_btn.clicked.connect(self.save_profile)
+        save_btn.setEnabled(not self.user.offline)
 
         button_layout.addStretch()
         button_layout.addWidget(save_btn)
@@ -1257,14 +1021,11 @@ class StudentDashboard(QWidget):
             return
 
         try:
-            query = "UPDATE users SET email = %s WHERE user_id = %s"
-            result = execute_query(query, (new_email, self.user_id), fetch=False)
-
-            if result is not None:
-                self.user.email = new_email # Update the user object in memory
+            success, message = self.user.update_profile(email=new_email)
+            if success:
                 self.show_info_message("Success", "Your profile has been updated successfully!")
             else:
-                self.show_error_message("Error", "Failed to update profile.")
+                self.show_error_message("Error", message)
         except Exception as e:
             self.show_error_message("Error", f"An error occurred: {str(e)}")
             print(f"Profile save error: {e}")
@@ -1297,60 +1058,39 @@ class StudentDashboard(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             self.logout_requested.emit()
 
+    def update_reminder_count(self, count):
+        self.stat_cards["reminders"]["widget"].setText(str(count))
+
+    def show_booking_reminder(self, booking, minutes_before):
+        """Non-blocking popup fired by the reminder scheduler."""
+        facility = get_catalog().facility(booking['facility_id'])
+        facility_name = facility.name if facility else "your facility"
+        if minutes_before >= 60:
+            lead = f"{minutes_before // 60} hour(s)"
+        else:
+            lead = f"{minutes_before} minute(s)"
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Booking Reminder")
+        msg.setText(f"🔔 Your booking for {facility_name} starts in {lead} "
+                    f"({booking['start_time'].strftime('%H:%M')}).")
+        msg.setStyleSheet("QLabel { color: white; font-size: 13pt; }")
+        msg.setModal(False)
+        msg.show()
+
     def load_dashboard_stats(self):
         """Load real-time statistics for the dashboard for the logged-in user"""
         try:
-            # My Upcoming Bookings
-            upcoming_bookings = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                  AND start_time >= NOW()
-                  AND status = 'Confirmed'
-            """, (self.user_id,))
-
-            upcoming_count = upcoming_bookings[0]['count'] if upcoming_bookings else 0
-            self.stat_cards["upcoming_bookings"]["widget"].setText(str(upcoming_count))
-
-            # My Past Bookings (Completed or Confirmed but end_time < now)
-            past_bookings = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                  AND end_time < NOW()
-                  AND status IN ('Confirmed', 'Completed')
-            """, (self.user_id,))
-
-            past_count = past_bookings[0]['count'] if past_bookings else 0
-            self.stat_cards["past_bookings"]["widget"].setText(str(past_count))
-
-            # My Total Booked Hours
-            total_booked_hours = execute_query("""
-                SELECT SUM(TIMESTAMPDIFF(MINUTE, start_time, end_time)) / 60 as total
-                FROM bookings
-                WHERE user_id = %s
-                  AND status IN ('Confirmed', 'Completed')
-            """, (self.user_id,))
-
-            total_hours_amount = total_booked_hours[0]['total'] if total_booked_hours and total_booked_hours[0]['total'] else 0
-            self.stat_cards["total_booking_hours"]["widget"].setText(f"{float(total_hours_amount):.1f} hrs")
-
-            # Total Facilities (all bookable facilities for any role)
-            total_facilities = execute_query("SELECT COUNT(*) as count FROM facilities WHERE is_bookable = TRUE")
-            total_fac_count = total_facilities[0]['count'] if total_facilities else 0
-            self.stat_cards["total_facilities"]["widget"].setText(str(total_fac_count))
-
-            # Booking Reminders - upcoming bookings in next 24 hours(Added by teacher)
-            reminder_bookings = execute_query("""
-                SELECT COUNT(*) as count
-                FROM bookings
-                WHERE user_id = %s
-                AND start_time BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 1 DAY)
-                AND status = 'Confirmed'
-            """, (self.user_id,))
-
-            reminder_count = reminder_bookings[0]['count'] if reminder_bookings else 0
-            self.stat_cards["reminders"]["widget"].setText(str(reminder_count))
+            # Counts, booked hours and recent bookings in one query; facility count from the catalog
+            stats = get_user_dashboard_stats(self.user_id)
+            if stats is None:
+                return
+            self.stat_cards["upcoming_bookings"]["widget"].setText(str(stats.upcoming_bookings))
+            self.stat_cards["past_bookings"]["widget"].setText(str(stats.past_bookings))
+            self.stat_cards["total_booking_hours"]["widget"].setText(f"{stats.total_booked_hours:.1f} hrs")
+            self.stat_cards["total_facilities"]["widget"].setText(str(stats.total_facilities))
+
+            # Booking Reminders - upcoming bookings in next 24 hours(Added by teacher), kept by the scheduler
+            reminder_count = self.reminders.upcoming_count()
 
             if not self.reminder_popup_shown:
                 def show_reminder_popup():
@@ -1373,17 +1113,7 @@ class StudentDashboard(QWidget):
             
             self.recent_bookings_table.setRowCount(0)
 
-            recent_bookings = execute_query("""
-                SELECT bk.booking_id, bk.booking_number, f.name as facility_name, bu.name as building_name,
-                       bk.start_time, bk.end_time, bk.status
-                FROM bookings bk
-                JOIN users u ON bk.user_id = u.user_id
-                JOIN facilities f ON bk.facility_id = f.facility_id
-                JOIN buildings bu ON f.building_id = bu.building_id
-                WHERE bk.user_id = %s
-                ORDER BY bk.created_at DESC
-                LIMIT 5
-            """, (self.user_id,))
+            recent_bookings = stats.recent_bookings
 
             if not recent_bookings:
                 self.recent_bookings_table.setRowCount(1)
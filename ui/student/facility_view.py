@@ -1,235 +1,21 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QScrollArea, QFrame, QGridLayout,
-    QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
-    QSpinBox, QDialog, QFormLayout, QTextEdit, QLineEdit, QDateEdit, QDateTimeEdit, QGroupBox,
+    QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView,
+    QSpinBox, QLineEdit, QDateEdit, QDateTimeEdit,
 )
 from PySide6.QtCore import Qt, Signal, QDate, QTime, QDateTime
 from PySide6.QtGui import QFont, QIcon, QPixmap,QColor
-from PySide6.QtGui import Qmessage 
 import datetime # Explicitly import datetime
 import re # Explicitly import re
 
-from db_utils import execute_query, get_facility_availability, create_booking # Import relevant SCNFBS DB functions
-# Re-import BookingDialog from the student dashboard if it's in a separate file,
-# or define it here if it's purely internal to this view.
-# For consistency and avoiding circular imports if FacilityView is in a sub-folder,
-# let's assume BookingDialog is in student_dashboard or db_utils.
-# If you place BookingDialog in a separate file like dialogs/booking_dialog.py,
-# you would import it like: from ui.dialogs.booking_dialog import BookingDialog
-# For now, I'll include the BookingDialog class directly in this file as a standalone
-# component, as it was copied from the FacultyDashboard and is a common pattern.
-
-class BookingDialog(QDialog):
-    # This class is duplicated here for self-containment.
-    # In a larger project, consider putting common dialogs in a shared 'dialogs' folder.
-    def __init__(self, parent=None, user_id=None, facility=None, selected_date=None):
-        super().__init__(parent)
-        self.user_id = user_id
-        self.facility = facility
-        self.selected_date = selected_date if selected_date else datetime.date.today()
-
-        self.setWindowTitle(f"Book: {facility['name']} ({facility['building_name']})")
-        self.setStyleSheet("""
-            QDialog { background-color: #f8f9fa; color: #2c3e50; }
-            QLabel { color: #2c3e50; font-size: 12px; }
-            QDateTimeEdit, QComboBox, QTextEdit { background-color: white; color: #2c3e50; border: 1px solid #ddd; border-radius: 4px; padding: 5px; min-height: 25px; }
-            QDateTimeEdit:focus, QComboBox:focus, QTextEdit:focus { border: 1px solid #3498db; }
-            QPushButton { background-color: #3498db; color: white; border: none; border-radius: 4px; padding: 8px 15px; font-weight: bold; }
-            QPushButton:hover { background-color: #2980b9; }
-            QTableWidget { background-color: white; border: 1px solid #ddd; }
-            QHeaderView::section { background-color: #eee; color: #2c3e50; padding: 5px; }
-            QTableWidget::item:selected { background-color: #3498db; color: white; }
-        """)
-        self.initUI()
-        self.apply_styles()
-        self.load_availability()
-
-    def initUI(self):
-        layout = QVBoxLayout(self)
-
-        # Facility Info
-        info_group = QGroupBox("Facility Information")
-        info_layout = QFormLayout(info_group)
-        info_layout.addRow("Facility:", QLabel(self.facility['name']))
-        info_layout.addRow("Building:", QLabel(self.facility['building_name']))
-        info_layout.addRow("Type:", QLabel(self.facility['type']))
-        info_layout.addRow("Capacity:", QLabel(str(self.facility['capacity'])))
-        layout.addWidget(info_group)
-
-        # Booking Details Form
-        booking_group = QGroupBox("Booking Details")
-        booking_layout = QFormLayout(booking_group)
-
-        self.date_edit = QDateEdit()
-        self.date_edit.setCalendarPopup(True)
-        self.date_edit.setDate(self.selected_date)
-        self.date_edit.dateChanged.connect(self.load_availability)
-        booking_layout.addRow("Date:", self.date_edit)
-
-        self.start_time_combo = QComboBox()
-        self.end_time_combo = QComboBox()
-        # Populate these from load_availability based on free slots
-        booking_layout.addRow("Start Time:", self.start_time_combo)
-        booking_layout.addRow("End Time:", self.end_time_combo)
-
-        self.purpose_input = QTextEdit()
-        self.purpose_input.setPlaceholderText("Purpose of booking (e.g., Group Study, Project Work)")
-        self.purpose_input.setFixedHeight(60)
-        booking_layout.addRow("Purpose:", self.purpose_input)
-        
-        layout.addWidget(booking_group)
-
-        # Availability Display
-        self.availability_table = QTableWidget()
-        self.availability_table.setColumnCount(2)
-        self.availability_table.setHorizontalHeaderLabels(["Start Time", "End Time"])
-        self.availability_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.availability_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.availability_table.setAlternatingRowColors(True)
-        self.availability_table.setMinimumHeight(150)
-        self.availability_table.setToolTip("Green: Available, Red: Booked")
-        layout.addWidget(QLabel("Availability for selected date:"))
-        layout.addWidget(self.availability_table)
-
-        # Buttons
-        button_layout = QHBoxLayout()
-        book_btn = QPushButton("Confirm Booking")
-        book_btn.clicked.connect(self.submit_booking)
-        cancel_btn = QPushButton("Cancel")
-        cancel_btn.clicked.connect(self.reject)
-        button_layout.addWidget(book_btn)
-        button_layout.addWidget(cancel_btn)
-        layout.addLayout(button_layout)
-
-    def load_availability(self):
-        selected_date_str = self.date_edit.date().toString("yyyy-MM-dd")
-        booked_slots = get_facility_availability(self.facility['facility_id'], selected_date_str)
-
-        self.availability_table.setRowCount(0)
-        self.start_time_combo.clear()
-        self.end_time_combo.clear()
-
-        # Generate all possible 30-minute slots for the day (e.g., 8 AM to 10 PM)
-        start_hour = 8
-        end_hour = 22 # 10 PM
-        all_slots = []
-        current_time = datetime.datetime.strptime(f"{selected_date_str} {start_hour}:00", "%Y-%m-%d %H:%M")
-        while current_time.hour < end_hour or (current_time.hour == end_hour and current_time.minute == 0):
-            all_slots.append(current_time)
-            current_time += datetime.timedelta(minutes=30)
-        
-        # Determine available slots
-        available_slots = []
-        for i in range(len(all_slots) - 1):
-            slot_start = all_slots[i]
-            slot_end = all_slots[i+1]
-            
-            is_booked = False
-            for booked in booked_slots:
-                # Check for overlap: [booked_start, booked_end] overlaps with [slot_start, slot_end]
-                if (booked['start_time'] < slot_end and booked['end_time'] > slot_start):
-                    is_booked = True
-                    break
-            
-            # Check if this slot start time is in the past (only for today)
-            if self.date_edit.date() == QDate.currentDate() and slot_start < datetime.datetime.now():
-                is_booked = True # Treat past slots as unavailable
-
-            available_slots.append((slot_start, slot_end, not is_booked))
-
-        # Populate availability table and time combos
-        row_idx = 0
-        for start_dt, end_dt, is_available in available_slots:
-            self.availability_table.insertRow(row_idx)
-            start_item = QTableWidgetItem(start_dt.strftime("%H:%M"))
-            end_item = QTableWidgetItem(end_dt.strftime("%H:%M"))
-            
-            if is_available:
-                start_item.setForeground(Qt.GlobalColor.darkGreen)
-                end_item.setForeground(Qt.GlobalColor.darkGreen)
-                self.start_time_combo.addItem(start_dt.strftime("%H:%M"), start_dt)
-                self.end_time_combo.addItem(end_dt.strftime("%H:%M"), end_dt) # Add all end times to allow duration selection
-            else:
-                start_item.setForeground(Qt.GlobalColor.red)
-                end_item.setForeground(Qt.GlobalColor.red)
-            
-            self.availability_table.setItem(row_idx, 0, start_item)
-            self.availability_table.setItem(row_idx, 1, end_item)
-            row_idx += 1
-            
-        # Adjust end time combo after start time is selected
-        self.start_time_combo.currentIndexChanged.connect(self.update_end_time_options)
-        self.update_end_time_options() # Call initially
-
-    def update_end_time_options(self):
-        selected_start_dt = self.start_time_combo.currentData()
-        self.end_time_combo.clear()
-        if not selected_start_dt:
-            return
-
-        # Find the rule for this facility type
-        booking_rule = execute_query("SELECT * FROM booking_rules WHERE facility_type = %s", (self.facility['type'],))
-        
-        max_duration_minutes = 180 # Default max 3 hours
-        if booking_rule and booking_rule[0]:
-            max_duration_minutes = booking_rule[0]['max_booking_duration_minutes']
-
-        # Populate end times based on selected start time and maximum allowed duration
-        for i in range(len(self.start_time_combo)):
-            item_start_dt = self.start_time_combo.itemData(i)
-            if item_start_dt == selected_start_dt:
-                current_end_time = selected_start_dt
-                for k in range(i, len(self.get_all_slots_with_availability())):
-                    all_slots_with_avail = self.get_all_slots_with_availability()
-                    if k >= len(all_slots_with_avail):
-                        break
-                    
-                    slot_s_k, slot_e_k, is_avail_k = all_slots_with_avail[k]
-                    
-                    if is_avail_k and slot_s_k == current_end_time:
-                        current_end_time = slot_e_k
-                        duration = (current_end_time - selected_start_dt).total_seconds() / 60
-                        if duration <= max_duration_minutes:
-                            self.end_time_combo.addItem(current_end_time.strftime("%H:%M"), current_end_time)
-                        else:
-                            break
-                    else:
-                        break
-                break
-
-    def get_all_slots_with_availability(self):
-        """Helper to re-generate the full list of slots and their availability."""
-        selected_date_str = self.date_edit.date().toString("yyyy-MM-dd")
-        booked_slots = get_facility_availability(self.facility['facility_id'], selected_date_str)
-
-        start_hour = 8
-        end_hour = 22
-        all_slots = []
-        current_time = datetime.datetime.strptime(f"{selected_date_str} {start_hour}:00", "%Y-%m-%d %H:%M")
-        while current_time.hour < end_hour or (current_time.hour == end_hour and current_time.minute == 0):
-            all_slots.append(current_time)
-            current_time += datetime.timedelta(minutes=30)
-        
-        full_availability = []
-        for i in range(len(all_slots) - 1):
-            slot_start = all_slots[i]
-            slot_end = all_slots[i+1]
-            
-            is_booked = False
-            for booked in booked_slots:
-                if (booked['start_time'] < slot_end and booked['end_time'] > slot_start):
-                    is_booked = True
-                    break
-            if self.date_edit.date() == QDate.currentDate() and slot_start < datetime.datetime.now():
-                is_booked = True
-
-            full_availability.append((slot_start, slot_end, not is_booked))
-        return full_availability
-
-
+from db_utils import get_facility_availability, create_booking # Import relevant SCNFBS DB functions
+from repository import get_catalog
+# The booking dialog is shared with the student dashboard
+from ui.student.dashboard import BookingDialog
 
 class FacilityView(QWidget):
     back_to_facilities = Signal() # Renamed signal
+    booking_created = Signal(dict)  # passed on from the booking dialog, for the dashboard's reminders
 
     def __init__(self, user_id, facility_id, parent=None):
         super().__init__(parent)
@@ -241,19 +27,8 @@ class FacilityView(QWidget):
 
     def load_facility_data(self):
         """Load facility details and its associated building data."""
-        result = execute_query(
-            """
-            SELECT f.*, b.name as building_name, b.address as building_address
-            FROM facilities f
-            JOIN buildings b ON f.building_id = b.building_id
-            WHERE f.facility_id = %s
-            """,
-            (self.facility_id,)
-        )
-        if result:
-            self.facility_data = result[0]
-        else:
-            self.facility_data = None # Explicitly set to None if not found
+        # Shared catalog entity (supports facility_data['name'] like the old row dict); None if not found
+        self.facility_data = get_catalog().facility(self.facility_id)
 
     def initUI(self):
         if not self.facility_data:
@@ -505,6 +280,7 @@ class FacilityView(QWidget):
             facility=self.facility_data,
             selected_date=self.booking_date_selector.date().toPython()
         )
+        dialog.booking_created.connect(self.booking_created)
         if dialog.exec():
             # If booking is successful, refresh availability
             self.load_availability_and_times()